@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+    Autotune Controller
+    Searches a space of compiler flags (see helper/Tuning.py) for the ones
+    that maximise (or minimise) a benchmark metric, ex. LULESH's FOM.
+
+    Candidates are evaluated a batch at a time, as campaign jobs: the
+    batch's builds run in parallel and its measurements one at a time, on
+    cores that builds are not allowed to use. Only candidates that pass the
+    benchmark's validation count. Every evaluation is kept, so resuming a
+    tuning (--resume) never evaluates the same flags twice, and no new
+    batch starts after the time budget.
+
+    All results are collected in a single tree:
+      <root>/<tuning>/results/<job>/...     per-candidate results
+      <root>/<tuning>/evaluations.jsonl     every candidate's flags and value
+      <root>/<tuning>/tuning.yaml           best flags, baseline and ranking
+
+    Usage: autotune_controller.py --usage
+"""
+
+import sys
+import os
+import json
+import time
+import shutil
+import argparse
+import statistics
+from pathlib import Path
+
+from helper.Tuning import Tuning
+from helper.FlagSearch import FlagSpace, FlagSearch
+from helper.Telemetry import Telemetry
+from helper.LogArchive import LogArchive
+from helper.Serializer import Serializer, to_yaml
+
+from models.machines.MachineFactory import MachineFactory
+
+from executor.Scheduler import LocalScheduler
+
+from campaign_controller import CampaignController
+
+class AutotuneController(CampaignController):
+    """Evaluates batches of flag candidates until the budget is spent"""
+
+    campaign_class = Tuning
+
+    def __init__(self, argparse_parser, argparse_args):
+        super().__init__(argparse_parser, argparse_args)
+        self.search = None
+        # Toolchains and sources are only prepared once, for all batches
+        self.prepared = set()
+        self.evaluations = os.path.join(self.root_path, 'evaluations.jsonl')
+
+    ## ACTIONS
+    def _once(self, name, action):
+        def once():
+            if name not in self.prepared:
+                action()
+                self.prepared.add(name)
+        return once
+
+    def _toolchain_action(self, toolchain, name):
+        return self._once(name, super()._toolchain_action(toolchain, name))
+
+    def _sources_action(self, job, name):
+        return self._once(name, super()._sources_action(job, name))
+
+    def _collected(self, controller, res):
+        """The objective's average over all iterations"""
+        values = res.column(self.campaign.metric, self.campaign.stream)
+        if not values:
+            raise RuntimeError('No %s in the results of %s' %
+                               (self.campaign.metric, controller.run_id))
+        return {'results': controller.results_path,
+                'value': statistics.fmean(values)}
+
+    ## SEARCH
+    def _space(self):
+        """The tuning's flag space, or the compiler model's"""
+        space = self.campaign.space
+        if space is None:
+            toolchain = self.campaign.defaults.get('toolchain')
+            name = self.campaign.identity('toolchain', self.campaign.defaults,
+                                          ['toolchain'])
+            self._toolchain_action(toolchain, name)()
+            space = self.compilers[toolchain].tuning_space
+        return FlagSpace(space.get('flags'), space.get('choices'))
+
+    def _load(self):
+        """Evaluations of a previous (interrupted) tuning"""
+        if not os.path.isfile(self.evaluations):
+            return
+        with open(self.evaluations) as evaluations:
+            for line in evaluations:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                config = tuple(entry['config'])
+                # Only if the space hasn't changed since
+                if len(config) != len(self.search.space.sizes) or \
+                   self.search.space.flags_of(config) != entry['flags']:
+                    continue
+                self.search.tell(config, self.campaign.score(entry['value']))
+        self.logger.info('Resuming after %d evaluations' %
+                         self.search.evaluated())
+
+    def _evaluate(self, batch, scheduler):
+        """Builds and runs a batch of candidates, records their values"""
+        candidates = dict()
+        self.campaign.candidates = []
+        for config in batch:
+            flags = self.search.space.flags_of(config)
+            job = self.campaign.job(flags)
+            candidates[job['compiler_flags']] = (config, flags)
+            self.campaign.candidates.append(job)
+        self.tasks = []
+        self.jobs = []
+        self.expand()
+        scheduler.run(self.tasks)
+
+        for task in self.tasks:
+            if task.kind != 'run':
+                continue
+            config, flags = candidates[task.job['compiler_flags']]
+            value = None
+            if task.status == 'done':
+                value = task.result['value']
+            else:
+                self.logger.warning('Candidate "%s" failed: %s' %
+                                    (flags, task.error))
+            self.search.tell(config, self.campaign.score(value))
+            entry = {'flags': flags, 'config': list(config), 'value': value,
+                     'job': task.name, 'elapsed': task.elapsed}
+            with open(self.evaluations, 'a') as evaluations:
+                evaluations.write(json.dumps(entry) + '\n')
+            self.telemetry.emit(self.campaign.name, 'candidate', **entry)
+            self.logger.info('Candidate "%s": %s' % (flags, value))
+
+        # Only the results are kept, builds are big
+        if not self.args.keep_builds:
+            for task in self.tasks:
+                if task.kind == 'build':
+                    shutil.rmtree(os.path.join(self.root_path, 'builds',
+                                               task.name), ignore_errors=True)
+
+    def _report(self, elapsed, reason):
+        ranked = sorted([(score, flags) for flags, score
+                         in self.search.scores.items() if score is not None],
+                        reverse=True)
+        baseline = self.search.scores.get('')
+        summary = {
+            'tuning': self.campaign.name,
+            'objective': {'metric': self.campaign.metric,
+                          'stream': self.campaign.stream,
+                          'goal': self.campaign.goal},
+            'strategy': self.campaign.strategy,
+            'evaluations': self.search.evaluated(),
+            'invalid': len([s for s in self.search.scores.values()
+                            if s is None]),
+            'elapsed': elapsed,
+            'stopped': reason,
+            'baseline': self.campaign.value(baseline),
+            'ranking': [{'flags': flags, 'value': self.campaign.value(score)}
+                        for score, flags in ranked[:20]]
+        }
+        if ranked:
+            score, flags = ranked[0]
+            summary['best'] = {
+                'flags': flags,
+                'compiler_flags': self.campaign.job(flags)['compiler_flags'],
+                'value': self.campaign.value(score)
+            }
+            if baseline:
+                summary['best']['improvement'] = float('%0.2f' % (
+                    (score - baseline) / abs(baseline) * 100))
+        filename = os.path.join(self.root_path, 'tuning.yaml')
+        with open(filename, 'w') as stdout:
+            stdout.write(to_yaml(summary))
+        self.logger.info('Tuning summary at: %s' % filename)
+        return summary
+
+    ## DRIVER
+    def main(self):
+        """Evaluates batches of candidates until done or out of time"""
+
+        factory = MachineFactory(self.args.machine_type)
+        if not self.args.machine_type:
+            self.args.machine_type = factory.name
+        self.machine_model = factory.getMachine()
+
+        if os.path.exists(self.root_path) and not self.args.resume:
+            self.logger.info('Wiping %s' % self.root_path)
+            shutil.rmtree(self.root_path)
+        Path(self.root_path).mkdir(parents=True, exist_ok=True)
+
+        self.search = FlagSearch(self._space(), self.campaign.strategy,
+                                 self.campaign.seed)
+        self.logger.info('Flag space: %d configurations' %
+                         self.search.space.size())
+        if self.args.resume:
+            self._load()
+
+        self.jobs = [{'options': self.campaign.defaults}]
+        self._calibrate()
+        self._split_cores()
+        self.telemetry = Telemetry(self.args.events, self.args.metrics,
+                                   self.args.metrics_listen, self.logger)
+        if not self.args.no_archive:
+            self.archive = LogArchive(os.path.join(self.root_path, 'archive'))
+
+        jobs = self.args.build_jobs or max(1, len(self.build_cpus.split(',')))
+        scheduler = LocalScheduler(jobs=jobs, overlap=self.overlap,
+                                   logger=self.logger, on_done=self._record)
+
+        start = time.monotonic()
+        last = 0.0
+        limit = self.campaign.evaluations
+        while True:
+            elapsed = time.monotonic() - start
+            # Don't start a batch that would (likely) end after the budget
+            if elapsed + last > self.campaign.budget:
+                reason = 'budget'
+                break
+            count = self.campaign.batch
+            if limit:
+                count = min(count, limit - self.search.evaluated())
+                if count <= 0:
+                    reason = 'evaluations'
+                    break
+            batch = self.search.propose(count)
+            if not batch:
+                reason = 'exhausted'
+                break
+            self.logger.info(' ++ Evaluating %d candidates (%d so far) ++' %
+                             (len(batch), self.search.evaluated()))
+            before = time.monotonic()
+            self._evaluate(batch, scheduler)
+            last = time.monotonic() - before
+
+        summary = self._report(time.monotonic() - start, reason)
+        self.telemetry.close()
+
+        success = 'best' in summary
+        if success:
+            self.logger.info('Best flags: "%s" (%s = %s)' % (
+                summary['best']['flags'], self.campaign.metric,
+                summary['best']['value']))
+        else:
+            self.logger.error('No valid candidate')
+        if (self.logger.silent()):
+            print("PASS" if success else "FAIL")
+        return success
+
+
+if __name__ == '__main__':
+    """Point of entry for flag autotuning"""
+    parser = argparse.ArgumentParser(description='Benchmark Harness Autotuning')
+
+    parser.add_argument('campaign_file', type=str, metavar='tuning_file',
+                        help='The YAML file describing the tuning')
+    parser.add_argument('--machine_type', type=str,
+                        help='The type of the machine to tune on')
+    parser.add_argument('--root-path', type=str, default='./runs',
+                        help='The root directory for the tuning tree')
+    parser.add_argument('--resume', action='store_true',
+                        help='Carry on a previous tuning, skipping evaluated flags')
+    parser.add_argument('--keep-builds', action='store_true',
+                        help='Keep the build trees of all candidates')
+    parser.add_argument('--build-jobs', type=int,
+                        help='Number of parallel builds (default: spare cores)')
+    parser.add_argument('--output-format', choices=Serializer.formats,
+                        default='yaml',
+                        help='Format of the results, statistics and manifests')
+    parser.add_argument('--no-archive', action='store_true',
+                        help='Do not archive raw outputs in <tuning>/archive')
+    parser.add_argument('--no-build-metrics', action='store_true',
+                        help='Do not measure compile time, memory and binary sizes')
+    parser.add_argument('--sample-interval', type=float, default=0,
+                        help='Seconds between samples of frequency, ' +
+                             'temperature and memory while measuring ' +
+                             '(ex. 0.2, default 0: off)')
+    parser.add_argument('--discard-throttled', action='store_true',
+                        help='Leave throttled iterations out of the results')
+    parser.add_argument('--roi', action='store_true',
+                        help="Only count the model's region of interest " +
+                             "(roi- counters), not the whole process")
+    parser.add_argument('--no-calibration', action='store_true',
+                        help='Measure on core 2 and the topology order, ' +
+                             'without ranking the cores by noise')
+    parser.add_argument('--recalibrate', action='store_true',
+                        help='Rank the cores by noise again, even if ' +
+                             'already done since boot')
+    parser.add_argument('--events', type=str,
+                        help='Stream JSON events to a file, unix:PATH or ' +
+                             'tcp:HOST:PORT')
+    parser.add_argument('--metrics', type=str,
+                        help='Keep OpenMetrics (Prometheus) text in this file')
+    parser.add_argument('--metrics-listen', type=str,
+                        help='Serve OpenMetrics on [HOST:]PORT/metrics ' +
+                             '(default host: 127.0.0.1)')
+    parser.add_argument('-v', '--verbose', action='count', default=0,
+                        help='The verbosity of logging output')
+    args = parser.parse_args()
+
+    controller = AutotuneController(parser, args)
+    success = controller.main()
+    if not success:
+        sys.exit(1)
@@ -15,12 +15,25 @@ import argparse
 import subprocess
 import re
 import importlib
+import functools
+import time
+import cProfile
+import pstats
+import hashlib
 from pathlib import Path
 import shutil
 
 from helper.BenchmarkLogger import BenchmarkLogger
 from helper.Manifest import Manifest
 from helper.SimpleStats import SimpleStats
+from helper.Checkpoint import Checkpoint
+from helper.Telemetry import Telemetry
+from helper.PhaseTimer import PhaseTimer
+from helper.LogArchive import LogArchive
+from helper.Serializer import Serializer
+from helper.BuildMetrics import BuildMetrics
+from helper.DiskCache import DiskCache
+from helper.Fetcher import Fetcher, split_checksum
 
 from models.compilers.CompilerFactory import CompilerFactory
 from models.benchmarks.BenchmarkFactory import BenchmarkFactory
@@ -28,12 +41,28 @@ from models.machines.MachineFactory import MachineFactory
 
 from executor.Execute import Execute
 from executor.LinuxPerf import LinuxPerf
-from executor.CompletedProcessList import CompletedProcessList
+from executor.SystemSampler import SystemSampler
+from executor.PerfROI import PerfROI
+from executor.ResultsTable import ResultsTable
+
+def stage(name):
+    """Times and reports the start/stop (or failure) of a controller stage"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            self.current_stage = name
+            with self.telemetry.stage(self.run_id, name), \
+                 self.timer.phase(name):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
 
 class BenchmarkController(object):
     """Point of entry of the benchmark harness application"""
 
-    def __init__(self, argparse_parser, argparse_args):
+    def __init__(self, argparse_parser, argparse_args,
+                 machine_model=None, compiler_model=None, telemetry=None,
+                 archive=None):
         self.parser = argparse_parser
         self.args = argparse_args
         self.root_path = os.getcwd()
@@ -44,6 +73,45 @@ class BenchmarkController(object):
         self.unique_root_path = os.path.join(self.args.root_path,
                                              self.args.unique_id)
         self.logger.info('Unique root path: %s' % self.unique_root_path)
+        self.results_path = os.path.join(self.unique_root_path, 'results')
+
+        # Models already loaded by the caller (ex. campaigns) are reused
+        self.machine_model = machine_model
+        self.compiler_model = compiler_model
+        # CPU list (taskset -c) for non-measurement commands, None for all
+        self.build_cpus = None
+
+        # Stage checkpoints, to resume interrupted runs
+        self.checkpoint = None
+        self.stage_hash = dict()
+
+        # Compile time, memory and binary sizes of the build
+        self.build_metrics = None
+
+        # Raw outputs of all commands, kept across runs (shared if passed)
+        self.current_stage = None
+        self.archive = archive
+        if not self.archive and not self.args.no_archive:
+            self.archive = LogArchive(self.args.archive or
+                                      os.path.join(self.args.root_path,
+                                                   'archive'))
+
+        # Frequency, temperature and memory while measuring, per iteration
+        self.sampler = None
+        if self.args.sample_interval:
+            self.sampler = SystemSampler(self.args.sample_interval,
+                                         tolerance=self.args.throttle_tolerance)
+        self.samples = []
+
+        # Harness overhead: time of each phase, minus its commands'
+        self.timer = PhaseTimer()
+
+        # Live events/metrics, shared with the caller if passed (campaigns)
+        self.run_id = self.args.unique_id
+        self.telemetry = telemetry
+        if not self.telemetry:
+            self.telemetry = Telemetry(self.args.events, self.args.metrics,
+                                       self.args.metrics_listen, self.logger)
 
         self.logger.info('Benchmark Controller initialised')
 
@@ -70,10 +138,13 @@ class BenchmarkController(object):
             self.logger.info('Wiping %s' % self.unique_root_path)
             shutil.rmtree(self.unique_root_path)
 
-        # Create the root path + results
+        self._make_paths()
+
+    def _make_paths(self):
+        """Create the root path + results"""
+
         Path(self.unique_root_path).mkdir(parents=True, exist_ok=True)
-        self.results_path = os.path.join(self.unique_root_path, 'results')
-        os.mkdir(self.results_path)
+        Path(self.results_path).mkdir(parents=True, exist_ok=True)
         self.logger.debug('Results path: %s' % self.results_path)
 
     def _load_models(self):
@@ -82,20 +153,25 @@ class BenchmarkController(object):
         try:
             # The benchmark is the only mandatory argument
             self.logger.debug('Benchmark model for %s' % self.args.benchmark_name)
-            self.benchmark_model = BenchmarkFactory(self.args.benchmark_name,
-                                                    self.unique_root_path).getBenchmark()
+            with self.timer.phase('benchmark_model'):
+                self.benchmark_model = BenchmarkFactory(self.args.benchmark_name,
+                                                        self.unique_root_path).getBenchmark()
             self.logger.info('Benchmark model loaded')
 
             # Machine can be autodetected (if passed None to machine_type)
-            self.machine_model = MachineFactory(self.args.machine_type).getMachine()
+            if not self.machine_model:
+                with self.timer.phase('machine_model'):
+                    self.machine_model = MachineFactory(self.args.machine_type).getMachine()
             if not self.args.machine_type:
                 self.args.machine_type = self.machine_model.arch
             self.logger.debug('Machine model for %s' % self.args.machine_type)
             self.logger.info('Machine model loaded')
 
             # Compiler can be autodetected (if passed None to toolchain)
-            self.compiler_model = CompilerFactory(self.args.toolchain,
-                                                  self.unique_root_path).getCompiler()
+            if not self.compiler_model:
+                with self.timer.phase('compiler_model'):
+                    self.compiler_model = CompilerFactory(self.args.toolchain,
+                                                          self.unique_root_path).getCompiler()
             if not self.args.toolchain:
                 self.args.toolchain = self.compiler_model.name
             self.logger.debug('Compiler model for %s' % self.args.toolchain)
@@ -104,30 +180,89 @@ class BenchmarkController(object):
             self.logger.error(err, True)
             raise
 
-    def _run_all(self, list_of_commands, perf=False):
+    def _get_env(self):
+        """Process environment plus the benchmark's own variables"""
+
+        env = dict(os.environ)
+        env.update(self.benchmark_model.env)
+        return env
+
+    def _run_all(self, list_of_commands, perf=False, previous=None,
+                 on_result=None):
         """Runs and collects output results"""
         # TODO: We should add support for make and test parser plugins, too
 
-        # Group all results in a single list object
-        results = CompletedProcessList()
+        # Group all results in a single table
+        results = ResultsTable()
+
+        # Results from a previous (resumed) execution come first
+        for result in previous or []:
+            results.append(result)
+        total = len(results) + len(list_of_commands)
 
+        roi = None
         if perf:
             self.logger.debug('Executing with Linux Perf engine')
+            if self.args.roi:
+                roi = PerfROI.from_model(self.benchmark_model.roi)
             executor = LinuxPerf(plugin=self.benchmark_model.get_plugin(),
                                  affinity=self.machine_model.affinity,
-                                 logger=self.logger)
+                                 logger=self.logger,
+                                 env=self._get_env(),
+                                 sampler=self.sampler,
+                                 roi=roi,
+                                 core=self.machine_model.measure_core)
         else:
-            executor = Execute(logger=self.logger)
+            executor = Execute(logger=self.logger, env=self._get_env())
+        try:
+            return self._run_cmds(executor, list_of_commands, results, total,
+                                  perf, on_result)
+        finally:
+            if roi:
+                roi.close()
+
+    def _run_cmds(self, executor, list_of_commands, results, total, perf,
+                  on_result):
+        """Runs the commands with the executor, adding to the results"""
 
         for cmd in list_of_commands:
             if not cmd:
                 self.logger.debug('Empty command, ignoring')
                 continue
 
+            # Keep builds away from the cores reserved for measurements
+            if not perf and self.build_cpus:
+                cmd = [shutil.which('taskset'), '-c', self.build_cpus] + cmd
+
             # Executes command, captures results
             self.logger.info('Running command : ' + str(cmd))
+            start = time.monotonic()
             result = executor.run(cmd)
+            elapsed = time.monotonic() - start
             results.append(result)
+            if self.archive:
+                self.archive.add(cmd, result.returncode,
+                                 getattr(result, 'raw_stdout', ''),
+                                 getattr(result, 'raw_stderr', ''),
+                                 run=self.run_id,
+                                 benchmark=self.args.benchmark_name,
+                                 machine=self.args.machine_type,
+                                 toolchain=self.args.toolchain,
+                                 stage=self.current_stage)
+            self.timer.command(cmd, elapsed, getattr(result, 'parse_time', 0.0))
+            self.telemetry.command(self.run_id, cmd, result.returncode, elapsed)
+            if perf:
+                for sample in getattr(result, 'samples', []):
+                    self.samples.append(dict(iteration=len(results), **sample))
+                values = dict()
+                for output in [result.stdout, result.stderr]:
+                    if isinstance(output, dict):
+                        values.update(output)
+                values.pop('_name', None)
+                self.telemetry.result(self.run_id, len(results), total,
+                                      values, elapsed)
+            if on_result:
+                on_result(result)
 
         return results
 
@@ -152,8 +287,8 @@ class BenchmarkController(object):
     def _validate(self, result):
         """Validate the already parsed benchmark results"""
 
-        if result and not isinstance(result, CompletedProcessList):
-            raise TypeError('result should be a list')
+        if not isinstance(result, ResultsTable):
+            raise TypeError('result should be a results table')
         if result[0].stdout and not isinstance(result[0].stdout, dict):
             raise TypeError('result element should be a dict')
 
@@ -168,8 +303,8 @@ class BenchmarkController(object):
     def _output_logs(self, result):
         """Print out the results"""
 
-        if result and not isinstance(result, CompletedProcessList):
-            raise TypeError('result should be a list')
+        if not isinstance(result, ResultsTable):
+            raise TypeError('result should be a results table')
         if result[0].stdout and not isinstance(result[0].stdout, dict):
             raise TypeError('result element should be a dict')
         if result[0].stderr and not isinstance(result[0].stderr, dict):
@@ -177,68 +312,305 @@ class BenchmarkController(object):
 
         # Print both stdout and stderr
         base_path = self.results_path + '/' + self.logname
-        with open(base_path + '.out', 'w') as stdout:
-            stdout.write(result.stdout())
-            stdout.close()
-        with open(base_path + '.err', 'w') as stderr:
-            stderr.write(result.stderr())
-            stderr.close()
-        self.logger.info('Output logs at: %s.out'      % base_path)
-        self.logger.info(' Error logs at: %s.err'      % base_path)
+        serializer = Serializer(self.args.output_format)
+        with self.timer.phase('logs'):
+            out = serializer.dump_rows(result.rows('out'), base_path + '.out')
+            err = serializer.dump_rows(result.rows('err'), base_path + '.err')
+        self.logger.info('Output logs at: %s' % out)
+        self.logger.info(' Error logs at: %s' % err)
+
+        # System samples (frequency, temperature, memory) of all iterations
+        if self.samples:
+            filename = serializer.dump_rows(self.samples, base_path + '.samples')
+            self.logger.info('Sample logs at: %s' % filename)
+
+        # Build time, memory and binary sizes
+        build = None
+        if self.build_metrics:
+            with self.timer.phase('build-metrics'):
+                build = self.build_metrics.table(
+                            self.benchmark_model.root_path,
+                            self.benchmark_model.executables)
+                if len(build):
+                    filename = serializer.dump_rows(build.rows('out'),
+                                                    base_path + '.build')
+                    self.logger.info(' Build logs at: %s' % filename)
 
         # Dump the manifest
-        manifest = Manifest(self.benchmark_model,
-                            self.compiler_model,
-                            self.machine_model,
-                            self.args, os.environ)
-        manifest.dump(base_path + ".manifest")
-        self.logger.info('   Manifest at: %s.manifest' % base_path)
+        with self.timer.phase('manifest'):
+            if not self.benchmark_model.build_recipe:
+                self._build_phases()
+            manifest = Manifest(self.benchmark_model,
+                                self.compiler_model,
+                                self.machine_model,
+                                self.args, self._get_env())
+            filename = manifest.dump(base_path + ".manifest", serializer)
+        self.logger.info('   Manifest at: %s' % filename)
 
         # Collect all data and dump simple statistics
         if len(result) > 1:
-            stats = SimpleStats(result)
-            stats.dump(base_path + ".stats")
-            self.logger.info(' Statistics at: %s.stats'    % base_path)
+            with self.timer.phase('stats'):
+                stats = SimpleStats(result, build)
+                filename = stats.dump(base_path + ".stats", serializer)
+            self.logger.info(' Statistics at: %s' % filename)
 
-    def main(self):
-        """Main driver - downloads, unzip, compile, run, collect results"""
+        # Harness overhead so far (collect itself is still running)
+        self.timer.dump(base_path + ".phases")
+        self.logger.info('     Phases at: %s.phases'   % base_path)
+
+    def _output_profile(self, profiler):
+        """Dumps the harness' own profile (pstats and a text summary)"""
 
-        self._clean_path()
+        base_path = self.results_path + '/' + self.logname
+        profiler.dump_stats(base_path + '.pstats')
+        with open(base_path + '.profile', 'w') as profile:
+            stats = pstats.Stats(profiler, stream=profile)
+            stats.sort_stats('cumulative').print_stats(50)
+        self.logger.info('    Profile at: %s.pstats'   % base_path)
+
+    @stage('setup')
+    def setup(self, clean=True):
+        """Creates the paths and loads all models"""
+
+        if self.args.resume and not os.path.exists(self.unique_root_path):
+            self.logger.warning('Nothing to resume at %s, starting afresh' %
+                                self.unique_root_path)
+        if clean and not self.args.resume:
+            self._clean_path()
+        else:
+            self._make_paths()
+        self.checkpoint = Checkpoint(self.unique_root_path)
+        if not self.args.no_build_metrics:
+            self.build_metrics = BuildMetrics(os.path.join(
+                                 self.unique_root_path, 'build.jsonl'))
 
         self.logger.info(' ++ Loading Models (compiler/bench/machine) ++')
         self._load_models()
 
         self.logger.info(' ++ Preparing Environment ++')
         self._make_unique_name()
+        self.telemetry.labels(self.run_id,
+                              benchmark=self.args.benchmark_name,
+                              machine=self.args.machine_type,
+                              toolchain=self.args.toolchain)
+
+    @stage('calibrate')
+    def calibrate(self):
+        """Ranks the cores by noise (once per boot), to measure on the
+           quietest ones"""
+
+        # Shared machine models (ex. campaigns) are calibrated by the caller
+        if self.args.no_calibration or self.machine_model.calibration:
+            return
+        self.logger.info(' ++ Calibrating Cores ++')
+        try:
+            self.machine_model.calibrate(self.args.recalibrate, self.logger)
+        except RuntimeError as err:
+            self.logger.error(err)
+            raise
+
+    @stage('prepare')
+    def prepare(self, fetch=True):
+        """Prepares the benchmark model, fetching the sources if requested"""
 
         self.logger.info(' ++ Preparing Benchmark Build ++')
-        res = self._run_all(self.benchmark_model.prepare(self.machine_model,
-                                                         self.compiler_model,
-                                                         self.args.iterations,
-                                                         self.args.size,
-                                                         self.args.threads))
+        cmds = self.benchmark_model.prepare(self.machine_model,
+                                            self.compiler_model,
+                                            self.args.iterations,
+                                            self.args.size,
+                                            self.args.threads)
+        # Sources may have been fetched already (ex. shared by campaigns)
+        if not fetch:
+            return
+
+        inputs = self.checkpoint.hash(cmds, self.benchmark_model.downloads,
+                                      self.args.size, self.args.threads,
+                                      self.compiler_model.cc_name,
+                                      self.compiler_model.version)
+        self.stage_hash['prepare'] = inputs
+        if self.args.resume and self.checkpoint.completed('prepare', inputs):
+            self.logger.info('Benchmark already prepared, skipping')
+            return
+
+        # An interrupted attempt may have left a partial checkout behind
+        self.checkpoint.start('prepare', inputs)
+        if os.path.exists(self.benchmark_model.root_path):
+            shutil.rmtree(self.benchmark_model.root_path)
+        self._fetch(self.benchmark_model.downloads)
+        res = self._run_all(cmds)
         self._check_results(res, public=True)
+        self.checkpoint.complete('prepare', inputs)
+
+    def _fetch(self, downloads):
+        """Downloads the model's files concurrently, to the shared cache
+           (resumable, and reused by later runs), then copies them over"""
+        if not downloads:
+            return
+        cache = DiskCache('downloads').path
+        fetches = []
+        for download in downloads:
+            url = split_checksum(download[0])[0]
+            target = os.path.join(self.benchmark_model.root_path, download[1])
+            # Local mirrors may change, they're copied every time
+            if re.match('https?://', url):
+                if not (download[2:] and download[2]) and \
+                   not split_checksum(download[0])[1]:
+                    self.logger.warning('No checksum for %s, not verified' %
+                                        url)
+                key = hashlib.sha1(url.encode('utf-8')).hexdigest()[:16]
+                target = os.path.join(cache, key, os.path.basename(target))
+            fetches.append((download[0], target) + tuple(download[2:]))
+        fetcher = Fetcher(logger=self.logger)
+        try:
+            cached = fetcher.fetch_all(fetches)
+        except RuntimeError as err:
+            self.logger.error(err)
+            raise
+        finally:
+            fetcher.close()
+        for filename, download in zip(cached, downloads):
+            target = os.path.join(self.benchmark_model.root_path, download[1])
+            if filename != target:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.copyfile(filename, target)
+            self.logger.debug('Fetched %s' % target)
+
+    def _build_phases(self):
+        """Build phases of the build mode, also recorded in the manifest
+           (even if the build was done by another controller)"""
 
-        self.logger.info(' ++ Building Benchmark ++')
         compiler_flags, linker_flags = self.compiler_model.get_flags()
         if self.args.compiler_flags:
             compiler_flags += " " + self.args.compiler_flags
         if self.args.linker_flags:
             linker_flags += " " + self.args.linker_flags
-        res = self._run_all(self.benchmark_model.build(compiler_flags,
-                                                       linker_flags))
-        self._check_results(res, public=True)
+        if self.build_metrics:
+            self.benchmark_model.compiler_wrapper = self.build_metrics.wrap
+        phases = self.benchmark_model.build_phases(
+                     self.args.build_mode, compiler_flags, linker_flags,
+                     os.path.join(self.unique_root_path, 'profile'),
+                     self.args.run_flags)
+        self.benchmark_model.build_recipe = [{'phase': name, 'commands': cmds}
+                                             for name, cmds in phases]
+        return phases
+
+    @stage('build')
+    def build(self):
+        """Builds the benchmark with the compiler and extra flags"""
+
+        self.logger.info(' ++ Building Benchmark ++')
+        phases = self._build_phases()
+
+        inputs = self.checkpoint.hash(self.stage_hash.get('prepare'),
+                                      self.benchmark_model.build_recipe)
+        self.stage_hash['build'] = inputs
+        if self.args.resume and self.checkpoint.completed('build', inputs):
+            self.logger.info('Benchmark already built, skipping')
+            return
+
+        # Objects from a build with different inputs are stale
+        if self.args.resume and self.checkpoint.done.get('build'):
+            self.logger.info('Build inputs changed, rebuilding everything')
+            phases = [(name, [cmd[:1] + ['-B'] + cmd[1:]
+                              if cmd[0] == 'make' and '-B' not in cmd else cmd
+                              for cmd in cmds]) for name, cmds in phases]
+
+        self.checkpoint.start('build', inputs)
+        if self.build_metrics:
+            self.build_metrics.start()
+        start = time.monotonic()
+        for name, cmds in phases:
+            if not cmds:
+                continue
+            if len(phases) > 1:
+                self.logger.info(' ++ Build phase: %s ++' % name)
+            with self.timer.phase(name):
+                res = self._run_all(cmds)
+            self._check_results(res, public=True)
+        if self.build_metrics:
+            self.build_metrics.stop(time.monotonic() - start)
+        self.checkpoint.complete('build', inputs)
+
+    @stage('run')
+    def run(self):
+        """Runs the benchmark, returning the parsed results"""
 
         self.logger.info(' ++ Running Benchmark ++')
-        res = self._run_all(self.benchmark_model.run(self.args.run_flags),
-                               perf=True)
+        cmds = self.benchmark_model.run(self.args.run_flags)
+
+        # The number of iterations is not an input, resuming can add more
+        unique = []
+        for cmd in cmds:
+            if cmd not in unique:
+                unique.append(cmd)
+        inputs = self.checkpoint.hash(self.stage_hash.get('build'), unique)
+
+        previous = []
+        if self.args.resume and self.checkpoint.completed('run', inputs):
+            previous = self.checkpoint.results()[:len(cmds)]
+            self.logger.info('Resuming after %d completed runs' % len(previous))
+        else:
+            self.checkpoint.start('run', inputs)
+        self.telemetry.progress(self.run_id, len(previous), len(cmds))
+
+        # Only checkpoint while all runs succeed, resuming is by position
+        failed = []
+        def checkpoint(result):
+            if result.returncode:
+                failed.append(result)
+            if not failed:
+                self.checkpoint.append(result)
+
+        res = self._run_all(cmds[len(previous):], perf=True,
+                            previous=previous, on_result=checkpoint)
         self._check_results(res, public=False)
+        return res
+
+    @stage('collect')
+    def collect(self, res):
+        """Validates and dumps results, returns the validation status"""
+
+        throttled = len([v for v in res.column('throttled', 'err') if v])
+        if throttled:
+            self.logger.warning('%d of %d iterations were throttled' %
+                                (throttled, len(res)))
+            if self.args.discard_throttled:
+                res = res.discard('throttled', 'err')
+                if not len(res):
+                    raise RuntimeError('All iterations were throttled')
 
         self.logger.info(' ++ Validating Results ++')
-        valid = self._validate(res)
+        with self.timer.phase('validate'):
+            valid = self._validate(res)
+        if not valid:
+            self.telemetry.failure(self.run_id, 'Validation failed')
 
         self.logger.info(' ++ Collecting Results / Manifest ++')
         self._output_logs(res)
+        return valid
+
+    def main(self):
+        """Main driver - downloads, unzip, compile, run, collect results"""
+
+        # Profiles the harness process only, not the benchmark's
+        profiler = None
+        if self.args.profile_harness:
+            profiler = cProfile.Profile()
+            profiler.enable()
+
+        try:
+            self.setup()
+            self.calibrate()
+            self.prepare()
+            self.build()
+            res = self.run()
+            valid = self.collect(res)
+        finally:
+            if profiler:
+                profiler.disable()
+                if hasattr(self, 'logname'):
+                    self._output_profile(profiler)
+        self.telemetry.close()
 
         # Give "some" feedback if the log level is not high enough
         if (self.logger.silent()):
@@ -250,8 +622,18 @@ class BenchmarkController(object):
         return valid
 
 
-if __name__ == '__main__':
-    """This is the point of entry of our application, not much logic here"""
+class ToolchainAction(argparse.Action):
+    """Repeatable --toolchain: all of them in 'toolchains', the first one
+       in 'toolchain' (the one a single job builds with)"""
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        toolchains = list(getattr(namespace, 'toolchains', None) or [])
+        toolchains.append(values)
+        namespace.toolchains = toolchains
+        namespace.toolchain = toolchains[0]
+
+def argument_parser():
+    """Command line options, also used to build arguments for campaign jobs"""
     parser = argparse.ArgumentParser(description='Benchmark Harness')
 
     # Required argument: benchmark name (must have a model implemented)
@@ -261,8 +643,10 @@ if __name__ == '__main__':
     # Required, but auto-detected if omitted
     parser.add_argument('--machine_type', type=str,
                         help='The type of the machine to run the benchmark on')
-    parser.add_argument('--toolchain', type=str,
-                        help='The url/name of the toolchain to compile the benchmark')
+    parser.add_argument('--toolchain', type=str, action=ToolchainAction,
+                        help='The url/name of the toolchain to compile the ' +
+                             'benchmark (more than one to compare them)')
+    parser.set_defaults(toolchains=[])
 
     # Harness optionals
     parser.add_argument('--unique-id', type=str, default=str(os.getpid()),
@@ -277,18 +661,82 @@ if __name__ == '__main__':
                         help='Number of threads (OpenMP, multiple dispatch, MPI)')
     parser.add_argument('-v', '--verbose', action='count', default=0,
                         help='The verbosity of logging output')
+    parser.add_argument('--resume', action='store_true',
+                        help='Resume the run with the same --unique-id, ' +
+                             'skipping completed stages and iterations')
+    parser.add_argument('--archive', type=str,
+                        help='Archive of the raw outputs of all commands ' +
+                             '(default: <root-path>/archive)')
+    parser.add_argument('--no-archive', action='store_true',
+                        help='Do not archive raw outputs')
+    parser.add_argument('--output-format', choices=Serializer.formats,
+                        default='yaml',
+                        help='Format of the results, statistics and manifest')
+    parser.add_argument('--no-build-metrics', action='store_true',
+                        help='Do not measure compile time, memory and binary sizes')
+    parser.add_argument('--sample-interval', type=float, default=0,
+                        help='Seconds between samples of frequency, ' +
+                             'temperature and memory while measuring ' +
+                             '(ex. 0.2, default 0: off)')
+    parser.add_argument('--throttle-tolerance', type=float, default=0.05,
+                        help='Frequency drop (fraction of the highest seen) ' +
+                             'that marks an iteration as throttled')
+    parser.add_argument('--discard-throttled', action='store_true',
+                        help='Leave throttled iterations out of the results')
+    parser.add_argument('--roi', action='store_true',
+                        help="Only count the model's region of interest " +
+                             "(roi- counters), not the whole process")
+    parser.add_argument('--no-calibration', action='store_true',
+                        help='Measure on core 2 and the topology order, ' +
+                             'without ranking the cores by noise')
+    parser.add_argument('--recalibrate', action='store_true',
+                        help='Rank the cores by noise again, even if ' +
+                             'already done since boot')
+    parser.add_argument('--profile-harness', action='store_true',
+                        help='Profile the harness itself (cProfile), saved ' +
+                             'with the results')
+    parser.add_argument('--events', type=str,
+                        help='Stream JSON events to a file, unix:PATH or ' +
+                             'tcp:HOST:PORT')
+    parser.add_argument('--metrics', type=str,
+                        help='Keep OpenMetrics (Prometheus) text in this file')
+    parser.add_argument('--metrics-listen', type=str,
+                        help='Serve OpenMetrics on [HOST:]PORT/metrics ' +
+                             '(default host: 127.0.0.1)')
+
+    # Toolchain comparisons (more than one --toolchain)
+    parser.add_argument('--order', choices=['interleaved', 'random'],
+                        default='interleaved',
+                        help='Order of the toolchains in each round of runs')
+    parser.add_argument('--seed', type=int,
+                        help='Random seed of the random order')
+    parser.add_argument('--confidence', type=float, default=0.95,
+                        help='Confidence level of the paired comparison')
 
     # Extra build/run flags
+    parser.add_argument('--build-mode', type=str, default='default',
+                        help='Build pipeline: default, lto, thinlto, pgo, ' +
+                             'pgo+lto... (as supported by the compiler)')
     parser.add_argument('--compiler-flags', type=str, default='',
                         help='The extra compiler flags')
     parser.add_argument('--linker-flags', type=str, default='',
                         help='The extra linker flags')
     parser.add_argument('--run-flags', type=str, default='',
                         help='The benchmark execution options')
+    return parser
+
+
+if __name__ == '__main__':
+    """This is the point of entry of our application, not much logic here"""
+    parser = argument_parser()
     args = parser.parse_args()
 
     # Start the controller
-    controller = BenchmarkController(parser, args)
+    if len(args.toolchains) > 1:
+        from compare_controller import CompareController
+        controller = CompareController(parser, args)
+    else:
+        controller = BenchmarkController(parser, args)
     success = controller.main()
     if not success:
         sys.exit(1)
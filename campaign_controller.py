@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+    Campaign Controller
+    Runs a whole campaign file (benchmarks x toolchains x flags x sizes x
+    threads) in a single invocation. The matrix is expanded into a job graph
+    where every toolchain is fetched once, every benchmark is fetched once,
+    every distinct build is done once (in parallel) and every measurement
+    runs on its own, on cores that builds are not allowed to use.
+
+    All results are collected in a single tree:
+      <root>/<campaign>/results/<job>/...    per-job results, as the controller
+      <root>/<campaign>/campaign.yaml        summary of all jobs
+
+    Usage: campaign_controller.py --usage
+"""
+
+import sys
+import os
+import argparse
+import shutil
+import yaml
+from pathlib import Path
+
+from helper.BenchmarkLogger import BenchmarkLogger
+from helper.Campaign import Campaign
+from helper.DiskCache import DiskCache
+from helper.Telemetry import Telemetry
+from helper.LogArchive import LogArchive
+from helper.Serializer import Serializer
+
+from models.compilers.CompilerFactory import CompilerFactory
+from models.benchmarks.BenchmarkFactory import BenchmarkFactory
+from models.machines.MachineFactory import MachineFactory
+
+from executor.Scheduler import Task, LocalScheduler
+
+from benchmark_controller import BenchmarkController, argument_parser
+
+class CampaignController(object):
+    """Expands a campaign into a job graph and runs it"""
+
+    # Loads the jobs file (campaign or tuning)
+    campaign_class = Campaign
+
+    def __init__(self, argparse_parser, argparse_args):
+        self.parser = argparse_parser
+        self.args = argparse_args
+        self.logger = BenchmarkLogger(__name__, self.parser,
+                                      self.args.verbose)
+
+        self.campaign = self.campaign_class(self.args.campaign_file)
+        self.root_path = os.path.join(self.args.root_path, self.campaign.name)
+        self.logger.info('Campaign root path: %s' % self.root_path)
+
+        # Previous durations, to estimate how long the campaign will take
+        self.history = DiskCache('history')
+        # Live events/metrics of all tasks, created when running
+        self.telemetry = None
+        # Raw outputs of all tasks, in the campaign tree
+        self.archive = None
+
+        self.machine_model = None
+        self.compilers = dict()
+        self.tasks = []
+        self.jobs = []
+
+    ## JOB GRAPH
+    def _job_args(self, job, root_path, unique_id):
+        """Controller arguments for a campaign job"""
+        # The job's own machine type (ex. a coordinator's), else this one's
+        job = dict(job, machine_type=job.get('machine_type') or
+                   self.args.machine_type)
+        argv = Campaign.argv(job, root_path, unique_id)
+        argv.extend(['-v'] * self.args.verbose)
+        if self.args.no_archive:
+            argv.append('--no-archive')
+        if self.args.no_build_metrics:
+            argv.append('--no-build-metrics')
+        argv.append('--output-format=%s' % self.args.output_format)
+        argv.append('--sample-interval=%s' % self.args.sample_interval)
+        if self.args.discard_throttled:
+            argv.append('--discard-throttled')
+        if self.args.roi:
+            argv.append('--roi')
+        if self.args.no_calibration:
+            argv.append('--no-calibration')
+        parser = argument_parser()
+        return parser, parser.parse_args(argv)
+
+    def _history_key(self, kind, job):
+        keys = {
+            'toolchain': ['toolchain'],
+            'sources': ['benchmark'],
+            'build': ['benchmark', 'toolchain', 'compiler_flags',
+                      'linker_flags', 'build_mode', 'size', 'threads'],
+            'run': ['benchmark', 'toolchain', 'compiler_flags', 'build_mode',
+                    'size', 'threads', 'run_flags']
+        }
+        values = [kind, self.args.machine_type or '']
+        values.extend([str(job.get(k)) for k in keys[kind]])
+        return ':'.join(values)
+
+    def _estimate(self, kind, job):
+        """Average of previous durations (runs are per iteration)"""
+        durations = self.history.get(self._history_key(kind, job))
+        if not durations:
+            return None
+        estimate = sum(durations) / len(durations)
+        if kind == 'run':
+            estimate *= job.get('iterations') or 1
+        return estimate
+
+    def _record(self, task):
+        """Stores the task's duration in the history"""
+        if task.status != 'done':
+            return
+        elapsed = task.elapsed
+        if task.kind == 'run':
+            elapsed /= task.job.get('iterations') or 1
+        key = self._history_key(task.kind, task.job)
+        durations = (self.history.get(key) or []) + [elapsed]
+        try:
+            self.history.set(key, durations[-10:])
+        except OSError as err:
+            self.logger.warning('Cannot save history: %s' % err)
+
+    def _task(self, kind, name, action, job, deps=None, exclusive=False):
+        task = Task(name, action, deps, exclusive,
+                    self._estimate(kind, job))
+        task.kind = kind
+        task.job = job
+        self.tasks.append(task)
+        return task
+
+    def expand(self):
+        """Creates the task graph, sharing toolchains, sources and builds"""
+        toolchains = dict()
+        sources = dict()
+        builds = dict()
+
+        for job in self.campaign.jobs():
+            # Other machines' jobs are for the multi-node coordinator
+            if job.get('machine_type') and self.args.machine_type and \
+               job['machine_type'] != self.args.machine_type:
+                self.logger.warning('Ignoring job for machine %s' %
+                                    job['machine_type'])
+                continue
+            bench = job['benchmark']
+            toolchain = job.get('toolchain')
+
+            # Toolchains: fetched/identified once per campaign
+            if toolchain not in toolchains:
+                name = self.campaign.identity('toolchain', job, ['toolchain'])
+                toolchains[toolchain] = self._task('toolchain', name,
+                    self._toolchain_action(toolchain, name), job)
+
+            # Sources: fetched once per benchmark
+            if bench not in sources:
+                name = self.campaign.identity(bench + '-sources', job,
+                                              ['benchmark'])
+                sources[bench] = self._task('sources', name,
+                    self._sources_action(job, name), job,
+                    [toolchains[toolchain]])
+
+            # Builds: once per set of options that change the binary
+            model = BenchmarkFactory(bench, self.root_path).getBenchmark()
+            build_keys = ['benchmark', 'machine_type', 'toolchain',
+                          'compiler_flags', 'linker_flags',
+                          'build_mode'] + model.build_options
+            build_name = self.campaign.identity(bench + '-build', job, build_keys)
+            if build_name not in builds:
+                builds[build_name] = self._task('build', build_name,
+                    self._build_action(job, build_name, sources[bench].name),
+                    job, [toolchains[toolchain], sources[bench]])
+
+            # Runs: one per job, exclusive
+            run_name = self.campaign.identity(bench + '-run', job, job.keys())
+            self._task('run', run_name,
+                       self._run_action(job, build_name, run_name),
+                       job, [builds[build_name]], exclusive=True)
+            self.jobs.append({'name': run_name, 'build': build_name,
+                              'options': job})
+
+    ## ACTIONS
+    def _toolchain_action(self, toolchain, name):
+        def action():
+            path = os.path.join(self.root_path, 'toolchains', name)
+            Path(path).mkdir(parents=True, exist_ok=True)
+            self.compilers[toolchain] = CompilerFactory(toolchain,
+                                                        path).getCompiler()
+        return action
+
+    def _controller(self, job, root, unique_id):
+        parser, args = self._job_args(job, os.path.join(self.root_path, root),
+                                      unique_id)
+        controller = BenchmarkController(parser, args,
+                                         machine_model=self.machine_model,
+                                         compiler_model=self.compilers[job.get('toolchain')],
+                                         telemetry=self.telemetry,
+                                         archive=self.archive)
+        controller.build_cpus = self.build_cpus
+        return controller
+
+    def _sources_action(self, job, name):
+        def action():
+            controller = self._controller(job, 'sources', name)
+            controller.setup()
+            controller.prepare()
+        return action
+
+    def _build_action(self, job, name, sources):
+        def action():
+            controller = self._controller(job, 'builds', name)
+            controller.setup()
+            # Pristine copy of the sources, builds happen in tree
+            source_path = os.path.join(self.root_path, 'sources', sources,
+                                       'benchmark')
+            shutil.copytree(source_path, controller.benchmark_model.root_path,
+                            symlinks=True)
+            controller.prepare(fetch=False)
+            controller.build()
+        return action
+
+    def _run_action(self, job, build, name):
+        def action():
+            controller = self._controller(job, 'builds', build)
+            controller.results_path = os.path.join(self.root_path, 'results',
+                                                   name)
+            controller.run_id = name
+            controller.setup(clean=False)
+            controller.prepare(fetch=False)
+            res = controller.run()
+            if not controller.collect(res):
+                raise RuntimeError('Validation failed for %s' % name)
+            return self._collected(controller, res)
+        return action
+
+    def _collected(self, controller, res):
+        """Result of a successful run task"""
+        return controller.results_path
+
+    ## CORES
+    def _calibrate(self):
+        """Ranks the cores by noise (once per boot), before any task runs"""
+        if self.args.no_calibration:
+            return
+        self.logger.info(' ++ Calibrating Cores ++')
+        self.machine_model.calibrate(self.args.recalibrate, self.logger)
+
+    def _split_cores(self):
+        """Reserves the measurement cores, builds get the rest"""
+        affinity = [c for c in self.machine_model.affinity if c]
+        threads = max([j['options'].get('threads') or 1 for j in self.jobs])
+
+        # Same choice as LinuxPerf: the measurement core for single
+        # threaded, else affinity
+        measure = [self.machine_model.measure_core] + affinity[:threads]
+        num_cpus = os.cpu_count() or 1
+        cpus = [c - 1 for c in range(1, num_cpus + 1) if c not in measure]
+        self.build_cpus = ','.join([str(c) for c in cpus])
+        self.overlap = bool(cpus)
+        self.logger.info('Build cores: %s' % (self.build_cpus or 'none'))
+
+    ## DRIVER
+    def plan(self):
+        """Prints the job graph with the estimated durations"""
+        ordered = LocalScheduler().order(self.tasks)
+        total = 0.0
+        unknown = 0
+        print('Campaign %s: %d jobs, %d tasks' % (self.campaign.name,
+                                                  len(self.jobs), len(ordered)))
+        for task in ordered:
+            if task.estimate is None:
+                estimate = '?'
+                unknown += 1
+            else:
+                estimate = '%.1fs' % task.estimate
+                total += task.estimate
+            deps = ', '.join([d.name for d in task.deps]) or '-'
+            lane = 'exclusive' if task.exclusive else 'parallel'
+            print('  %-10s %-40s %-10s %8s  <- %s' % (task.kind, task.name,
+                                                      lane, estimate, deps))
+        print('Estimated serial duration: %.1fs (%d tasks without history)' %
+              (total, unknown))
+
+    def _summary(self):
+        summary = {'campaign': self.campaign.name, 'jobs': []}
+        for task in self.tasks:
+            if task.kind != 'run':
+                continue
+            entry = {
+                'name': task.name,
+                'status': task.status,
+                'options': task.job,
+                'elapsed': task.elapsed
+            }
+            if task.status == 'done':
+                entry['results'] = task.result
+            if task.error:
+                entry['error'] = task.error
+            summary['jobs'].append(entry)
+        filename = os.path.join(self.root_path, 'campaign.yaml')
+        with open(filename, 'w') as stdout:
+            stdout.write(yaml.dump(summary, default_flow_style=False))
+        self.logger.info('Campaign summary at: %s' % filename)
+
+    def main(self):
+        """Expand, then plan or run the whole campaign"""
+
+        # Plans only need the machine's name (uname), not its model
+        factory = MachineFactory(self.args.machine_type)
+        if not self.args.machine_type:
+            self.args.machine_type = factory.name
+        if self.args.dry_run:
+            self.expand()
+            self.plan()
+            return True
+
+        self.machine_model = factory.getMachine()
+        self.expand()
+        if not self.jobs:
+            raise ValueError('No jobs for machine %s' % self.args.machine_type)
+
+        if os.path.exists(self.root_path):
+            self.logger.info('Wiping %s' % self.root_path)
+            shutil.rmtree(self.root_path)
+        Path(self.root_path).mkdir(parents=True)
+        self._calibrate()
+        self._split_cores()
+        self.telemetry = Telemetry(self.args.events, self.args.metrics,
+                                   self.args.metrics_listen, self.logger)
+        if not self.args.no_archive:
+            self.archive = LogArchive(os.path.join(self.root_path, 'archive'))
+
+        jobs = self.args.build_jobs or max(1, len(self.build_cpus.split(',')))
+        scheduler = LocalScheduler(jobs=jobs, overlap=self.overlap,
+                                   logger=self.logger, on_done=self._record)
+        success = scheduler.run(self.tasks)
+        self._summary()
+        self.telemetry.close()
+
+        if (self.logger.silent()):
+            print("PASS" if success else "FAIL")
+        return success
+
+
+if __name__ == '__main__':
+    """Point of entry for campaigns"""
+    parser = argparse.ArgumentParser(description='Benchmark Harness Campaigns')
+
+    parser.add_argument('campaign_file', type=str,
+                        help='The YAML file describing the campaign')
+    parser.add_argument('--machine_type', type=str,
+                        help='The type of the machine to run the campaign on')
+    parser.add_argument('--root-path', type=str, default='./runs',
+                        help='The root directory for the campaign tree')
+    parser.add_argument('--build-jobs', type=int,
+                        help='Number of parallel builds (default: spare cores)')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Only print the job graph and estimated duration')
+    parser.add_argument('--output-format', choices=Serializer.formats,
+                        default='yaml',
+                        help='Format of the results, statistics and manifests')
+    parser.add_argument('--no-archive', action='store_true',
+                        help='Do not archive raw outputs in <campaign>/archive')
+    parser.add_argument('--no-build-metrics', action='store_true',
+                        help='Do not measure compile time, memory and binary sizes')
+    parser.add_argument('--sample-interval', type=float, default=0,
+                        help='Seconds between samples of frequency, ' +
+                             'temperature and memory while measuring ' +
+                             '(ex. 0.2, default 0: off)')
+    parser.add_argument('--discard-throttled', action='store_true',
+                        help='Leave throttled iterations out of the results')
+    parser.add_argument('--roi', action='store_true',
+                        help="Only count the model's region of interest " +
+                             "(roi- counters), not the whole process")
+    parser.add_argument('--no-calibration', action='store_true',
+                        help='Measure on core 2 and the topology order, ' +
+                             'without ranking the cores by noise')
+    parser.add_argument('--recalibrate', action='store_true',
+                        help='Rank the cores by noise again, even if ' +
+                             'already done since boot')
+    parser.add_argument('--events', type=str,
+                        help='Stream JSON events to a file, unix:PATH or ' +
+                             'tcp:HOST:PORT')
+    parser.add_argument('--metrics', type=str,
+                        help='Keep OpenMetrics (Prometheus) text in this file')
+    parser.add_argument('--metrics-listen', type=str,
+                        help='Serve OpenMetrics on [HOST:]PORT/metrics ' +
+                             '(default host: 127.0.0.1)')
+    parser.add_argument('-v', '--verbose', action='count', default=0,
+                        help='The verbosity of logging output')
+    args = parser.parse_args()
+
+    controller = CampaignController(parser, args)
+    success = controller.main()
+    if not success:
+        sys.exit(1)
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+    Compare Controller
+    Compares toolchains on the same benchmark in a single job, used by the
+    benchmark controller when given more than one --toolchain:
+
+      benchmark_controller.py lulesh --toolchain=gcc --toolchain=clang
+
+    The sources are fetched once and copied into one build per toolchain,
+    built in parallel (on cores not used for measurements). Then the
+    iterations are run in rounds, one iteration of every toolchain per
+    round, in the same (ABAB...) or a random (--order=random) order, on the
+    same cores. So thermal and background drift affect all toolchains
+    alike, and pairs of iterations of the same round can be compared.
+
+    All results are collected in a single tree:
+      <root>/<unique-id>/sources/...             shared checkout
+      <root>/<unique-id>/<toolchain>/results/... per-toolchain results
+      <root>/<unique-id>/comparison.yaml         paired comparison against
+                                                 the first toolchain
+"""
+
+import os
+import re
+import random
+import shutil
+import argparse
+from pathlib import Path
+
+from helper.BenchmarkLogger import BenchmarkLogger
+from helper.PairedStats import PairedStats
+from helper.Telemetry import Telemetry
+from helper.LogArchive import LogArchive
+from helper.Serializer import to_yaml
+
+from models.machines.MachineFactory import MachineFactory
+
+from executor.ResultsTable import ResultsTable
+from executor.Scheduler import Task, LocalScheduler
+
+from benchmark_controller import BenchmarkController
+
+class CompareController(object):
+    """Builds a benchmark with many toolchains, runs them interleaved"""
+
+    def __init__(self, argparse_parser, argparse_args):
+        self.parser = argparse_parser
+        self.args = argparse_args
+        self.logger = BenchmarkLogger(__name__, self.parser,
+                                      self.args.verbose)
+
+        self.toolchains = list(self.args.toolchains)
+        if len(set(self.toolchains)) != len(self.toolchains):
+            raise ValueError('Toolchains to compare must be different')
+        self.root_path = os.path.join(self.args.root_path, self.args.unique_id)
+        self.logger.info('Comparison root path: %s' % self.root_path)
+
+        self.machine_model = None
+        self.telemetry = None
+        self.archive = None
+        # Toolchain -> controller (building and running it)
+        self.controllers = dict()
+
+    def _slug(self, toolchain):
+        """Directory name of a toolchain (and its position, to be unique)"""
+        name = toolchain.rsplit('/', 1)[-1][:24]
+        name = re.sub("[^a-zA-Z0-9_-]+", "", name).lower()
+        return '%d-%s' % (self.toolchains.index(toolchain), name)
+
+    def _controller(self, toolchain, unique_id):
+        args = argparse.Namespace(**vars(self.args))
+        args.root_path = self.root_path
+        args.unique_id = unique_id
+        args.toolchain = toolchain
+        args.toolchains = [toolchain]
+        controller = BenchmarkController(self.parser, args,
+                                         machine_model=self.machine_model,
+                                         telemetry=self.telemetry,
+                                         archive=self.archive)
+        controller.run_id = '%s-%s' % (self.args.unique_id, unique_id)
+        return controller
+
+    ## CORES
+    def _build_cpus(self):
+        """Cores not used for measurements (see LinuxPerf)"""
+        affinity = [c for c in self.machine_model.affinity if c]
+        measure = [self.machine_model.measure_core] + \
+                  affinity[:self.args.threads or 1]
+        num_cpus = os.cpu_count() or 1
+        cpus = [c - 1 for c in range(1, num_cpus + 1) if c not in measure]
+        return ','.join([str(c) for c in cpus])
+
+    ## ACTIONS
+    def _sources_action(self, toolchain):
+        def action():
+            controller = self._controller(toolchain, 'sources')
+            controller.setup()
+            controller.prepare()
+        return action
+
+    def _build_action(self, toolchain, build_cpus):
+        def action():
+            controller = self._controller(toolchain, self._slug(toolchain))
+            controller.build_cpus = build_cpus
+            controller.setup()
+            # Pristine copy of the sources, builds happen in tree
+            source_path = os.path.join(self.root_path, 'sources', 'benchmark')
+            shutil.copytree(source_path, controller.benchmark_model.root_path,
+                            symlinks=True)
+            controller.prepare(fetch=False)
+            controller.build()
+            self.controllers[toolchain] = controller
+        return action
+
+    def _rounds(self):
+        """Each toolchain's run commands, one round (iteration) at a time"""
+        commands = dict()
+        for toolchain, controller in self.controllers.items():
+            model = controller.benchmark_model
+            cmds = model.run(self.args.run_flags)
+            step = max(1, len(model.executables))
+            commands[toolchain] = [cmds[i:i + step]
+                                   for i in range(0, len(cmds), step)]
+        rounds = min([len(cmds) for cmds in commands.values()])
+
+        rng = random.Random(self.args.seed)
+        for number in range(rounds):
+            order = list(self.toolchains)
+            if self.args.order == 'random':
+                rng.shuffle(order)
+            yield number, [(toolchain, commands[toolchain][number])
+                           for toolchain in order]
+
+    def run(self):
+        """Runs all rounds, returns each toolchain's results table"""
+        results = dict([(toolchain, ResultsTable())
+                        for toolchain in self.toolchains])
+        rounds = list(self._rounds())
+        orders = []
+        for number, runs in rounds:
+            orders.append([self._slug(toolchain) for toolchain, _ in runs])
+            for toolchain, cmds in runs:
+                controller = self.controllers[toolchain]
+                controller.current_stage = 'run'
+                for result in controller._run_all(cmds, perf=True):
+                    results[toolchain].append(result)
+                self.telemetry.progress(controller.run_id, number + 1,
+                                        len(rounds))
+        return results, orders
+
+    def compare(self, results, orders):
+        """Paired comparison of every toolchain against the first one"""
+        baseline = self.toolchains[0]
+        comparison = {'baseline': baseline,
+                      'toolchains': self.toolchains,
+                      'order': self.args.order,
+                      'rounds': orders,
+                      'confidence': self.args.confidence,
+                      'comparisons': []}
+        for toolchain in self.toolchains[1:]:
+            stats = PairedStats(results[baseline], results[toolchain],
+                                self.args.confidence)
+            rows = list(stats.rows())
+            comparison['comparisons'].append({'toolchain': toolchain,
+                                              'metrics': rows})
+            for row in rows:
+                if 'change_ci' not in row:
+                    continue
+                self.logger.info('%s vs %s: %s %s %+.2f%% [%+.2f%%, %+.2f%%]' %
+                                 (toolchain, baseline, row['name'],
+                                  row['metric'], row['change'],
+                                  row['change_ci'][0], row['change_ci'][1]))
+        filename = os.path.join(self.root_path, 'comparison.yaml')
+        with open(filename, 'w') as stdout:
+            stdout.write(to_yaml(comparison))
+        self.logger.info(' Comparison at: %s' % filename)
+        return comparison
+
+    def main(self):
+        """Fetch once, build all in parallel, run interleaved, compare"""
+
+        self.machine_model = MachineFactory(self.args.machine_type).getMachine()
+        if not self.args.machine_type:
+            self.args.machine_type = self.machine_model.arch
+        # Before any build, so they don't disturb it
+        if not self.args.no_calibration:
+            self.logger.info(' ++ Calibrating Cores ++')
+            self.machine_model.calibrate(self.args.recalibrate, self.logger)
+
+        if os.path.exists(self.root_path) and not self.args.resume:
+            self.logger.info('Wiping %s' % self.root_path)
+            shutil.rmtree(self.root_path)
+        Path(self.root_path).mkdir(parents=True, exist_ok=True)
+
+        self.telemetry = Telemetry(self.args.events, self.args.metrics,
+                                   self.args.metrics_listen, self.logger)
+        if not self.args.no_archive:
+            self.archive = LogArchive(self.args.archive or
+                                      os.path.join(self.args.root_path,
+                                                   'archive'))
+
+        # Sources once, then all builds in parallel
+        build_cpus = self._build_cpus()
+        sources = Task('sources', self._sources_action(self.toolchains[0]))
+        tasks = [sources]
+        for toolchain in self.toolchains:
+            tasks.append(Task('build-' + self._slug(toolchain),
+                              self._build_action(toolchain, build_cpus),
+                              deps=[sources]))
+        jobs = max(1, min(len(self.toolchains), len(build_cpus.split(','))))
+        scheduler = LocalScheduler(jobs=jobs, logger=self.logger)
+        if not scheduler.run(tasks):
+            failed = [t.name + ': ' + t.error for t in tasks if t.error]
+            self.telemetry.close()
+            raise RuntimeError('Comparison builds failed: %s' %
+                               ', '.join(failed))
+
+        self.logger.info(' ++ Running %s interleaved ++' %
+                         ', '.join(self.toolchains))
+        results, orders = self.run()
+
+        valid = True
+        for toolchain in self.toolchains:
+            controller = self.controllers[toolchain]
+            controller._check_results(results[toolchain], public=False)
+            valid = controller.collect(results[toolchain]) and valid
+        self.compare(results, orders)
+        self.telemetry.close()
+
+        if (self.logger.silent()):
+            print("PASS" if valid else "FAIL")
+        return valid
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+    Compiler Wrapper
+    Runs a compiler (or linker) command and logs its wall time, CPU time
+    and peak memory, so builds can be measured per translation unit:
+
+      compiler_wrapper.py <log> <compiler> [arguments...]
+
+    The builds use it as CC/CXX/FC, through a script named as the compiler
+    (see BuildMetrics.wrap), it is transparent otherwise: same outputs,
+    same return code. Each compilation or link appends one JSON line to the
+    log. Only the standard library is used, since it starts once per
+    translation unit.
+"""
+
+import sys
+import os
+import time
+import json
+import fcntl
+
+# Extensions of the sources compilers take
+SOURCES = ('.c', '.cc', '.cpp', '.cxx', '.C', '.c++', '.f', '.F', '.f90',
+           '.F90', '.f95', '.for', '.s', '.S')
+
+def describe(args):
+    """Kind of invocation, its sources and output"""
+    sources = []
+    objects = []
+    output = None
+    skip = False
+    for arg in args:
+        if skip:
+            output = arg
+            skip = False
+        elif arg == '-o':
+            skip = True
+        elif arg.startswith('-o') and len(arg) > 2:
+            output = arg[2:]
+        elif arg.startswith('-'):
+            continue
+        elif arg.endswith(SOURCES):
+            sources.append(arg)
+        elif arg.endswith(('.o', '.a', '.so')):
+            objects.append(arg)
+
+    if '-E' in args or '-M' in args or '-MM' in args:
+        return None, sources, output
+    if '-c' in args or '-S' in args:
+        return 'compile', sources, output
+    if sources or objects:
+        return 'link', sources, output
+    # Version checks, feature probes, etc.
+    return None, sources, output
+
+def log(filename, entry):
+    with open(filename, 'a') as stream:
+        fcntl.flock(stream, fcntl.LOCK_EX)
+        try:
+            stream.write(json.dumps(entry) + '\n')
+        finally:
+            fcntl.flock(stream, fcntl.LOCK_UN)
+
+
+if __name__ == '__main__':
+    """Point of entry for the compiler wrapper"""
+    if len(sys.argv) < 3:
+        sys.stderr.write('Usage: %s <log> <compiler> [arguments...]\n' %
+                         sys.argv[0])
+        sys.exit(2)
+
+    filename, command = sys.argv[1], sys.argv[2:]
+    start = time.monotonic()
+    try:
+        pid = os.posix_spawnp(command[0], command, os.environ)
+    except OSError as err:
+        sys.stderr.write('%s: %s\n' % (command[0], err))
+        sys.exit(127)
+    # The usage of the compiler and all its sub-processes (cc1, as, ld)
+    _, status, usage = os.wait4(pid, 0)
+    elapsed = time.monotonic() - start
+    returncode = os.waitstatus_to_exitcode(status)
+
+    kind, sources, output = describe(command[1:])
+    if kind:
+        log(filename, {'kind': kind,
+                       'sources': [os.path.abspath(s) for s in sources],
+                       'output': os.path.abspath(output) if output else None,
+                       'wall': elapsed,
+                       'user': usage.ru_utime,
+                       'sys': usage.ru_stime,
+                       'max_rss': usage.ru_maxrss,
+                       'returncode': returncode})
+    sys.exit(returncode if returncode >= 0 else 128 - returncode)
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+    Coordinator Controller
+    Runs a campaign file on a set of worker agents (worker_agent.py), each
+    job on a worker of the right machine type (campaign option
+    'machine_type', any worker if omitted). Jobs on workers that are lost
+    are retried elsewhere.
+
+    All results are collected in a single tree:
+      <root>/<campaign>/results/<job>/...    results files sent by the worker
+      <root>/<campaign>/coordinator.yaml     summary of all jobs
+
+    Usage: coordinator_controller.py --usage
+"""
+
+import sys
+import os
+import argparse
+import shutil
+import yaml
+from pathlib import Path
+
+from helper.BenchmarkLogger import BenchmarkLogger
+from helper.Campaign import Campaign
+from service.Coordinator import Coordinator
+
+class CoordinatorController(object):
+    """Sends the campaign's jobs to the workers, collects the results"""
+
+    def __init__(self, argparse_parser, argparse_args):
+        self.parser = argparse_parser
+        self.args = argparse_args
+        self.logger = BenchmarkLogger(__name__, self.parser,
+                                      self.args.verbose)
+
+        self.campaign = Campaign(self.args.campaign_file)
+        self.root_path = os.path.join(self.args.root_path, self.campaign.name)
+        self.logger.info('Campaign root path: %s' % self.root_path)
+
+    def _save(self, records):
+        """Writes the results files and the summary"""
+        summary = {'campaign': self.campaign.name, 'jobs': []}
+        for name, record in records.items():
+            entry = {
+                'name': name,
+                'status': record['status'],
+                'options': record['job'],
+                'worker': record['worker'],
+                'attempts': record['attempts']
+            }
+            if record['error']:
+                entry['error'] = record['error']
+            result = record['result'] or dict()
+            if 'valid' in result:
+                entry['valid'] = result['valid']
+            if result.get('files'):
+                path = os.path.join(self.root_path, 'results', name)
+                Path(path).mkdir(parents=True, exist_ok=True)
+                for filename, text in result['files'].items():
+                    with open(os.path.join(path, os.path.basename(filename)),
+                              'w') as output:
+                        output.write(text)
+                entry['results'] = path
+            summary['jobs'].append(entry)
+
+        filename = os.path.join(self.root_path, 'coordinator.yaml')
+        with open(filename, 'w') as stdout:
+            stdout.write(yaml.dump(summary, default_flow_style=False))
+        self.logger.info('Campaign summary at: %s' % filename)
+
+    def main(self):
+        jobs = []
+        for job in self.campaign.jobs():
+            name = self.campaign.identity(job['benchmark'] + '-run', job,
+                                          job.keys())
+            jobs.append((name, job))
+
+        if os.path.exists(self.root_path):
+            self.logger.info('Wiping %s' % self.root_path)
+            shutil.rmtree(self.root_path)
+        Path(self.root_path).mkdir(parents=True)
+
+        coordinator = Coordinator(self.args.worker, self.logger,
+                                  retries=self.args.retries,
+                                  poll=self.args.poll)
+        records = coordinator.run(jobs)
+        self._save(records)
+
+        success = all(r['status'] == 'done' and r['result'].get('valid')
+                      for r in records.values())
+        if (self.logger.silent()):
+            print("PASS" if success else "FAIL")
+        return success
+
+
+if __name__ == '__main__':
+    """Point of entry for multi-node campaigns"""
+    parser = argparse.ArgumentParser(description='Benchmark Harness Coordinator')
+
+    parser.add_argument('campaign_file', type=str,
+                        help='The YAML file describing the campaign')
+    parser.add_argument('--worker', type=str, action='append', required=True,
+                        help='Worker URL (ex. http://host:8000), repeatable')
+    parser.add_argument('--root-path', type=str, default='./runs',
+                        help='The root directory for the campaign results')
+    parser.add_argument('--retries', type=int, default=3,
+                        help='Attempts per job, and polls before losing a worker')
+    parser.add_argument('--poll', type=float, default=5.0,
+                        help='Seconds between job status polls')
+    parser.add_argument('-v', '--verbose', action='count', default=0,
+                        help='The verbosity of logging output')
+    args = parser.parse_args()
+
+    controller = CoordinatorController(parser, args)
+    success = controller.main()
+    if not success:
+        sys.exit(1)
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ Ranks cores by how noisy they are, to measure on the quietest ones
+
+ Usage:
+  ranking = CoreCalibration(logger=logger).rank([1, 2, 3, 4])
+  quietest = ranking[0]['core']
+
+ A short, fixed amount of work (a pure Python loop, repeated) runs pinned
+ to each core in turn, and for each one:
+  - cv: the coefficient of variation of the repetitions' times
+  - interrupts: interrupts per second on that core (/proc/interrupts)
+  - preemptions: involuntary context switches of the probe (wait4)
+  - freq-spread: (max - min) / max of the core's frequency, sampled while
+    the probe runs (cpufreq, left out if the system doesn't have it)
+
+ Cores are ranked on each metric, and ordered by the sum of their ranks
+ (then by cv), quietest first. Cores are counted from 1, as in the
+ machine model's affinity list.
+
+ Noise doesn't change much while the machine is up, so rankings are
+ cached per boot (DiskCache 'calibration', keyed by the kernel's boot id
+ and the cores), unless asked to calibrate again.
+"""
+
+import sys
+import shutil
+import statistics
+
+from executor.Execute import Execute
+from executor.SystemSampler import SystemSampler
+from helper.DiskCache import DiskCache
+
+# Bump when the probe or the metrics change, so old rankings are ignored
+VERSION = 1
+
+PROBE = '''
+import time
+def work(size):
+    total = 0
+    for value in range(size):
+        total += value * value
+    return total
+work(%(size)d)
+for _ in range(%(repeats)d):
+    start = time.perf_counter()
+    work(%(size)d)
+    print(time.perf_counter() - start)
+'''
+
+METRICS = ['cv', 'interrupts', 'preemptions', 'freq-spread']
+
+def _boot_id():
+    try:
+        with open('/proc/sys/kernel/random/boot_id') as data:
+            return data.read().strip()
+    except OSError:
+        return None
+
+def _interrupts():
+    """Interrupts served by each CPU (from 0) since boot"""
+    counts = dict()
+    try:
+        with open('/proc/interrupts') as data:
+            cpus = [int(name[3:]) for name in data.readline().split()]
+            for line in data:
+                fields = line.split(':', 1)[-1].split()[:len(cpus)]
+                for cpu, field in zip(cpus, fields):
+                    if not field.isdigit():
+                        break
+                    counts[cpu] = counts.get(cpu, 0) + int(field)
+    except (OSError, ValueError):
+        pass
+    return counts
+
+class CoreCalibration(object):
+    """Probes each core with fixed work, ranks them by noise"""
+
+    def __init__(self, repeats=40, size=200000, logger=None):
+        if repeats < 2 or size < 1:
+            raise ValueError('Calibration needs at least two repetitions')
+        self.repeats = repeats
+        self.size = size
+        self.logger = logger
+        self.taskset = shutil.which('taskset')
+        if not self.taskset:
+            raise RuntimeError('Calibration needs taskset')
+        self.cache = DiskCache('calibration')
+
+    def _log(self, msg):
+        if self.logger:
+            self.logger.debug(msg)
+
+    def probe(self, core):
+        """Noise metrics of one core"""
+        cpu = core - 1
+        sampler = SystemSampler(interval=0.02, cpus=[cpu])
+        program = [self.taskset, '-c', str(cpu), sys.executable, '-c',
+                   PROBE % {'size': self.size, 'repeats': self.repeats}]
+        before = _interrupts()
+        result = Execute(monitor=sampler).run(program)
+        after = _interrupts()
+        if result.returncode:
+            raise RuntimeError('Calibration probe failed on core %d: %s' %
+                               (core, result.stderr.strip()))
+
+        times = [float(line) for line in result.stdout.split()]
+        mean = statistics.mean(times)
+        metrics = {
+            'core': core,
+            'mean': mean,
+            'cv': statistics.stdev(times) / mean,
+            'preemptions': result.rusage.ru_nivcsw
+        }
+        if cpu in before and cpu in after:
+            metrics['interrupts'] = (after[cpu] - before[cpu]) / sum(times)
+        summary, _ = result.monitor
+        if summary.get('freq-max'):
+            metrics['freq-spread'] = (summary['freq-max'] -
+                                      summary['freq-min']) / \
+                                     summary['freq-max']
+        self._log('Core %d: %s' % (core, metrics))
+        return metrics
+
+    def _order(self, probes):
+        """Quietest first: sum of the ranks on each metric (all cores
+           have), then the coefficient of variation"""
+        for probe in probes:
+            probe['score'] = 0
+        for metric in METRICS:
+            if not all(metric in probe for probe in probes):
+                continue
+            values = [probe[metric] for probe in probes]
+            for probe in probes:
+                # Ties get the same rank
+                probe['score'] += len([v for v in values if v < probe[metric]])
+        return sorted(probes, key=lambda probe: (probe['score'], probe['cv']))
+
+    def rank(self, cores, recalibrate=False):
+        """Cores (from 1) with their metrics, quietest first"""
+        if not cores:
+            raise ValueError('No cores to calibrate')
+        boot = _boot_id()
+        key = None
+        if boot:
+            key = '%s:%s:%d:%d:%d' % (boot, ','.join(map(str, sorted(cores))),
+                                      self.repeats, self.size, VERSION)
+            ranking = self.cache.get(key)
+            if ranking and not recalibrate:
+                self._log('Using the calibration of this boot')
+                return self._report(ranking)
+
+        ranking = self._order([self.probe(core) for core in cores])
+        if key:
+            self.cache.set(key, ranking)
+        return self._report(ranking)
+
+    def _report(self, ranking):
+        if self.logger:
+            self.logger.info('Quietest core: %d (cv %.2f%%), noisiest: %d '
+                             '(cv %.2f%%)' % (ranking[0]['core'],
+                                              ranking[0]['cv'] * 100,
+                                              ranking[-1]['core'],
+                                              ranking[-1]['cv'] * 100))
+        return ranking
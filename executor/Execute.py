@@ -7,11 +7,22 @@
   out, err = Execute(outp=Plugin, errp=None).run(['myapp', '-flag', 'etc'])
 
  Plugin: parses the output of a specific benchmark, returns a dict()
+         with native numbers (int, float) where values are numbers
          passing None makes run() returns plain text as str()
          use isinstance(out, dict) to differentiate handling
+
+ The result also has the rusage of the program (and its waited for
+ children), from wait4(), in result.rusage. A monitor (ex. SystemSampler)
+ can watch the program while it runs: monitor.start(pid) after it starts,
+ monitor.stop() after it ends, whose return value is in result.monitor.
+ A watch function, if set, is called with each line (bytes) of stdout as
+ soon as it's read (ex. to react to markers, see PerfROI).
 """
 
 import subprocess
+import threading
+import time
+import os
 import re
 
 from helper.BenchmarkLogger import BenchmarkLogger
@@ -34,6 +45,17 @@ class OutputParser:
             string = string.replace(find, repl)
         return string
 
+    def convert(self, string):
+        """Native number (int or float) if the value is one"""
+        try:
+            return int(string)
+        except ValueError:
+            pass
+        try:
+            return float(string)
+        except ValueError:
+            return string
+
     def parse(self, cmdline, output):
         """Parses the raw output, returns dictionary"""
         if not isinstance(output, str):
@@ -47,7 +69,7 @@ class OutputParser:
         for field, regex in self.fields.items():
             match = re.search(regex, output)
             if match:
-                data[field] = self.sanitise(match.group(1))
+                data[field] = self.convert(self.sanitise(match.group(1)))
         return data
 
     def _get_name(self, cmdline):
@@ -55,10 +77,22 @@ class OutputParser:
         if not isinstance(cmdline, list):
             raise TypeError("command line needs to be a list")
         index = 0
-        if cmdline[index].endswith('taskset'):
-            index += 2
-        if cmdline[index].endswith('perf'):
-            index += 2
+        # Wrappers, in any order (ex. taskset perf stat taskset -c 1,2 app)
+        while index < len(cmdline) - 1:
+            if cmdline[index].endswith('taskset'):
+                index += 2
+                if cmdline[index - 1] == '-c':
+                    index += 1
+            elif cmdline[index].endswith('perf'):
+                # Its options end with '--', if it has any
+                if '--' in cmdline[index:]:
+                    index = cmdline.index('--', index) + 1
+                else:
+                    index += 2
+            elif cmdline[index].endswith('stdbuf'):
+                index += 2
+            else:
+                break
         name = re.search(r'\/([^\/]+)$', cmdline[index])
         if name:
             return name.group(1)
@@ -67,7 +101,8 @@ class OutputParser:
 class Execute(object):
     """Executes commands, captures output, parse with plugins"""
 
-    def __init__(self, outp=None, errp=None, logger=None):
+    def __init__(self, outp=None, errp=None, logger=None, env=None,
+                 monitor=None):
         # validate arguments
         if outp and not isinstance(outp, OutputParser):
             raise TypeError("Output parser needs to derive from OutputParser")
@@ -77,6 +112,49 @@ class Execute(object):
         self.outp = outp
         self.errp = errp
         self.logger = logger
+        # Full environment for the child, None inherits the harness'
+        self.env = env
+        # Watches the program while it runs, optional
+        self.monitor = monitor
+        # Called with each line of stdout, as it arrives, optional
+        self.watch = None
+
+    def _spawn(self, program):
+        """Runs the program, returns the completed process and rusage"""
+        proc = subprocess.Popen(program,
+                                stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE,
+                                env=self.env)
+        if self.monitor:
+            self.monitor.start(proc.pid)
+
+        # Drain stderr in a thread, so neither pipe fills up and blocks
+        stderr = []
+        reader = threading.Thread(target=lambda: stderr.append(
+                                      proc.stderr.read()), daemon=True)
+        reader.start()
+        if self.watch:
+            lines = []
+            for line in iter(proc.stdout.readline, b''):
+                self.watch(line)
+                lines.append(line)
+            stdout = b''.join(lines)
+        else:
+            stdout = proc.stdout.read()
+        reader.join()
+        proc.stdout.close()
+        proc.stderr.close()
+
+        # Reap it ourselves, to get its resource usage
+        _, status, rusage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        monitor = self.monitor.stop() if self.monitor else None
+
+        result = subprocess.CompletedProcess(program, proc.returncode,
+                                             stdout, stderr[0])
+        result.rusage = rusage
+        result.monitor = monitor
+        return result
 
     def run(self, program):
         """Execute Commands, return out/err, accepts parser plugins"""
@@ -90,21 +168,26 @@ class Execute(object):
             self.logger.debug('Executing: %s' % repr(program))
 
         # Call the program, capturing stdout/stderr
-        result = subprocess.run(program,
-                                stdout=subprocess.PIPE,
-                                stderr=subprocess.PIPE)
- 
+        result = self._spawn(program)
+        start = time.monotonic()
+
         # Collect stdout, parse if parser available
         stdout = result.stdout.decode('utf-8')
+        # Raw outputs, for archiving (not kept by the results table)
+        result.raw_stdout = stdout
         if self.outp:
             stdout = self.outp.parse(program, stdout)
         result.stdout = stdout
 
         # Collect stderr, parse if parser available
         stderr = result.stderr.decode('utf-8')
+        result.raw_stderr = stderr
         if self.errp:
             stderr = self.errp.parse(program, stderr)
         result.stderr = stderr
- 
+
+        # Harness overhead, as opposed to the program's run time
+        result.parse_time = time.monotonic() - start
+
         # Return
         return result
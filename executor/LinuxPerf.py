@@ -11,10 +11,16 @@
          prints to stderr, make sure they get combined in stdout before
          calling this wrapper, or use Execute directly, passing two output
          parsers.
+
+ The program's resource usage (wait4) and, with a sampler (see
+ SystemSampler), the frequency and temperature summary of its run are
+ added to perf's results. The sampler's series is in result.samples.
+ With a region of interest (see PerfROI), perf only counts the region.
 """
 
 from executor.Execute import *
 from pathlib import Path
+import re
 import os
 import shutil
 
@@ -36,11 +42,13 @@ class LinuxPerfParser(OutputParser):
 class LinuxPerf(Execute):
     """Overrides Executor to run commands using Linux perf"""
 
-    def __init__(self, plugin=None, perf=None, logger=None, affinity=None):
+    def __init__(self, plugin=None, perf=None, logger=None, affinity=None,
+                 env=None, sampler=None, roi=None, core=2):
         if plugin and not isinstance(plugin, OutputParser):
             raise TypeError("Output parser needs to derive from OutputParser")
 
-        super(LinuxPerf, self).__init__(plugin, LinuxPerfParser(), logger)
+        super(LinuxPerf, self).__init__(plugin, LinuxPerfParser(), logger, env,
+                                        sampler)
 
         self.cap_file = '/proc/sys/kernel/perf_event_paranoid'
         self.cap_max = 2
@@ -52,8 +60,22 @@ class LinuxPerf(Execute):
         self.taskset = shutil.which('taskset')
         self.affinity = affinity
         self.affinity_idx = 0
+        # Core of single threaded runs (ex. the quietest, see MachineModel)
+        self.core = core
         # Validate perf and permissions
         self._validate(perf)
+        # Region of interest, the only part counted (see PerfROI)
+        self.roi = roi
+        if self.roi and not self._control_supported():
+            if self.logger:
+                self.logger.warning("Perf is too old to count regions of "
+                                    "interest (5.10 needed), ignoring ROI")
+            self.roi = None
+        if self.roi:
+            self.env = dict(self.env or os.environ)
+            self.env.update(self.roi.env())
+            if self.roi.start:
+                self.watch = self.roi.watch
 
     def _validate(self, perf):
         # Verify that perf is actually installed
@@ -73,6 +95,14 @@ class LinuxPerf(Execute):
                   "Please, set the correct capability in " + self.cap_file
             raise RuntimeError(msg)
 
+    def _control_supported(self):
+        """Perf stat's control FIFOs (5.10), assumed if version unknown"""
+        version = Execute().run([self.perf, 'version'])
+        match = re.search(r'perf version (\d+)\.(\d+)', version.stdout)
+        if not match:
+            return True
+        return (int(match.group(1)), int(match.group(2))) >= (5, 10)
+
     def setStat(self, repeat=1, events=None):
         """Set extra stat arguments"""
 
@@ -104,8 +134,8 @@ class LinuxPerf(Execute):
 
         call = []
 
-        # Default to core 2 (more stable than 1)
-        core = 2
+        # Single threaded runs on the default core
+        core = self.core
         # When passed affinity list, taskset in order
         if self.affinity and threads > 1:
             if len(self.affinity) <= self.affinity_idx:
@@ -121,7 +151,8 @@ class LinuxPerf(Execute):
             self.affinity_idx += 1
 
         # Force taskset on all occasions (stability)
-        call.extend([self.taskset, str(core)])
+        # Cores are counted from 1, taskset's CPU list from 0
+        call.extend([self.taskset, '-c', str(core - 1)])
 
         # Perf itself
         call.extend([self.perf, 'stat'])
@@ -130,8 +161,53 @@ class LinuxPerf(Execute):
         if self.stat_args:
             call.extend(self.stat_args)
 
-        # Adding program to perf
-        call.extend(program)
+        # Adding program to perf (only counting its ROI, if any)
+        if self.roi:
+            call.extend(self.roi.wrap(program))
+        else:
+            call.extend(program)
+
+        # Sample the cores the program runs on: its own taskset's (ex.
+        # threaded runs on the affinity's cores), else the measurement core
+        if self.monitor:
+            self.monitor.cpus = self._program_cpus(program) or [core - 1]
 
         # Call and collect output
-        return super().run(call)
+        result = super().run(call)
+        self._usage(result)
+        return result
+
+    def _program_cpus(self, program):
+        """CPUs (from 0) of the program's own taskset -c list, if any"""
+        if len(program) < 3 or not program[0].endswith('taskset') or \
+           program[1] != '-c':
+            return None
+        cpus = []
+        for item in program[2].split(','):
+            first, _, last = item.partition('-')
+            try:
+                cpus.extend(range(int(first), int(last or first) + 1))
+            except ValueError:
+                return None
+        return cpus
+
+    def _usage(self, result):
+        """Adds the rusage and sampler's summary to perf's results"""
+        result.samples = []
+        if not isinstance(result.stderr, dict):
+            return
+        if self.roi:
+            result.stderr = self.roi.results(result.stderr)
+        usage = result.rusage
+        result.stderr.update({
+            'max-rss' : usage.ru_maxrss,
+            'user-time' : usage.ru_utime,
+            'sys-time' : usage.ru_stime,
+            'minor-faults' : usage.ru_minflt,
+            'major-faults' : usage.ru_majflt,
+            'voluntary-switches' : usage.ru_nvcsw,
+            'involuntary-switches' : usage.ru_nivcsw
+        })
+        if result.monitor:
+            summary, result.samples = result.monitor
+            result.stderr.update(summary)
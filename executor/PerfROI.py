@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ Region of interest (ROI) of a perf run, for LinuxPerf
+
+ Usage:
+  roi = PerfROI(start=r'Start of the loop', stop=r'End of the loop')
+  perf = LinuxPerf(plugin=Plugin, roi=roi)
+  ...
+  roi.close()
+
+ Perf stat (the one running the program, no other is started) only
+ counts the region of interest, and its counters are reported with a
+ 'roi-' prefix (ex. roi-instructions), so they're never mistaken for
+ the whole process' (which aren't counted). The time elapsed and the
+ resource usage are still the whole process'. The region is either:
+  - between lines of the program's output matching 'start' and 'stop'
+    (no 'stop': up to the end), the output is line buffered (stdbuf) and
+    the harness enables the counters when it sees the lines, so the
+    region is only as exact as the output is quick to arrive
+  - after a 'delay' (ms) from the start, perf's own --delay
+  - driven by the 'program' itself, with the ROI_BEGIN() and ROI_END()
+    markers of models/benchmarks/include/roi.h, which wait for perf to
+    acknowledge each command (exact)
+
+ Start/stop use perf stat's control FIFOs (perf 5.10 or later), which
+ are created by the ROI and kept open by the harness between runs.
+"""
+
+import os
+import re
+import shutil
+import tempfile
+
+class PerfROI(object):
+    """Counts a region of interest with a second, controlled, perf stat"""
+
+    def __init__(self, start=None, stop=None, delay=None, program=False):
+        if not start and not delay and not program:
+            raise ValueError("ROI needs start markers, a delay or a program")
+        if stop and not start:
+            raise ValueError("ROI stop marker needs a start marker")
+        self.start = re.compile(start.encode()) if start else None
+        self.stop = re.compile(stop.encode()) if stop else None
+        self.delay = delay
+        self.program = program
+        self.stdbuf = shutil.which('stdbuf')
+
+        self.path = tempfile.mkdtemp(prefix='perf-roi-')
+        self.ctl = os.path.join(self.path, 'ctl.fifo')
+        self.ack = os.path.join(self.path, 'ack.fifo')
+        self.ctl_fd = None
+        self.ack_fd = None
+        self.enabled = False
+        if not delay:
+            os.mkfifo(self.ctl)
+            os.mkfifo(self.ack)
+            # Open both ends, so neither perf nor the program ever block
+            # opening them (perf opens the ack FIFO for writing)
+            self.ctl_fd = os.open(self.ctl, os.O_RDWR | os.O_NONBLOCK)
+            self.ack_fd = os.open(self.ack, os.O_RDWR | os.O_NONBLOCK)
+
+    @classmethod
+    def from_model(cls, roi):
+        """ROI of a benchmark model's declaration (see BenchmarkModel)"""
+        if not roi:
+            return None
+        return cls(roi.get('start'), roi.get('stop'), roi.get('delay'),
+                   roi.get('program', False))
+
+    def env(self):
+        """Environment of the program (for roi.h)"""
+        if not self.program:
+            return dict()
+        return {'BENCHMARK_HARNESS_ROI_CTL': self.ctl,
+                'BENCHMARK_HARNESS_ROI_ACK': self.ack}
+
+    def _drain(self):
+        """Drops commands and acknowledgements left by previous runs"""
+        for fd in [self.ctl_fd, self.ack_fd]:
+            try:
+                while os.read(fd, 4096):
+                    pass
+            except BlockingIOError:
+                pass
+
+    def wrap(self, program):
+        """Perf stat's options to only count the region, and the program"""
+        self.enabled = False
+        call = []
+        if self.delay:
+            call.extend(['--delay', str(self.delay)])
+        else:
+            self._drain()
+            control = 'fifo:' + self.ctl
+            if self.program:
+                control += ',' + self.ack
+            # Counters start disabled, until the start marker
+            call.extend(['--control', control, '--delay', '-1'])
+        call.append('--')
+        # Markers have to arrive as they are printed
+        if self.start and self.stdbuf:
+            call.extend([self.stdbuf, '-oL'])
+        return call + program
+
+    def watch(self, line):
+        """Enables/disables the counters on the marker lines (stdout)"""
+        if not self.enabled and self.start and self.start.search(line):
+            os.write(self.ctl_fd, b'enable\n')
+            self.enabled = True
+        elif self.enabled and self.stop and self.stop.search(line):
+            os.write(self.ctl_fd, b'disable\n')
+            self.enabled = False
+
+    def results(self, data):
+        """Perf's results, with the counters named as the region's"""
+        results = dict()
+        for key, value in data.items():
+            # The time elapsed is the whole process'
+            if key not in ['_name', 'elapsed']:
+                key = 'roi-' + key
+            results[key] = value
+        return results
+
+    def close(self):
+        for fd in [self.ctl_fd, self.ack_fd]:
+            if fd is not None:
+                os.close(fd)
+        self.ctl_fd = self.ack_fd = None
+        shutil.rmtree(self.path, ignore_errors=True)
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ Columnar table of command results, replacing a list of CompletedProcess
+
+ Usage:
+  results = ResultsTable()
+  results.append(Execute(outp=Plugin).run(['myapp']))
+  results.column('cycles', stream='err')    # array('d') of all rows
+  results.select('myapp')                    # table with myapp's rows only
+  results.discard('throttled', 'err')        # without rows where it's set
+  results.aggregate('err')                   # {name: {metric: stats}}
+
+ Parsed outputs (dictionaries) are stored as one array of doubles per
+ metric and stream, NaN where a row doesn't have the metric. Integers are
+ given back as integers, values that are not numbers are kept on the side
+ (they're rare: versions, labels). The CompletedProcess objects themselves
+ are not kept, so very long runs stay small in memory.
+
+ Text outputs (not parsed, ex. builds) are kept as text, to be logged.
+"""
+
+import math
+import statistics
+from array import array
+from subprocess import CompletedProcess
+
+from helper.Serializer import to_yaml
+
+NAN = float('nan')
+
+def _number(value):
+    """Float value of a result, None if not a number"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return None
+
+class Row(object):
+    """One result, with the same fields as a CompletedProcess"""
+    __slots__ = ('args', 'returncode', 'stdout', 'stderr')
+
+    def __init__(self, args, returncode, stdout, stderr):
+        self.args = args
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+
+class Columns(object):
+    """Typed columns of one output stream (stdout or stderr)"""
+    __slots__ = ('rows', 'kinds', 'columns', 'integer', 'other', 'raw')
+
+    # Kind of output of each row
+    EMPTY, PARSED, TEXT = 0, 1, 2
+
+    def __init__(self):
+        self.rows = 0
+        self.kinds = array('b')
+        # Metric -> array('d'), one value per row
+        self.columns = dict()
+        # Metrics where all values so far are integers
+        self.integer = dict()
+        # Values that are not numbers, (metric, row) -> value
+        self.other = dict()
+        # Text outputs, row -> text
+        self.raw = dict()
+
+    def _is_integer(self, value, number):
+        if isinstance(value, str):
+            return value.strip().lstrip('+-').isdigit()
+        return isinstance(value, int) and number.is_integer()
+
+    def append(self, output):
+        row = self.rows
+        if isinstance(output, dict) and output:
+            self.kinds.append(self.PARSED)
+            for key, value in output.items():
+                if key == '_name':
+                    continue
+                column = self.columns.get(key)
+                if column is None:
+                    column = array('d', [NAN]) * row
+                    self.columns[key] = column
+                    self.integer[key] = True
+                number = _number(value)
+                if number is None:
+                    self.other[(key, row)] = value
+                    number = NAN
+                elif self.integer[key]:
+                    self.integer[key] = self._is_integer(value, number)
+                column.append(number)
+        elif isinstance(output, str) and output:
+            self.kinds.append(self.TEXT)
+            self.raw[row] = output
+        else:
+            self.kinds.append(self.EMPTY)
+        self.rows += 1
+        # Metrics this row doesn't have
+        for column in self.columns.values():
+            if len(column) < self.rows:
+                column.append(NAN)
+
+    def value(self, key, row):
+        number = self.columns[key][row]
+        if math.isnan(number):
+            return self.other.get((key, row))
+        if self.integer[key]:
+            return int(number)
+        return number
+
+    def get(self, row, name, parsed):
+        """Row as a dictionary (parsed, with the executable name) or text"""
+        kind = self.kinds[row]
+        if kind == self.TEXT:
+            return self.raw[row]
+        if kind == self.EMPTY:
+            return dict() if parsed else ''
+        data = {'_name': name}
+        for key in self.columns:
+            value = self.value(key, row)
+            if value is not None:
+                data[key] = value
+        return data
+
+class ResultsTable(object):
+    """Collates return codes and parsed outputs of many commands"""
+
+    def __init__(self):
+        self.returncode = 0
+        self.returncodes = array('i')
+        # Executable names, and the index of each row's name
+        self.names = []
+        self.name_idx = array('H')
+        # Command line of the first row of each name (for Row.args)
+        self.args = dict()
+        self.out = Columns()
+        self.err = Columns()
+        self.parsed = None
+
+    def _name(self, result):
+        for output in [result.stdout, result.stderr]:
+            if isinstance(output, dict) and output.get('_name'):
+                return output['_name']
+        if isinstance(result.args, list) and result.args:
+            return str(result.args[-1]).rsplit('/', 1)[-1]
+        return ''
+
+    def append(self, result):
+        """Adds a new CompletedProcess (or Row) to the table"""
+        if not isinstance(result, (CompletedProcess, Row)):
+            raise TypeError("result must be a CompletedProcess")
+        if self.parsed is None:
+            self.parsed = isinstance(result.stdout, dict) or \
+                          isinstance(result.stderr, dict)
+
+        name = self._name(result)
+        if name not in self.args:
+            self.names.append(name)
+            self.args[name] = result.args
+        self.name_idx.append(self.names.index(name))
+        self.returncodes.append(result.returncode)
+        self.returncode += result.returncode
+        self.out.append(result.stdout)
+        self.err.append(result.stderr)
+
+    def __len__(self):
+        return len(self.returncodes)
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self[row]
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return self._subset(range(len(self))[row])
+        if row < 0:
+            row += len(self)
+        if row < 0 or row >= len(self):
+            raise IndexError('results table index out of range')
+        name = self.names[self.name_idx[row]]
+        return Row(self.args[name], self.returncodes[row],
+                   self.out.get(row, name, self.parsed),
+                   self.err.get(row, name, self.parsed))
+
+    def _subset(self, rows):
+        table = ResultsTable()
+        for row in rows:
+            table.append(self[row])
+        return table
+
+    def select(self, name):
+        """Table with the rows of one executable"""
+        if name not in self.names:
+            return ResultsTable()
+        idx = self.names.index(name)
+        return self._subset([r for r in range(len(self))
+                             if self.name_idx[r] == idx])
+
+    def discard(self, key, stream='out'):
+        """Table without the rows where a metric is set (not zero)"""
+        column = getattr(self, stream).columns.get(key)
+        if column is None:
+            return self
+        return self._subset([r for r in range(len(self))
+                             if math.isnan(column[r]) or not column[r]])
+
+    def metrics(self, stream='out'):
+        return list(getattr(self, stream).columns.keys())
+
+    def column(self, key, stream='out', name=None):
+        """Numeric values of a metric (all rows or one executable's),
+           without the rows that don't have it"""
+        columns = getattr(self, stream).columns
+        if key not in columns:
+            return array('d')
+        column = columns[key]
+        if name is None:
+            return array('d', [v for v in column if not math.isnan(v)])
+        idx = self.names.index(name) if name in self.names else -1
+        return array('d', [v for v, n in zip(column, self.name_idx)
+                           if n == idx and not math.isnan(v)])
+
+    def aggregate(self, stream='out'):
+        """Mean, deviation and noise (%) of each metric, per executable"""
+        stats = dict()
+        for name in self.names:
+            stat = {'average': {}, 'deviation': {}, 'noise': {}}
+            for key in self.metrics(stream):
+                values = self.column(key, stream, name)
+                if not values:
+                    continue
+                average = statistics.fmean(values)
+                deviation = statistics.stdev(values) if len(values) > 1 else 0.0
+                stat['average'][key] = average
+                stat['deviation'][key] = deviation
+                # Noise level is the dimensionless coefficient of variation
+                stat['noise'][key] = 0.0
+                if average:
+                    noise = (deviation / average) * 100
+                    stat['noise'][key] = float('%0.2f' % noise)
+            stats[name] = stat
+        return stats
+
+    def rows(self, stream='out'):
+        """Parsed rows of a stream as dictionaries, without empty ones"""
+        columns = getattr(self, stream)
+        keys = [(key, column, columns.integer[key])
+                for key, column in columns.columns.items()]
+        for row in range(len(self)):
+            if columns.kinds[row] != Columns.PARSED:
+                continue
+            data = {'_name': self.names[self.name_idx[row]]}
+            for key, column, integer in keys:
+                number = column[row]
+                if math.isnan(number):
+                    value = columns.other.get((key, row))
+                    if value is not None:
+                        data[key] = value
+                elif integer:
+                    data[key] = int(number)
+                else:
+                    data[key] = number
+            yield data
+
+    def _dump(self, stream):
+        columns = getattr(self, stream)
+        if not len(self):
+            return ''
+        if not self.parsed:
+            return ''.join([columns.raw[r] for r in range(len(self))
+                            if r in columns.raw])
+        return to_yaml(list(self.rows(stream)))
+
+    def stdout(self):
+        return self._dump('out')
+
+    def stderr(self):
+        return self._dump('err')
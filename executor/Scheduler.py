@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ Local job graph scheduler
+
+ Usage:
+  build = Task('build', build_func)
+  run = Task('run', run_func, deps=[build], exclusive=True)
+  LocalScheduler(jobs=4).run([build, run])
+
+ Tasks run as soon as all their dependencies succeed. Normal tasks (fetch,
+ build) run in parallel, up to 'jobs' at a time. Exclusive tasks (benchmark
+ measurements) run one at a time, and if 'overlap' is False, never alongside
+ any other task (ex. when there are no spare cores to build on).
+
+ Tasks depending on a failed task are skipped, everything else carries on.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+class Task(object):
+    """A node in the job graph"""
+
+    def __init__(self, name, action, deps=None, exclusive=False, estimate=None):
+        if deps and not isinstance(deps, list):
+            raise TypeError("Task dependencies must be a list")
+
+        self.name = name
+        self.action = action
+        self.deps = deps or []
+        self.exclusive = exclusive
+        # Estimated duration in seconds, None if unknown
+        self.estimate = estimate
+
+        self.status = 'pending'
+        self.result = None
+        self.error = None
+        self.elapsed = None
+
+    def execute(self):
+        """Runs the action, timing it (called from the worker threads)"""
+        start = time.monotonic()
+        try:
+            self.result = self.action()
+        finally:
+            self.elapsed = time.monotonic() - start
+        return self.result
+
+class LocalScheduler(object):
+    """Runs a task graph with a parallel pool and an exclusive lane"""
+
+    def __init__(self, jobs=1, overlap=True, logger=None, on_done=None):
+        if not isinstance(jobs, int) or jobs < 1:
+            raise ValueError("Number of parallel jobs must be positive")
+
+        self.jobs = jobs
+        self.overlap = overlap
+        self.logger = logger
+        # Called with each task after it finishes (successful or not)
+        self.on_done = on_done
+
+    def order(self, tasks):
+        """Topological order of the tasks (and all their dependencies)"""
+        ordered = []
+        visiting = set()
+
+        def visit(task):
+            if task in ordered:
+                return
+            if task in visiting:
+                raise ValueError("Cycle in task graph at %s" % task.name)
+            visiting.add(task)
+            for dep in task.deps:
+                visit(dep)
+            visiting.remove(task)
+            ordered.append(task)
+
+        for task in tasks:
+            visit(task)
+        return ordered
+
+    def _log(self, msg):
+        if self.logger:
+            self.logger.info(msg)
+
+    def _ready(self, task):
+        """True if can run, False if must wait, None if must be skipped"""
+        for dep in task.deps:
+            if dep.status in ('failed', 'skipped'):
+                return None
+            if dep.status != 'done':
+                return False
+        return True
+
+    def run(self, tasks):
+        """Runs all tasks, returns True if all of them succeeded"""
+        ordered = self.order(tasks)
+        pending = list(ordered)
+        running = dict()
+
+        pool = ThreadPoolExecutor(max_workers=self.jobs)
+        lane = ThreadPoolExecutor(max_workers=1)
+        try:
+            while pending or running:
+                measuring = any(t.exclusive for t in running.values())
+                building = len(running) - int(measuring)
+
+                ready = []
+                for task in list(pending):
+                    state = self._ready(task)
+                    if state is None:
+                        task.status = 'skipped'
+                        pending.remove(task)
+                        self._log('Skipping %s (failed dependency)' % task.name)
+                        if self.on_done:
+                            self.on_done(task)
+                    elif state:
+                        ready.append(task)
+
+                # Measurements take priority, builds must not disturb them
+                exclusive = [t for t in ready if t.exclusive]
+                if exclusive and not measuring and \
+                   (self.overlap or not building):
+                    task = exclusive[0]
+                    measuring = True
+                    self._submit(lane, task, pending, running)
+                if self.overlap or not (measuring or exclusive):
+                    for task in [t for t in ready if not t.exclusive]:
+                        if building >= self.jobs:
+                            break
+                        building += 1
+                        self._submit(pool, task, pending, running)
+
+                if not running:
+                    if pending:
+                        raise RuntimeError("Scheduler stalled with %d tasks" %
+                                           len(pending))
+                    break
+
+                done, _ = wait(list(running.keys()), return_when=FIRST_COMPLETED)
+                for future in done:
+                    task = running.pop(future)
+                    error = future.exception()
+                    if error:
+                        task.status = 'failed'
+                        task.error = repr(error)
+                        self._log('Failed %s: %s' % (task.name, task.error))
+                    else:
+                        task.status = 'done'
+                        self._log('Finished %s in %.1fs' % (task.name,
+                                                            task.elapsed))
+                    if self.on_done:
+                        self.on_done(task)
+        finally:
+            pool.shutdown(wait=True)
+            lane.shutdown(wait=True)
+
+        return all(t.status == 'done' for t in ordered)
+
+    def _submit(self, executor, task, pending, running):
+        pending.remove(task)
+        task.status = 'running'
+        self._log('Starting %s' % task.name)
+        running[executor.submit(task.execute)] = task
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ Background sampler of the system state while a benchmark runs
+
+ Usage:
+  sampler = SystemSampler(interval=0.2, cpus=[1])
+  sampler.start(pid)
+  ... wait for the process ...
+  summary, samples = sampler.stop()
+
+ A thread polls, every 'interval' seconds:
+  - the current frequency (MHz) of the sampled CPUs (cpufreq)
+  - the temperature (Celsius) of all thermal zones
+  - the RSS (KiB) and CPU time (s) of the process and its descendants
+
+ The summary has the minimum, mean and maximum frequency, the maximum
+ temperature, the number of thermal throttling events of the sampled CPUs
+ (x86 only) and 'throttled' (1 or 0): throttling events, or a mean
+ frequency more than 'tolerance' below the highest seen so far (by this
+ sampler, over all its runs). Anything the system doesn't have (ex. no
+ cpufreq in VMs) is left out.
+
+ Only /proc and /sys are read, no external tools are started. The
+ sampling thread runs on the cores that aren't sampled (if any), so it
+ doesn't disturb the benchmark on the sampled ones.
+"""
+
+import os
+import glob
+import time
+import threading
+
+CPU_PATH = '/sys/devices/system/cpu'
+THERMAL_PATH = '/sys/class/thermal'
+
+def _read(path):
+    try:
+        with open(path) as data:
+            return data.read().strip()
+    except (OSError, ValueError):
+        return None
+
+def _number(path):
+    value = _read(path)
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+class SystemSampler(object):
+    """Polls frequencies, temperatures and the process' usage"""
+
+    def __init__(self, interval=0.2, cpus=None, tolerance=0.05):
+        if interval <= 0:
+            raise ValueError('Sampling interval must be positive')
+        self.interval = interval
+        # CPU numbers (from 0) to sample, ex. the measurement cores
+        self.cpus = list(cpus or [])
+        self.tolerance = tolerance
+        self.zones = sorted(glob.glob(os.path.join(THERMAL_PATH,
+                                                   'thermal_zone*')))
+        self.page_size = os.sysconf('SC_PAGE_SIZE') // 1024
+        self.ticks = os.sysconf('SC_CLK_TCK')
+        # Highest frequency seen, reference for frequency drops
+        self.reference = None
+
+        self.thread = None
+        self.stopped = threading.Event()
+        self.samples = []
+        self.start_time = None
+        self.throttles = None
+
+    ## Readers
+    def _frequencies(self):
+        freqs = dict()
+        for cpu in self.cpus:
+            khz = _number(os.path.join(CPU_PATH, 'cpu%d' % cpu, 'cpufreq',
+                                       'scaling_cur_freq'))
+            if khz:
+                freqs['cpu%d-freq' % cpu] = khz / 1000.0
+        return freqs
+
+    def _temperatures(self):
+        temps = dict()
+        for zone in self.zones:
+            millic = _number(os.path.join(zone, 'temp'))
+            if millic is not None:
+                name = os.path.basename(zone).replace('thermal_', '')
+                temps['temp-' + name] = millic / 1000.0
+        return temps
+
+    def _throttle_count(self):
+        """Thermal throttling events of the sampled CPUs, None if unknown"""
+        total = None
+        for cpu in self.cpus:
+            for counter in ['core_throttle_count', 'package_throttle_count']:
+                count = _number(os.path.join(CPU_PATH, 'cpu%d' % cpu,
+                                             'thermal_throttle', counter))
+                if count is not None:
+                    total = (total or 0) + count
+        return total
+
+    def _tree(self, pid):
+        """The process and all its descendants"""
+        pids = [pid]
+        for parent in pids:
+            for children in glob.glob('/proc/%d/task/*/children' % parent):
+                pids.extend([int(c) for c in (_read(children) or '').split()])
+        return pids
+
+    def _usage(self, pid):
+        """RSS (KiB) and CPU time (s) of a process tree"""
+        rss = 0
+        cpu = 0.0
+        for process in self._tree(pid):
+            statm = _read('/proc/%d/statm' % process)
+            stat = _read('/proc/%d/stat' % process)
+            if not statm or not stat:
+                continue
+            rss += int(statm.split()[1]) * self.page_size
+            # Fields after the command name, which may have spaces
+            fields = stat.rsplit(')', 1)[-1].split()
+            cpu += (int(fields[11]) + int(fields[12])) / self.ticks
+        return rss, cpu
+
+    ## Thread
+    def _sample(self, pid):
+        sample = {'time': time.monotonic() - self.start_time}
+        sample.update(self._frequencies())
+        sample.update(self._temperatures())
+        sample['rss'], sample['cpu-time'] = self._usage(pid)
+        self.samples.append(sample)
+
+    def _loop(self, pid):
+        # Keep this thread off the sampled (measured) cores, if it can
+        others = os.sched_getaffinity(0) - set(self.cpus)
+        if self.cpus and others:
+            os.sched_setaffinity(0, others)
+        # Sample at once, then every interval until stopped
+        self._sample(pid)
+        while not self.stopped.wait(self.interval):
+            self._sample(pid)
+
+    def start(self, pid):
+        """Starts sampling a process (and its children)"""
+        self.samples = []
+        self.start_time = time.monotonic()
+        self.throttles = self._throttle_count()
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self._loop, args=(pid,),
+                                       daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stops sampling, returns the summary and the samples"""
+        self.stopped.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+        return self.summary(), self.samples
+
+    def summary(self):
+        summary = dict()
+        freqs = [value for sample in self.samples
+                 for key, value in sample.items() if key.endswith('-freq')]
+        if freqs:
+            summary['freq-min'] = min(freqs)
+            summary['freq-mean'] = sum(freqs) / len(freqs)
+            summary['freq-max'] = max(freqs)
+            self.reference = max(self.reference or 0, summary['freq-max'])
+        temps = [value for sample in self.samples
+                 for key, value in sample.items() if key.startswith('temp-')]
+        if temps:
+            summary['temp-max'] = max(temps)
+
+        throttled = False
+        count = self._throttle_count()
+        if count is not None and self.throttles is not None:
+            summary['throttle-events'] = count - self.throttles
+            throttled = count > self.throttles
+        if freqs and summary['freq-mean'] < \
+           (1 - self.tolerance) * self.reference:
+            throttled = True
+        if freqs or count is not None:
+            summary['throttled'] = int(throttled)
+        return summary
@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+    Harness Micro-benchmarks
+    Times the harness' own hot paths (output parsing, result collation,
+    statistics, manifest, model discovery) with synthetic inputs of
+    realistic and huge sizes. Runs offline, no benchmark, compiler or perf
+    is executed.
+
+    Results are saved as JSON and compared against a baseline: times are
+    divided by a fixed pure Python calibration loop measured in the same
+    run, so baselines recorded on another machine are still comparable.
+    The fastest of many short timing rounds is compared. Rounds are taken
+    in passes over all cases (calibration included), so a noisy moment
+    only slows down one round of each case. The spread of the fastest
+    rounds (first quartile over fastest) of both the baseline and the
+    current run widens the threshold, so cases whose fastest rounds vary
+    need a larger slow down to count as regressions.
+
+    Usage: harness_microbench.py --usage
+"""
+
+import sys
+import os
+import re
+import json
+import argparse
+import platform
+import statistics
+import tempfile
+import timeit
+from subprocess import CompletedProcess
+
+from executor.LinuxPerf import LinuxPerfParser
+from executor.ResultsTable import ResultsTable
+from helper.SimpleStats import SimpleStats
+from helper.Manifest import Manifest
+from helper.Serializer import Serializer
+from models.ModelLoader import ModelLoader
+from models.ModelFactory import ModelFactory
+from models.benchmarks.BenchmarkFactory import BenchmarkFactory
+from models.compilers.CompilerModel import CompilerModel
+from models.machines.MachineModel import MachineModel
+
+BASELINE = os.path.join(os.path.dirname(os.path.realpath(__file__)),
+                        'microbench', 'baseline.json')
+
+# Number of iterations (results) and noise lines in program outputs
+SIZES = {
+    'realistic': {'iterations': 10, 'noise': 50, 'cores': 8},
+    'huge': {'iterations': 1000, 'noise': 20000, 'cores': 512}
+}
+
+## SYNTHETIC INPUTS
+OUTPUTS = {
+    'lulesh': ('cycle = {i}, time = 1.234567e-0{d}, dt=5.678901e-0{d}\n',
+"""Running problem size 30^3 per domain until completion
+Num processors: 1
+Num threads: 4
+Total number of elements: 27000
+
+To run other sizes, use -s <integer>.
+To run a fixed number of iterations, use -i <integer>.
+
+{noise}Run completed:
+   Problem size        =  30
+   MPI tasks           =  1
+   Iteration count     =  932
+   Final Origin Energy =  2.025075e+05
+   Testing Plane 0 of Energy Array on rank 0:
+        MaxAbsDiff   = 8.731149e-11
+        TotalAbsDiff = 3.219888e-10
+        MaxRelDiff   = 1.097342e-12
+
+Elapsed time         =      10.38 (s)
+Grind time (us/z/c)  = 0.41275107 (per dom)  ( 0.41275107 overall)
+FOM                  =   2422.7674 (z/s)
+"""),
+    'himeno': (' MFLOPS: 1234.{i} time(s): 0.12{d} 1.23e-03\n',
+"""mimax = 129 mjmax = 129 mkmax = 257
+imax = 128 jmax = 128 kmax =256
+Start rehearsal measurement process.
+Measure the performance in 3 times.
+
+{noise} Now, start the actual measurement process.
+ The loop will be excuted in 1000 times
+ This will take about one minute.
+ Wait for a while
+
+cpu : 30.123 sec.
+Loop executed for 1000 times
+Gosa : 8.832123e-04
+MFLOPS measured : 4567.891234
+Score based on Pentium III 600MHz using Fortran 77: 55.12
+Score based on MMX Pentium 200MHz : 12.34
+"""),
+    'openblas': ('   {d}  {i}   1.0     1     1  0.00   12.{d}0  1.00  FAIL\n',
+"""-------------------------------- AXPY ----------------------------------
+TST#    N  ALPHA  INCX  INCY   TIME  MFLOP  SpUp  TEST
+==== ===== ===== ===== ===== ===== ====== ===== =====
+{noise}----------------------------------- GEMM ----------------------------------
+TST# A B    M    N    K ALPHA  LDA  LDB  BETA  LDC  TIME  MFLOP  SpUp  TEST
+==== = = ==== ==== ==== ===== ==== ==== ===== ==== ===== ====== ===== =====
+   0 N N  128  128  128   1.0  128  128   1.0  128  0.00  1234.56  1.00 PASS
+   1 N T  128  128  128   1.0  128  128   1.0  128  0.00  1134.56  1.00 PASS
+   2 T N  256  256  256   1.0  256  256   1.0  256  0.01  2234.56  1.00 PASS
+   3 T T  256  256  256   1.0  256  256   1.0  256  0.01  2134.56  1.00 PASS
+-------------------------------- TRSM ----------------------------------
+TST# S U TA D    M    N ALPHA  LDA  LDB  TIME  MFLOP  SpUp  TEST
+==== = = == = ==== ==== ===== ==== ==== ===== ====== ===== =====
+   0 L L  N N  128  128   1.0  128  128  0.00   11.23  1.00 PASS
+4 tests run, 4 passed
+"""),
+    'perf': ('warning: iteration {i} residual 1.{d}e-05\n',
+"""{noise}
+ Performance counter stats for '/tmp/bench/benchmark/lulesh/lulesh2.0':
+
+         10,383.12 msec task-clock                #    3.988 CPUs utilized
+             1,234      context-switches          #    0.119 K/sec
+                12      cpu-migrations            #    0.001 K/sec
+            45,678      page-faults               #    0.004 M/sec
+    41,234,567,890      cycles                    #    3.971 GHz
+    98,765,432,100      instructions              #    2.40  insn per cycle
+    12,345,678,901      branches                  # 1189.012 M/sec
+        98,765,432      branch-misses             #    0.80% of all branches
+
+      10.387654321 seconds time elapsed
+""")
+}
+
+CMDLINE = ['/usr/bin/taskset', '-c', '1', '/usr/bin/perf', 'stat',
+           '/tmp/bench/benchmark/lulesh/lulesh2.0']
+
+def output(name, size):
+    """Program output with 'noise' lines of progress before the results"""
+    line, text = OUTPUTS[name]
+    noise = ''.join([line.format(i=i, d=i % 10)
+                     for i in range(SIZES[size]['noise'])])
+    return text.replace('{noise}', noise)
+
+def plugin(name):
+    """Benchmark model's own output parser, or perf's"""
+    if name == 'perf':
+        return LinuxPerfParser()
+    with tempfile.TemporaryDirectory() as root:
+        return BenchmarkFactory(name, root).getBenchmark().get_plugin()
+
+def results(size):
+    """Parsed results of all iterations, as collected by the controller"""
+    out = plugin('lulesh').parse(CMDLINE, output('lulesh', 'realistic'))
+    err = plugin('perf').parse(CMDLINE, output('perf', 'realistic'))
+    res = ResultsTable()
+    for i in range(SIZES[size]['iterations']):
+        # Slightly different values, so statistics have something to do
+        err_i = dict(err, cycles=str(41234567890 + i * 1000))
+        res.append(CompletedProcess(CMDLINE, 0, dict(out), err_i))
+    return res
+
+def text_results(size):
+    res = ResultsTable()
+    for _ in range(SIZES[size]['iterations']):
+        res.append(CompletedProcess(CMDLINE, 0, output('lulesh', 'realistic'),
+                                    output('perf', 'realistic')))
+    return res
+
+class SyntheticMachine(MachineModel):
+    """Machine model with lscpu-like information, without running lscpu"""
+
+    def __init__(self, cores):
+        self.cores = cores
+        super().__init__()
+        self.arch = 'x86_64'
+
+    def _get_cpu_info(self):
+        self.name = 'Synthetic'
+        self.cpu_info = {
+            'Architecture': 'x86_64',
+            'CPU(s)': str(self.cores),
+            'Thread(s) per core': '2',
+            'Socket(s)': '2',
+            'NUMA node(s)': '2',
+            'Model name': 'Synthetic CPU @ 3.00GHz',
+            'Flags': ' '.join(['flag%d' % i for i in range(150)]),
+            'threads': self.cores,
+            'core_span': 2,
+            'node_span': self.cores // 2,
+            'socket_span': self.cores // 2,
+            'l2_span': 2,
+            'l3_span': self.cores // 2
+        }
+        for cpu in range(self.cores):
+            self.cpu_info['processor %d' % cpu] = 'cpu MHz : 3000.000'
+
+    def _get_mem_info(self):
+        self.cpu_info['Mem'] = '256'
+        self.cpu_info['Swap'] = '8'
+
+def manifest(size, root):
+    """Manifest of a run with synthetic models"""
+    cores = SIZES[size]['cores']
+    benchmark = BenchmarkFactory('lulesh', root).getBenchmark()
+    compiler = CompilerModel()
+    compiler.name = compiler.cc_name = 'gcc'
+    compiler.version = '12.2.0'
+    compiler.probe = {'version': '12.2.0', 'target': 'x86_64-linux-gnu',
+                      'march': 'x86-64',
+                      'm_options': ['-m%d' % i for i in range(cores)],
+                      'search_dirs': ['/usr/lib/gcc/x86_64-linux-gnu/12'] * 8}
+    machine = SyntheticMachine(cores)
+    args = argparse.Namespace(benchmark_name='lulesh', toolchain='gcc',
+                              iterations=SIZES[size]['iterations'], size=30,
+                              threads=4, compiler_flags='-O3', verbose=0)
+    env = {'PATH': '/usr/bin:/bin', 'CC': 'gcc', 'OMP_NUM_THREADS': '4'}
+    env.update({'VAR%d' % i: 'x' * 64 for i in range(cores * 4)})
+    return Manifest(benchmark, compiler, machine, args, env)
+
+## CASES
+def cases(root):
+    """Name -> function to time, all inputs built upfront"""
+    todo = dict()
+
+    for size in SIZES:
+        for name in OUTPUTS:
+            plugin_, text = plugin(name), output(name, size)
+            todo['parse/%s/%s' % (name, size)] = \
+                lambda plugin_=plugin_, text=text: plugin_.parse(CMDLINE, text)
+
+        res, text = results(size), text_results(size)
+        todo['results/stdout/%s' % size] = res.stdout
+        todo['results/stderr/%s' % size] = res.stderr
+        todo['results/stdout_text/%s' % size] = text.stdout
+        for fmt in Serializer.formats:
+            serializer = Serializer(fmt)
+            rows_file = os.path.join(root, size + '.out')
+            todo['results/%s/%s' % (fmt, size)] = \
+                lambda res=res, serializer=serializer, rows_file=rows_file: \
+                    serializer.dump_rows(res.rows('err'), rows_file)
+
+        stats_file = os.path.join(root, size + '.stats')
+        todo['stats/dump/%s' % size] = \
+            lambda res=res, stats_file=stats_file: \
+                SimpleStats(res).dump(stats_file)
+
+        man, man_file = manifest(size, root), os.path.join(root, size + '.manifest')
+        todo['manifest/dump/%s' % size] = \
+            lambda man=man, man_file=man_file: man.dump(man_file)
+
+    # Model discovery: check every compiler model against a path without any
+    missing = os.path.join(root, 'missing')
+    def discovery():
+        try:
+            ModelFactory('compilers')._find_model(missing)
+        except ImportError:
+            pass
+    def cold_discovery():
+        ModelLoader._modules.clear()
+        discovery()
+    todo['models/discovery/cold'] = cold_discovery
+    todo['models/discovery/warm'] = discovery
+    return todo
+
+def calibration():
+    """Fixed pure Python work, to compare times across machines"""
+    data = {}
+    for i in range(2000):
+        data['key%d' % i] = str(i * 3.5)
+    return sum([float(v) for v in data.values() if re.match(r'\d', v)])
+
+def measure(todo, repeat):
+    """Per call times of each case: 'repeat' rounds of about 0.05s each,
+       one round of every case per pass"""
+    timers = dict()
+    for name, func in todo.items():
+        timer = timeit.Timer(func)
+        number, _ = timer.autorange()
+        timers[name] = (timer, max(1, number // 4))
+    times = dict((name, []) for name in todo)
+    for _ in range(repeat):
+        for name, (timer, number) in timers.items():
+            times[name].append(timer.timeit(number) / number)
+
+    results = dict()
+    for name, (_, number) in timers.items():
+        fastest = min(times[name])
+        # How reproducible the fastest rounds are (the slow ones are noise)
+        quartile = statistics.quantiles(times[name], n=4)[0]
+        results[name] = {'number': number, 'repeat': repeat, 'min': fastest,
+                         'median': statistics.median(times[name]),
+                         'spread': quartile / fastest - 1}
+    return results
+
+def spread(result):
+    """Noise of a case's rounds (older baselines only have the median)"""
+    return result.get('spread', result['median'] / result['min'] - 1)
+
+def compare(current, baseline, threshold):
+    """Prints the comparison, returns the regressed cases. Each case's
+       threshold is widened by the noise of both runs"""
+    regressions = []
+    print('%-34s %12s %12s %9s %9s' % ('case', 'min(us)', 'relative',
+                                       'vs base', 'limit'))
+    for name, result in sorted(current['cases'].items()):
+        base = baseline.get('cases', dict()).get(name) if baseline else None
+        verdict = ''
+        ratio = ''
+        limit = ''
+        if base:
+            change = result['relative'] / base['relative']
+            allowed = (1 + threshold) * (1 + spread(base) + spread(result))
+            ratio = '%8.2fx' % change
+            limit = '%8.2fx' % allowed
+            if change > allowed:
+                verdict = 'REGRESSION'
+                regressions.append(name)
+            elif change < 1 / allowed:
+                verdict = 'faster'
+        elif baseline:
+            verdict = 'new'
+        print('%-34s %12.1f %12.2f %9s %9s %s' % (name, result['min'] * 1e6,
+                                                  result['relative'], ratio,
+                                                  limit, verdict))
+    return regressions
+
+
+if __name__ == '__main__':
+    """Point of entry for the harness micro-benchmarks"""
+    parser = argparse.ArgumentParser(description='Harness Micro-benchmarks')
+
+    parser.add_argument('--filter', type=str,
+                         help='Only run cases matching this regex')
+    parser.add_argument('--repeat', type=int, default=20,
+                         help='Timing rounds per case (the fastest is compared)')
+    parser.add_argument('--output', type=str,
+                         help='Save the results (JSON) to this file')
+    parser.add_argument('--baseline', type=str, default=BASELINE,
+                         help='Baseline results to compare against')
+    parser.add_argument('--update-baseline', action='store_true',
+                         help='Save the results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                         help='Slow down that counts as regression (0.25 = 25%%), ' +
+                              "widened by the cases' noise")
+    args = parser.parse_args()
+
+    baseline = None
+    if os.path.isfile(args.baseline) and not args.update_baseline:
+        with open(args.baseline) as base:
+            baseline = json.load(base)
+
+    with tempfile.TemporaryDirectory() as root:
+        todo = dict((name, func) for name, func in cases(root).items()
+                    if not args.filter or re.search(args.filter, name))
+        todo['calibration'] = calibration
+        measured = measure(todo, args.repeat)
+        reference = measured.pop('calibration')['min']
+        current = {
+            'format': 2,
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'calibration': reference,
+            'cases': measured
+        }
+        for result in current['cases'].values():
+            result['relative'] = result['min'] / reference
+
+    regressions = compare(current, baseline, args.threshold)
+
+    for filename in [args.output, args.update_baseline and args.baseline]:
+        if filename:
+            os.makedirs(os.path.dirname(os.path.abspath(filename)),
+                        exist_ok=True)
+            with open(filename, 'w') as output:
+                json.dump(current, output, indent=2, sort_keys=True)
+                output.write('\n')
+
+    if regressions:
+        print('%d regressions (more than %d%% slower): %s' %
+              (len(regressions), args.threshold * 100, ', '.join(regressions)))
+        sys.exit(1)
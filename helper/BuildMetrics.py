@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+    Build metrics: compile time and peak memory of every translation unit
+    (logged by compiler_wrapper.py), wall time of the whole build and the
+    section sizes of the binaries, as a results table (like the runs').
+
+    Usage:
+      metrics = BuildMetrics('/tmp/runs/1234/build.jsonl')
+      cc = metrics.wrap(compiler_env['cc'])    # use as CC= (one word)
+      metrics.start()
+      ... build ...
+      metrics.stop(elapsed)
+      table = metrics.table(root_path, executables)
+
+    Rows are named after their source file (compilations), their output
+    (links), their binary (section sizes) or 'build' (the whole build).
+    Times are in seconds, memory and sizes in KiB and bytes.
+"""
+
+import os
+import sys
+import json
+import shlex
+import struct
+import hashlib
+from subprocess import CompletedProcess
+
+from executor.ResultsTable import ResultsTable
+
+WRAPPER = os.path.join(os.path.dirname(os.path.dirname(
+                       os.path.abspath(__file__))), 'compiler_wrapper.py')
+
+# ELF section header flags and types
+SHF_WRITE, SHF_ALLOC = 0x1, 0x2
+SHT_NOBITS = 8
+
+def section_sizes(filename):
+    """Berkeley style (like size) text, data and bss of an ELF file,
+       None if it is not an ELF file"""
+    with open(filename, 'rb') as elf:
+        ident = elf.read(16)
+        if len(ident) < 16 or ident[:4] != b'\x7fELF':
+            return None
+        is64 = ident[4] == 2
+        endian = '<' if ident[5] == 1 else '>'
+        if is64:
+            header = struct.unpack(endian + 'HHIQQQIHHHHHH', elf.read(48))
+            layout = 'IIQQQQIIQQ'
+        else:
+            header = struct.unpack(endian + 'HHIIIIIHHHHHH', elf.read(36))
+            layout = 'IIIIIIIIII'
+        shoff, shentsize, shnum = header[5], header[10], header[11]
+
+        sizes = {'text': 0, 'data': 0, 'bss': 0}
+        elf.seek(shoff)
+        table = elf.read(shentsize * shnum)
+        for number in range(shnum):
+            section = struct.unpack_from(endian + layout, table,
+                                         number * shentsize)
+            kind, flags, size = section[1], section[2], section[5]
+            if not flags & SHF_ALLOC:
+                continue
+            if kind == SHT_NOBITS:
+                sizes['bss'] += size
+            elif flags & SHF_WRITE:
+                sizes['data'] += size
+            else:
+                sizes['text'] += size
+    sizes['total'] = sizes['text'] + sizes['data'] + sizes['bss']
+    sizes['file_size'] = os.path.getsize(filename)
+    return sizes
+
+class BuildMetrics(object):
+    """Per translation unit log of a build, and its results table"""
+
+    def __init__(self, log):
+        self.log = log
+
+    def wrap(self, compiler):
+        """Compiler (as in CC=) going through the wrapper: an executable
+           script named as the compiler, so build systems that take CC as
+           a single word, or tell the compiler from its name, still work"""
+        # No such compiler in the toolchain (ex. Fortran)
+        if not compiler or compiler.endswith(os.sep):
+            return compiler
+        words = shlex.split(compiler)
+        digest = hashlib.sha1(compiler.encode('utf-8')).hexdigest()[:12]
+        path = os.path.join(os.path.dirname(os.path.abspath(self.log)),
+                            'wrappers', digest)
+        os.makedirs(path, exist_ok=True)
+        shim = os.path.join(path, os.path.basename(words[-1]))
+        command = [sys.executable, WRAPPER, self.log] + words
+        with open(shim, 'w') as script:
+            script.write('#!/bin/sh\nexec %s "$@"\n' %
+                         ' '.join([shlex.quote(w) for w in command]))
+        os.chmod(shim, 0o755)
+        return shim
+
+    def start(self):
+        """New build, forget the previous one's units"""
+        with open(self.log, 'w'):
+            pass
+
+    def stop(self, elapsed):
+        """Wall time of the whole build (all its commands)"""
+        with open(self.log, 'a') as stream:
+            stream.write(json.dumps({'kind': 'build', 'wall': elapsed}) + '\n')
+
+    def entries(self):
+        if not os.path.isfile(self.log):
+            return
+        with open(self.log) as stream:
+            for line in stream:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # Partial line of an interrupted compiler
+                    continue
+
+    def _name(self, path, root):
+        if not path:
+            return ''
+        if root and path.startswith(root + os.sep):
+            return os.path.relpath(path, root)
+        return os.path.basename(path)
+
+    def table(self, root=None, executables=None):
+        """Results table of the build: one row per compilation and link,
+           per binary (section sizes) and a 'build' summary row"""
+        table = ResultsTable()
+        total = {'_name': 'build', 'wall': 0.0, 'user': 0.0, 'sys': 0.0,
+                 'max_rss': 0, 'compile_units': 0, 'links': 0}
+        for entry in self.entries():
+            if entry['kind'] == 'build':
+                total['wall'] = entry['wall']
+                continue
+            if entry['kind'] == 'compile' and entry['sources']:
+                name = self._name(entry['sources'][0], root)
+                total['compile_units'] += 1
+            else:
+                name = self._name(entry['output'] or 'a.out', root)
+                total['links'] += entry['kind'] == 'link'
+            row = {'_name': name}
+            for key in ['wall', 'user', 'sys', 'max_rss']:
+                row[key] = entry[key]
+            total['user'] += entry['user']
+            total['sys'] += entry['sys']
+            total['max_rss'] = max(total['max_rss'], entry['max_rss'])
+            table.append(CompletedProcess([name], entry['returncode'], row, {}))
+
+        for exe in executables or []:
+            path = os.path.join(root or '', exe)
+            sizes = section_sizes(path) if os.path.isfile(path) else None
+            if not sizes:
+                continue
+            sizes['_name'] = os.path.basename(exe)
+            table.append(CompletedProcess([path], 0, sizes, {}))
+
+        if len(table) or total['wall']:
+            table.append(CompletedProcess(['build'], 0, total, {}))
+        return table
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+    Campaign file: a declarative matrix of benchmark jobs.
+
+    A campaign is a YAML file with a name, defaults common to all jobs and a
+    matrix of options to combine. Every combination becomes a job, unless it
+    matches one of the excludes. Option names are the same as the command
+    line options of the benchmark controller (with dashes or underscores).
+
+    Example:
+      name: nightly
+      defaults:
+        iterations: 5
+      matrix:
+        benchmark: [lulesh, himeno]
+        toolchain: [gcc, clang]
+        compiler-flags: ['', '-march=native']
+        build-mode: [default, pgo]
+        size: [1, 2]
+        threads: [1, 4]
+      exclude:
+        - {benchmark: himeno, threads: 4}
+
+    Jobs that only differ by options that don't change the build share the
+    same build, and all builds of a benchmark share the same sources.
+"""
+
+import hashlib
+import itertools
+import re
+import yaml
+
+class Campaign(object):
+    """Loads a campaign file and expands its matrix into jobs"""
+
+    # Options accepted in defaults/matrix/exclude, and their types
+    options = {
+        'benchmark': str,
+        'machine_type': str,
+        'toolchain': str,
+        'iterations': int,
+        'size': int,
+        'threads': int,
+        'compiler_flags': str,
+        'linker_flags': str,
+        'run_flags': str,
+        'build_mode': str
+    }
+
+    def __init__(self, filename):
+        with open(filename) as campaign:
+            data = yaml.safe_load(campaign)
+        if not isinstance(data, dict):
+            raise ValueError('Campaign %s must be a dictionary' % filename)
+
+        self.name = data.get('name')
+        if not self.name or not isinstance(self.name, str):
+            raise ValueError('Campaign %s needs a name' % filename)
+        self.name = self._slug(self.name)
+
+        self.defaults = self._options(data.get('defaults', dict()))
+        self.matrix = dict()
+        for key, values in self._options(data.get('matrix', dict()),
+                                         lists=True).items():
+            self.matrix[key] = values
+        self.exclude = [self._options(rule)
+                        for rule in data.get('exclude', list())]
+
+        if 'benchmark' not in self.matrix and 'benchmark' not in self.defaults:
+            raise ValueError('Campaign %s has no benchmark' % filename)
+
+    def _slug(self, name):
+        """Same clean up rules as the controller's unique names"""
+        return re.sub("[^a-zA-Z0-9_-]+", "", name.replace(' ', '_')).lower()
+
+    def _options(self, options, lists=False):
+        """Validates option names and value types"""
+        if not isinstance(options, dict):
+            raise TypeError('Campaign options must be a dictionary')
+
+        clean = dict()
+        for key, value in options.items():
+            name = key.replace('-', '_')
+            if name not in self.options:
+                raise ValueError('Unknown campaign option %s' % key)
+            values = value if lists else [value]
+            if not isinstance(values, list) or not values:
+                raise TypeError('Campaign matrix %s must be a list' % key)
+            for val in values:
+                if val is not None and not isinstance(val, self.options[name]):
+                    raise TypeError('Campaign option %s must be %s' %
+                                    (key, self.options[name].__name__))
+            clean[name] = value
+        return clean
+
+    def _excluded(self, job):
+        for rule in self.exclude:
+            if all(job.get(key) == value for key, value in rule.items()):
+                return True
+        return False
+
+    def jobs(self):
+        """All combinations of the matrix, with defaults, minus excludes"""
+        keys = sorted(self.matrix.keys())
+        jobs = []
+        for values in itertools.product(*[self.matrix[k] for k in keys]):
+            job = dict(self.defaults)
+            job.update(zip(keys, values))
+            if not self._excluded(job):
+                jobs.append(job)
+        return jobs
+
+    @staticmethod
+    def argv(job, root_path, unique_id):
+        """Benchmark controller command line for a job"""
+        argv = [job['benchmark'],
+                '--root-path', root_path,
+                '--unique-id', unique_id]
+        for option in ['machine_type', 'toolchain', 'iterations', 'size',
+                       'threads', 'compiler_flags', 'linker_flags', 'run_flags',
+                       'build_mode']:
+            if job.get(option) is None:
+                continue
+            # Flags start with dashes, so they can't be separate arguments
+            if option == 'machine_type':
+                argv.append('--machine_type=%s' % job[option])
+            else:
+                argv.append('--%s=%s' % (option.replace('_', '-'), job[option]))
+        return argv
+
+    def identity(self, prefix, job, keys):
+        """Short unique and readable name for a subset of a job's options"""
+        values = [(key, job.get(key)) for key in sorted(keys)]
+        digest = hashlib.sha1(repr(values).encode('utf-8')).hexdigest()[:8]
+        name = [prefix]
+        if job.get('toolchain') and 'toolchain' in keys:
+            name.append(job['toolchain'].rsplit('/', 1)[-1][:24])
+        name.append(digest)
+        return self._slug('-'.join(name))
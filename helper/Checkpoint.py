@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+    Records which stages of a run have completed, and with which inputs,
+    so that an interrupted run can be resumed without redoing them.
+
+    Stages are ordered (prepare, build, run). Each is stored with the hash
+    of its inputs (commands, flags, toolchain), chained with the previous
+    stage's, so a change in any stage invalidates all the following ones.
+    Benchmark iterations are appended to a JSON lines file as they finish.
+
+    Layout, inside the unique root path:
+      checkpoint/stages.yaml    stage -> inputs hash
+      checkpoint/run.jsonl      one completed run command per line
+"""
+
+import os
+import json
+import hashlib
+import yaml
+from subprocess import CompletedProcess
+
+class Checkpoint(object):
+    """Per-stage checkpoints of a benchmark run"""
+
+    stages = ['prepare', 'build', 'run']
+
+    def __init__(self, root_path):
+        self.path = os.path.join(root_path, 'checkpoint')
+        self.stages_file = os.path.join(self.path, 'stages.yaml')
+        self.run_file = os.path.join(self.path, 'run.jsonl')
+
+        self.done = dict()
+        if os.path.isfile(self.stages_file):
+            with open(self.stages_file) as stages:
+                self.done = yaml.safe_load(stages) or dict()
+
+    def hash(self, *inputs):
+        """Stable hash of (YAML serialisable) inputs"""
+        raw = yaml.safe_dump(list(inputs), default_flow_style=True)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def completed(self, stage, inputs_hash):
+        """True if the stage has completed with the same inputs"""
+        if stage not in self.stages:
+            raise ValueError('Unknown stage %s' % stage)
+        return self.done.get(stage) == inputs_hash
+
+    def _save(self):
+        os.makedirs(self.path, exist_ok=True)
+        tmpname = self.stages_file + '.tmp'
+        with open(tmpname, 'w') as stages:
+            stages.write(yaml.safe_dump(self.done, default_flow_style=False))
+        os.replace(tmpname, self.stages_file)
+
+    def reset(self, stage):
+        """Forgets the stage and all stages after it"""
+        for later in self.stages[self.stages.index(stage):]:
+            self.done.pop(later, None)
+        # All stages come before (or are) the run
+        if os.path.isfile(self.run_file):
+            os.unlink(self.run_file)
+        self._save()
+
+    def start(self, stage, inputs_hash):
+        """Starts a stage from scratch, invalidating it and what follows"""
+        self.reset(stage)
+        # Runs are checkpointed per iteration, so they start right away
+        if stage == 'run':
+            self.done[stage] = inputs_hash
+            self._save()
+
+    def complete(self, stage, inputs_hash):
+        """Marks the stage as completed with these inputs"""
+        self.done[stage] = inputs_hash
+        self._save()
+
+    def append(self, result):
+        """Saves one completed run command"""
+        os.makedirs(self.path, exist_ok=True)
+        entry = {
+            'args': result.args,
+            'returncode': result.returncode,
+            'stdout': result.stdout,
+            'stderr': result.stderr
+        }
+        with open(self.run_file, 'a') as run:
+            run.write(json.dumps(entry) + '\n')
+            run.flush()
+            os.fsync(run.fileno())
+
+    def results(self):
+        """All run commands completed so far, as CompletedProcess"""
+        results = []
+        if not os.path.isfile(self.run_file):
+            return results
+        valid = 0
+        with open(self.run_file, 'rb') as run:
+            for line in run:
+                # A crash can leave half a line behind, drop it
+                try:
+                    entry = json.loads(line.decode('utf-8'))
+                except ValueError:
+                    break
+                valid += len(line)
+                results.append(CompletedProcess(entry['args'],
+                                                entry['returncode'],
+                                                entry['stdout'],
+                                                entry['stderr']))
+        if valid != os.path.getsize(self.run_file):
+            os.truncate(self.run_file, valid)
+        return results
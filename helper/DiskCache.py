@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+    Small persistent key/value store, shared by all harness invocations.
+
+    Each key is stored as a separate YAML file under a namespace directory,
+    so concurrent harness processes only race on the same key, and writes
+    are atomic (write to temporary file, then rename).
+
+    The root defaults to ~/.cache/benchmark_harness and can be moved with
+    the BENCHMARK_HARNESS_CACHE environment variable.
+
+    Usage:
+      cache = DiskCache('compilers')
+      value = cache.get(key)
+      if value is None:
+          value = expensive()
+          cache.set(key, value)
+"""
+
+import os
+import hashlib
+import tempfile
+import yaml
+
+class DiskCache(object):
+    """YAML-backed key/value store in a cache namespace"""
+
+    def __init__(self, namespace, root=None):
+        if not namespace or not isinstance(namespace, str):
+            raise TypeError('Cache namespace has to be a non-empty string')
+
+        if not root:
+            root = os.environ.get('BENCHMARK_HARNESS_CACHE')
+        if not root:
+            root = os.path.join(os.path.expanduser('~'), '.cache',
+                                'benchmark_harness')
+        self.path = os.path.join(root, namespace)
+
+    def _filename(self, key):
+        """Keys can be arbitrary strings (paths, urls), so hash them"""
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.path, digest + '.yaml')
+
+    def get(self, key):
+        """Returns the stored value, None if missing or unreadable"""
+        filename = self._filename(key)
+        if not os.path.isfile(filename):
+            return None
+        try:
+            with open(filename) as cached:
+                entry = yaml.safe_load(cached)
+        except (OSError, yaml.YAMLError):
+            return None
+        # Protect against (unlikely) hash collisions
+        if not isinstance(entry, dict) or entry.get('key') != key:
+            return None
+        return entry.get('value')
+
+    def set(self, key, value):
+        """Stores the value, atomically replacing any previous entry"""
+        os.makedirs(self.path, exist_ok=True)
+        handle, tmpname = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'w') as cached:
+                cached.write(yaml.safe_dump({'key': key, 'value': value},
+                                            default_flow_style=False))
+            os.replace(tmpname, self._filename(key))
+        except BaseException:
+            if os.path.exists(tmpname):
+                os.unlink(tmpname)
+            raise
+
+    def delete(self, key):
+        """Removes the entry, if any"""
+        filename = self._filename(key)
+        if os.path.isfile(filename):
+            os.unlink(filename)
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+    Extracts tarballs as they arrive (ex. while downloading, see Fetcher),
+    without writing the archive to disk.
+
+    The compressed chunks are fed, from a separate thread, to an external
+    decompressor (xz and zstd with all cores, pigz, lbzip2...) when there is
+    one for the archive's extension, or to Python's own (single threaded),
+    and the tar stream is extracted member by member. Members can be left
+    out with shell patterns (ex. 'share/doc/*'), matched against the path
+    inside the archive's top directory.
+
+    Members that would land outside of the destination (absolute paths,
+    '..', links pointing out of it, also through links extracted before
+    them) and special files are rejected (ValueError), before anything is
+    written for them. Errors in the chunks (ex. a failed download or
+    checksum) are raised once the decompressor has stopped.
+
+    Usage:
+      extractor = Extractor('/tmp/compiler', exclude=['share/doc/*'])
+      extractor.extract('clang+llvm.tar.xz', fetcher.stream(url))
+"""
+
+import os
+import shutil
+import fnmatch
+import tarfile
+import threading
+import subprocess
+
+CHUNK = 1 << 20
+
+# Extensions, and the decompressors to use (first one found)
+DECOMPRESSORS = [
+    (('.tar.xz', '.txz'), [['xz', '-dc', '-T0']]),
+    (('.tar.zst', '.tzst'), [['zstd', '-dc', '-T0']]),
+    (('.tar.gz', '.tgz'), [['pigz', '-dc'], ['gzip', '-dc']]),
+    (('.tar.bz2', '.tbz2'), [['lbzip2', '-dc'], ['pbzip2', '-dc'],
+                             ['bzip2', '-dc']]),
+]
+
+class Extractor(object):
+    """Streaming, filtered and safe tarball extraction"""
+
+    def __init__(self, path, exclude=None, logger=None):
+        self.path = os.path.realpath(path)
+        self.exclude = list(exclude or [])
+        self.logger = logger
+        self.stopped = threading.Event()
+        self.error = None
+        # Number of members extracted and left out, by the last extract()
+        self.extracted = 0
+        self.excluded = 0
+
+    def _log(self, msg):
+        if self.logger:
+            self.logger.debug(msg)
+
+    def _decompressor(self, name):
+        """Command to decompress the archive, None to leave it to Python"""
+        for extensions, commands in DECOMPRESSORS:
+            if name.endswith(extensions):
+                for cmd in commands:
+                    if shutil.which(cmd[0]):
+                        return cmd
+        return None
+
+    ## Members
+    def _inside(self, name):
+        """Relative path that stays inside the destination"""
+        name = os.path.normpath(name)
+        return not os.path.isabs(name) and name != '..' and \
+               not name.startswith('..' + os.sep)
+
+    def _resolves_inside(self, name):
+        """Path inside the destination, once the links already extracted
+           are followed"""
+        real = os.path.realpath(os.path.join(self.path, name))
+        return real == self.path or real.startswith(self.path + os.sep)
+
+    def _check(self, member):
+        """Rejects members that would write outside of the destination"""
+        parent = os.path.dirname(member.name)
+        if not self._inside(member.name) or not self._resolves_inside(parent):
+            raise ValueError('Unsafe path in archive: %s' % member.name)
+        if member.issym():
+            target = os.path.join(parent, member.linkname)
+            if os.path.isabs(member.linkname) or not self._inside(target) or \
+               not self._resolves_inside(target):
+                raise ValueError('Unsafe link in archive: %s -> %s' %
+                                 (member.name, member.linkname))
+        elif member.islnk():
+            if not self._inside(member.linkname) or \
+               not self._resolves_inside(member.linkname):
+                raise ValueError('Unsafe link in archive: %s -> %s' %
+                                 (member.name, member.linkname))
+        elif not (member.isfile() or member.isdir()):
+            raise ValueError('Special file in archive: %s' % member.name)
+
+    def _excluded(self, member, skipped):
+        """Left out by the patterns (or a hard link to one that was)"""
+        if member.islnk() and os.path.normpath(member.linkname) in skipped:
+            return True
+        inner = os.path.normpath(member.name).split(os.sep, 1)[-1]
+        return any(fnmatch.fnmatch(inner, pattern) for pattern in self.exclude)
+
+    ## Stream
+    def _feed(self, chunks, sink):
+        """Writes the chunks to the decompressor, keeps the first error"""
+        try:
+            for chunk in chunks:
+                if self.stopped.is_set():
+                    break
+                sink.write(chunk)
+        except BrokenPipeError:
+            # The decompressor stopped, it will tell why
+            pass
+        except (RuntimeError, OSError) as err:
+            self.error = err
+        finally:
+            if hasattr(chunks, 'close'):
+                chunks.close()
+            try:
+                sink.close()
+            except BrokenPipeError:
+                pass
+
+    def extract(self, name, chunks):
+        """Extracts the archive 'name' (its extension tells the compression)
+           from an iterable of chunks"""
+        os.makedirs(self.path, exist_ok=True)
+        self.stopped.clear()
+        self.error = None
+        self.extracted = 0
+        self.excluded = 0
+
+        cmd = self._decompressor(name)
+        proc = None
+        if cmd:
+            proc = subprocess.Popen(cmd, stdin=subprocess.PIPE,
+                                    stdout=subprocess.PIPE,
+                                    stderr=subprocess.PIPE)
+            sink, source, mode = proc.stdin, proc.stdout, 'r|'
+        else:
+            read, write = os.pipe()
+            sink, source = os.fdopen(write, 'wb'), os.fdopen(read, 'rb')
+            mode = 'r|*'
+        self._log('Extracting %s with %s' % (name, ' '.join(cmd or
+                                                          ['python'])))
+        feeder = threading.Thread(target=self._feed, args=(chunks, sink),
+                                  daemon=True)
+        feeder.start()
+
+        # Extraction filters (Python 3.12, backported) as a second line
+        options = dict()
+        if hasattr(tarfile, 'tar_filter'):
+            options['filter'] = 'tar'
+        failure = None
+        killed = False
+        try:
+            skipped = set()
+            with tarfile.open(fileobj=source, mode=mode) as tar:
+                for member in tar:
+                    if self._excluded(member, skipped):
+                        skipped.add(os.path.normpath(member.name))
+                        self.excluded += 1
+                        continue
+                    self._check(member)
+                    tar.extract(member, self.path, **options)
+                    self.extracted += 1
+            # Padding after the end of the archive
+            while source.read(CHUNK):
+                pass
+        except (tarfile.TarError, ValueError, OSError) as err:
+            failure = err
+        finally:
+            self.stopped.set()
+            # Stopped by us, unless it had already failed on its own
+            if failure and proc and proc.poll() is None:
+                proc.kill()
+                killed = True
+            source.close()
+            feeder.join()
+            if proc:
+                proc.wait()
+
+        errors = ''
+        if proc:
+            errors = proc.stderr.read().decode().strip()
+            proc.stderr.close()
+        # The chunks' error explains the others (ex. a truncated archive)
+        if self.error:
+            raise self.error
+        if isinstance(failure, ValueError):
+            raise failure
+        if proc and proc.returncode and not killed:
+            raise RuntimeError('Error decompressing %s: %s' % (name, errors))
+        if failure:
+            raise RuntimeError('Error extracting %s: %s' % (name, failure))
+        self._log('Extracted %d members of %s (%d left out)' %
+                  (self.extracted, name, self.excluded))
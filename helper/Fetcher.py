@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+    Downloads files over HTTP(S): pooled connections, retries, resume and
+    SHA-256 verification, shared by the toolchains and benchmark sources.
+
+    Files are downloaded to '<filename>.part' and only renamed once complete
+    (and verified), so a finished file is never partial. Interrupted
+    downloads resume from what was already written (HTTP Range), as long as
+    the remote file didn't change (same ETag or Last-Modified). Large files
+    on servers that accept ranges are split in segments, downloaded in
+    parallel and then joined.
+
+    The expected SHA-256 can be passed, or appended to the URL as a
+    '#sha256=<hex>' fragment. A file that doesn't match is removed and the
+    download fails (RuntimeError). Files that are already there are only
+    checked (if there's a checksum), not downloaded again.
+
+    Other URLs (file://, ftp://) are copied with urllib, in a single stream.
+
+    Files can also be streamed (ex. to extract them while downloading),
+    resuming on errors the same way, but without being saved.
+
+    Usage:
+      fetcher = Fetcher(jobs=4, logger=logger)
+      fetcher.fetch(url, '/tmp/src/file.tar.gz', sha256='...')
+      fetcher.fetch_all([(url1, path1), (url2, path2, sha256)])
+      for chunk in fetcher.stream(url, sha256='...'):
+          ...
+      fetcher.close()
+"""
+
+import os
+import re
+import time
+import shutil
+import hashlib
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, wait
+import requests
+
+CHUNK = 1 << 20
+
+def sha256sum(filename):
+    """Hex SHA-256 of a file"""
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as data:
+        for block in iter(lambda: data.read(CHUNK), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def split_checksum(url):
+    """URL without its '#sha256=' fragment, and the checksum (or None)"""
+    match = re.match(r'(.*)#sha256=([0-9a-fA-F]{64})$', url)
+    if not match:
+        return url, None
+    return match.group(1), match.group(2).lower()
+
+class Fetcher(object):
+    """Parallel, resumable, verified downloads"""
+
+    def __init__(self, jobs=4, segments=4, segment_size=16 << 20, retries=3,
+                 timeout=30.0, logger=None):
+        if jobs < 1 or segments < 1:
+            raise ValueError('Fetcher needs at least one job and segment')
+        self.segments = segments
+        # Files smaller than two segments are downloaded in one stream
+        self.segment_size = segment_size
+        self.retries = retries
+        self.timeout = timeout
+        self.logger = logger
+        # Whole files, and the segments of large ones (separate pools, so
+        # files waiting for their segments never starve them)
+        self.files = ThreadPoolExecutor(max_workers=jobs)
+        self.parts = ThreadPoolExecutor(max_workers=segments)
+        # Connection pooling (one session per thread)
+        self.local = threading.local()
+
+    def _log(self, msg):
+        if self.logger:
+            self.logger.debug(msg)
+
+    def _session(self):
+        if not hasattr(self.local, 'session'):
+            self.local.session = requests.Session()
+        return self.local.session
+
+    def close(self):
+        self.files.shutdown()
+        self.parts.shutdown()
+
+    ## Remote file
+    def _probe(self, url):
+        """Final URL (after redirects), size, range support and validator
+           (ETag or Last-Modified), as much as the server tells"""
+        try:
+            reply = self._session().head(url, allow_redirects=True,
+                                         timeout=self.timeout)
+        except requests.RequestException:
+            return url, None, False, None
+        if reply.status_code != 200:
+            return url, None, False, None
+        headers = reply.headers
+        size = None
+        if 'Content-Length' in headers and 'Content-Encoding' not in headers:
+            size = int(headers['Content-Length'])
+        ranges = headers.get('Accept-Ranges', '').lower() == 'bytes'
+        validator = headers.get('ETag')
+        # Weak ETags can't be used to resume
+        if not validator or validator.startswith('W/'):
+            validator = headers.get('Last-Modified')
+        return reply.url, size, ranges, validator
+
+    def _leftovers(self, partial):
+        """Partial download, or its segments"""
+        directory, name = os.path.split(partial)
+        return [os.path.join(directory, leftover)
+                for leftover in os.listdir(directory)
+                if re.match(re.escape(name) + r'(\.\d+)?$', leftover)]
+
+    def _drop(self, partial):
+        """Removes a partial download, and its stamp"""
+        for leftover in self._leftovers(partial) + [partial + '.id']:
+            if os.path.isfile(leftover):
+                os.remove(leftover)
+
+    def _same_remote(self, partial, validator):
+        """Drops the partial downloads of another version of the file"""
+        stamp = partial + '.id'
+        known = None
+        if os.path.isfile(stamp):
+            with open(stamp) as data:
+                known = data.read()
+        if known == (validator or ''):
+            return
+        self._drop(partial)
+        with open(stamp, 'w') as data:
+            data.write(validator or '')
+
+    ## Downloads
+    def _check(self, reply, url):
+        """Fails at once on client errors, retries on server errors"""
+        status = reply.status_code
+        if 400 <= status < 500 and status not in (408, 429):
+            raise RuntimeError('Error %d downloading %s' % (status, url))
+        reply.raise_for_status()
+
+    def _range(self, url, part, start, end, ranges, validator):
+        """Downloads bytes [start, end) (end None: up to the end of file)
+           into 'part', resuming from what's there, with retries"""
+        for attempt in range(self.retries + 1):
+            have = os.path.getsize(part) if os.path.isfile(part) else 0
+            if end is not None and start + have >= end:
+                return
+            headers = dict()
+            if ranges and (start + have or end is not None):
+                last = '' if end is None else str(end - 1)
+                headers['Range'] = 'bytes=%d-%s' % (start + have, last)
+                if validator:
+                    headers['If-Range'] = validator
+            try:
+                with self._session().get(url, headers=headers, stream=True,
+                                         timeout=self.timeout) as reply:
+                    status = reply.status_code
+                    # Already complete (ex. interrupted before the rename)
+                    if status == 416 and end is None and have:
+                        return
+                    self._check(reply, url)
+                    # The whole file: start over (only if that's what we want)
+                    if status != 206 and (start or end is not None):
+                        raise RuntimeError("Server ignored the range of %s" %
+                                           url)
+                    mode = 'ab' if status == 206 else 'wb'
+                    with open(part, mode) as out:
+                        for chunk in reply.iter_content(CHUNK):
+                            out.write(chunk)
+                size = os.path.getsize(part)
+                if end is not None and start + size < end:
+                    raise requests.ConnectionError('Short read: %d of %d bytes'
+                                                   % (size, end - start))
+                return
+            except (requests.RequestException, OSError) as err:
+                if attempt == self.retries:
+                    raise RuntimeError('Error downloading %s: %s' % (url, err))
+                self._log('Retrying %s (%s)' % (url, err))
+                time.sleep(2 ** attempt)
+
+    def _segmented(self, url, partial, size, validator):
+        """Downloads segments in parallel, then joins them"""
+        count = min(self.segments, size // self.segment_size)
+        bounds = [size * idx // count for idx in range(count + 1)]
+        parts = ['%s.%d' % (partial, idx) for idx in range(count)]
+        futures = [self.parts.submit(self._range, url, parts[idx],
+                                     bounds[idx], bounds[idx + 1], True,
+                                     validator)
+                   for idx in range(count)]
+        # All segments stop before failing, so none is left writing
+        wait(futures)
+        for future in futures:
+            future.result()
+        with open(partial, 'wb') as out:
+            for part in parts:
+                with open(part, 'rb') as data:
+                    shutil.copyfileobj(data, out, CHUNK)
+        for part in parts:
+            os.remove(part)
+
+    def _copy(self, url, partial):
+        """Anything urllib can read (file://, ftp://)"""
+        try:
+            with urllib.request.urlopen(url, timeout=self.timeout) as data, \
+                 open(partial, 'wb') as out:
+                shutil.copyfileobj(data, out, CHUNK)
+        except OSError as err:
+            raise RuntimeError('Error downloading %s: %s' % (url, err))
+
+    def fetch(self, url, filename, sha256=None):
+        """Downloads url to filename (unless already there), returns it"""
+        url, fragment = split_checksum(url)
+        sha256 = (sha256 or fragment or '').lower() or None
+
+        if os.path.isfile(filename):
+            if not sha256 or sha256sum(filename) == sha256:
+                self._log('Already downloaded: %s' % filename)
+                return filename
+            os.remove(filename)
+        os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+
+        partial = os.path.abspath(filename) + '.part'
+        begin = time.monotonic()
+        try:
+            if re.match('https?://', url):
+                url, size, ranges, validator = self._probe(url)
+                self._same_remote(partial, validator if ranges else None)
+                if ranges and size and self.segments > 1 and \
+                   size >= 2 * self.segment_size:
+                    self._segmented(url, partial, size, validator)
+                else:
+                    self._range(url, partial, 0, None, ranges, validator)
+            else:
+                self._copy(url, partial)
+        except RuntimeError:
+            # Whatever was downloaded is kept, to resume later
+            if not self._leftovers(partial):
+                self._drop(partial)
+            raise
+
+        if sha256:
+            actual = sha256sum(partial)
+            if actual != sha256:
+                self._drop(partial)
+                raise RuntimeError('Checksum mismatch for %s: expected %s, '
+                                   'got %s' % (url, sha256, actual))
+        os.replace(partial, filename)
+        self._drop(partial)
+        self._log('Downloaded %s (%d bytes) in %.2fs' %
+                  (url, os.path.getsize(filename), time.monotonic() - begin))
+        return filename
+
+    def stream(self, url, sha256=None):
+        """Yields the contents of url in chunks, without saving it.
+           Interrupted transfers resume where they stopped (if the server
+           accepts ranges), the checksum is verified after the last chunk"""
+        url, fragment = split_checksum(url)
+        sha256 = (sha256 or fragment or '').lower() or None
+        digest = hashlib.sha256()
+
+        if not re.match('https?://', url):
+            try:
+                with urllib.request.urlopen(url, timeout=self.timeout) as data:
+                    for chunk in iter(lambda: data.read(CHUNK), b''):
+                        digest.update(chunk)
+                        yield chunk
+            except OSError as err:
+                raise RuntimeError('Error downloading %s: %s' % (url, err))
+        else:
+            url, size, ranges, validator = self._probe(url)
+            offset = 0
+            for attempt in range(self.retries + 1):
+                headers = dict()
+                if offset:
+                    if not ranges:
+                        raise RuntimeError("Can't resume %s" % url)
+                    headers['Range'] = 'bytes=%d-' % offset
+                    if validator:
+                        headers['If-Range'] = validator
+                try:
+                    with self._session().get(url, headers=headers, stream=True,
+                                             timeout=self.timeout) as reply:
+                        self._check(reply, url)
+                        if offset and reply.status_code != 206:
+                            raise RuntimeError('%s changed while downloading' %
+                                               url)
+                        for chunk in reply.iter_content(CHUNK):
+                            offset += len(chunk)
+                            digest.update(chunk)
+                            yield chunk
+                    break
+                except requests.RequestException as err:
+                    if attempt == self.retries:
+                        raise RuntimeError('Error downloading %s: %s' %
+                                           (url, err))
+                    self._log('Resuming %s at %d bytes (%s)' %
+                              (url, offset, err))
+                    time.sleep(2 ** attempt)
+
+        if sha256 and digest.hexdigest() != sha256:
+            raise RuntimeError('Checksum mismatch for %s: expected %s, got %s'
+                               % (url, sha256, digest.hexdigest()))
+
+    def fetch_all(self, downloads):
+        """Downloads (url, filename[, sha256]) concurrently, returns the
+           filenames. All downloads finish (or fail) before raising the
+           first error, so the others can be resumed"""
+        futures = [self.files.submit(self.fetch, *download)
+                   for download in downloads]
+        errors = []
+        filenames = []
+        for future in futures:
+            try:
+                filenames.append(future.result())
+            except RuntimeError as err:
+                errors.append(err)
+        if errors:
+            raise errors[0]
+        return filenames
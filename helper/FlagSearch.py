@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+    Search strategies over a space of compiler flags, for autotuning.
+
+    A flag space has on/off flags and choices (one of many values, '' for
+    none), ex:
+      flags: ['-funroll-loops', '-fomit-frame-pointer']
+      choices:
+        march: ['', '-march=native']
+        unroll: ['', '--param=max-unroll-times=4', '--param=max-unroll-times=8']
+
+    A configuration is a tuple with one integer per flag (0 or 1) and per
+    choice (the index of the value), the first configuration (all zeros)
+    being the baseline: no extra flags.
+
+    Usage:
+      search = FlagSearch(FlagSpace(flags, choices), 'hill-climbing')
+      for config in search.propose(4):
+          search.tell(config, score)     # higher is better, None if invalid
+      search.best()
+
+    Strategies:
+      random         uniformly random configurations
+      hill-climbing  neighbours (one flag or choice changed) of the best
+                     configuration, random restart when all were tried
+      evolutionary   uniform crossover of tournament selected parents from
+                     the best configurations, plus mutations
+
+    Configurations (and different configurations with the same flags) are
+    only proposed once.
+"""
+
+import random
+
+class FlagSpace(object):
+    """Flags and choices, and the configurations over them"""
+
+    def __init__(self, flags=None, choices=None):
+        self.flags = list(flags or [])
+        self.choices = dict(choices or {})
+        for name, values in self.choices.items():
+            if not isinstance(values, list) or not values:
+                raise TypeError('Choice %s must be a non-empty list' % name)
+        self.names = sorted(self.choices.keys())
+        # Number of values of each dimension
+        self.sizes = [2] * len(self.flags) + \
+                     [len(self.choices[n]) for n in self.names]
+        if not self.sizes:
+            raise ValueError('Empty flag space')
+
+    def baseline(self):
+        return tuple([0] * len(self.sizes))
+
+    def flags_of(self, config):
+        """Compiler flags of a configuration, as a string"""
+        flags = [flag for flag, on in zip(self.flags, config) if on]
+        for name, index in zip(self.names, config[len(self.flags):]):
+            flags.append(str(self.choices[name][index]))
+        return ' '.join([flag for flag in flags if flag])
+
+    def random(self, rng):
+        return tuple([rng.randrange(size) for size in self.sizes])
+
+    def neighbours(self, config):
+        """Configurations with one flag or choice changed"""
+        for dim, size in enumerate(self.sizes):
+            for value in range(size):
+                if value != config[dim]:
+                    yield config[:dim] + (value,) + config[dim + 1:]
+
+    def mutate(self, config, rng, rate=None):
+        rate = rate or 1.0 / len(self.sizes)
+        return tuple([rng.randrange(size) if rng.random() < rate else value
+                      for value, size in zip(config, self.sizes)])
+
+    def crossover(self, first, second, rng):
+        return tuple([a if rng.random() < 0.5 else b
+                      for a, b in zip(first, second)])
+
+    def size(self):
+        total = 1
+        for size in self.sizes:
+            total *= size
+        return total
+
+class FlagSearch(object):
+    """Proposes configurations to evaluate, learning from their scores"""
+
+    strategies = ['random', 'hill-climbing', 'evolutionary']
+
+    def __init__(self, space, strategy='random', seed=None, population=8):
+        if strategy not in self.strategies:
+            raise ValueError('Unknown search strategy %s' % strategy)
+        self.space = space
+        self.strategy = strategy
+        self.population = population
+        self.rng = random.Random(seed)
+        # Flags -> score (None for invalid), and the configuration
+        self.scores = dict()
+        self.configs = dict()
+
+    def seen(self, config):
+        return self.space.flags_of(config) in self.scores
+
+    def tell(self, config, score):
+        flags = self.space.flags_of(config)
+        self.scores[flags] = score
+        self.configs[flags] = config
+
+    def evaluated(self):
+        return len(self.scores)
+
+    def exhausted(self):
+        return self.evaluated() >= self.space.size()
+
+    def best(self):
+        """Best (configuration, score), None if nothing valid yet"""
+        valid = [(score, flags) for flags, score in self.scores.items()
+                 if score is not None]
+        if not valid:
+            return None
+        score, flags = max(valid)
+        return self.configs[flags], score
+
+    def _ranked(self):
+        """Valid configurations, best first"""
+        valid = [(score, flags) for flags, score in self.scores.items()
+                 if score is not None]
+        return [self.configs[flags] for _, flags in sorted(valid, reverse=True)]
+
+    def _candidates(self):
+        """Endless stream of configurations, per strategy"""
+        if not self.scores:
+            yield self.space.baseline()
+
+        if self.strategy == 'random':
+            while True:
+                yield self.space.random(self.rng)
+
+        elif self.strategy == 'hill-climbing':
+            best = self.best()
+            start = best[0] if best else self.space.baseline()
+            neighbours = list(self.space.neighbours(start))
+            self.rng.shuffle(neighbours)
+            for config in neighbours:
+                yield config
+            # Local optimum: restart from a random configuration
+            while True:
+                config = self.space.random(self.rng)
+                yield config
+                for neighbour in self.space.neighbours(config):
+                    yield neighbour
+
+        else:
+            parents = self._ranked()[:self.population]
+            # Not enough valid configurations to breed yet
+            while len(parents) < 2:
+                yield self.space.random(self.rng)
+            while True:
+                first = self._tournament(parents)
+                second = self._tournament(parents)
+                child = self.space.crossover(first, second, self.rng)
+                yield self.space.mutate(child, self.rng)
+
+    def _tournament(self, parents):
+        """Best of two random parents (parents are ranked best first)"""
+        first = self.rng.randrange(len(parents))
+        second = self.rng.randrange(len(parents))
+        return parents[min(first, second)]
+
+    def propose(self, count):
+        """Up to 'count' configurations never evaluated (nor proposed)"""
+        proposed = []
+        flags = set()
+        # Give up if the space is (nearly) exhausted
+        tries = 0
+        for config in self._candidates():
+            tries += 1
+            if tries > 1000 * max(count, 1):
+                break
+            if self.seen(config) or self.space.flags_of(config) in flags:
+                continue
+            proposed.append(config)
+            flags.add(self.space.flags_of(config))
+            if len(proposed) >= count:
+                break
+        return proposed
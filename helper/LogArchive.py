@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+    Compressed archive of the raw output of every command, kept across
+    runs (wiping a run's directory doesn't touch it).
+
+    The archive is a directory with:
+      logs.gz      one gzip member per output (stdout, stderr) of each
+                   command, concatenated (still a valid gzip file)
+      index.jsonl  one JSON object per command: run, benchmark, stage,
+                   command line, return code, and the offset/length of
+                   its stdout/stderr members in logs.gz
+
+    Each output can be read on its own, by seeking to its member and only
+    decompressing that. Entries are identified by their position in the
+    index (from 0). Writers lock the index, so many runs (threads or
+    processes) can share an archive.
+
+    Usage:
+      archive = LogArchive('/tmp/runs/archive')
+      archive.add(cmd, returncode, out, err, run='1234', stage='run')
+      for entry in archive.entries(stage='run'):
+          out, err = archive.read(entry)
+"""
+
+import os
+import json
+import time
+import gzip
+import fcntl
+import threading
+
+class LogArchive(object):
+    """Append-only compressed logs, with an index for random access"""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(self.path, exist_ok=True)
+        self.logs = os.path.join(self.path, 'logs.gz')
+        self.index = os.path.join(self.path, 'index.jsonl')
+        self.lock = threading.Lock()
+
+    def _member(self, logs, text):
+        """Writes one gzip member at the end, returns [offset, length, size]"""
+        data = (text or '').encode('utf-8')
+        member = gzip.compress(data, compresslevel=6)
+        offset = logs.seek(0, os.SEEK_END)
+        logs.write(member)
+        return [offset, len(member), len(data)]
+
+    def add(self, command, returncode, stdout, stderr, **fields):
+        """Archives one command's raw outputs (text), with extra fields
+           (run, benchmark, stage...) for selecting them later"""
+        entry = {'time': time.time(),
+                 'command': [str(arg) for arg in command],
+                 'returncode': returncode}
+        entry.update(fields)
+        with self.lock, open(self.index, 'a') as index:
+            fcntl.flock(index, fcntl.LOCK_EX)
+            try:
+                with open(self.logs, 'ab') as logs:
+                    entry['out'] = self._member(logs, stdout)
+                    entry['err'] = self._member(logs, stderr)
+                index.write(json.dumps(entry) + '\n')
+            finally:
+                fcntl.flock(index, fcntl.LOCK_UN)
+
+    def entries(self, **match):
+        """Index entries (with their 'id') whose fields match"""
+        if not os.path.isfile(self.index):
+            return
+        with open(self.index) as index:
+            for number, line in enumerate(index):
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Partial line of an interrupted writer
+                    continue
+                if all(entry.get(k) == v for k, v in match.items()
+                       if v is not None):
+                    entry['id'] = number
+                    yield entry
+
+    def entry(self, number):
+        for entry in self.entries():
+            if entry['id'] == number:
+                return entry
+        raise KeyError('No entry %d in archive %s' % (number, self.path))
+
+    def read(self, entry):
+        """Raw stdout and stderr of an entry, only decompressing those"""
+        outputs = []
+        with open(self.logs, 'rb') as logs:
+            for stream in ['out', 'err']:
+                offset, length, _ = entry[stream]
+                logs.seek(offset)
+                outputs.append(gzip.decompress(logs.read(length)).decode('utf-8'))
+        return outputs[0], outputs[1]
@@ -10,8 +10,8 @@
 from models.compilers.CompilerModel import CompilerModel
 from models.benchmarks.BenchmarkModel import BenchmarkModel
 from models.machines.MachineModel import MachineModel
+from helper.Serializer import Serializer
 import re
-import yaml
 
 class Manifest(object):
     def __init__(self, benchmark, compiler, machine, args=None, env=None):
@@ -24,11 +24,13 @@ class Manifest(object):
         self.args = args
         self.env = env
 
-    def _clear_vars(self, module):
+    def _clear_vars(self, module, exclude=()):
         """Clear up things that we don't want"""
 
         fields = dict()
         for name in vars(module):
+            if name in exclude:
+                continue
             field = getattr(module,name)
             if field is None or isinstance(field, (str, int, float, list, tuple)):
                 fields[name] = field
@@ -54,19 +56,24 @@ class Manifest(object):
             fields[key] = self.env[key]
         return fields
 
-    def dump(self, filename):
-        """Dump all info collected from all models"""
+    def dump(self, filename, serializer=None):
+        """Dump all info collected from all models, returns the file name"""
 
         manifest = dict()
         manifest['benchmark'] = self._clear_vars(self.benchmark)
-        manifest['compiler'] = self._clear_vars(self.compiler)
+        # What the probe found is in the toolchain section only
+        probed = ()
+        if self.compiler.probe:
+            probed = ('probe', 'target', 'march')
+        manifest['compiler'] = self._clear_vars(self.compiler, probed)
         manifest['machine'] = self._clear_vars(self.machine)
         manifest['hardware'] = self.machine.cpu_info
+        if self.compiler.probe:
+            manifest['toolchain'] = self.compiler.probe
         if self.args:
             manifest['args'] = self._clear_vars(self.args)
         if self.env:
             manifest['env'] = self._clear_env(self.env)
 
-        with open(filename, 'w') as stdout:
-            stdout.write(yaml.dump(manifest, default_flow_style=False))
-            stdout.close()
+        serializer = serializer or Serializer()
+        return serializer.dump(manifest, filename)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+    Paired comparison of two results tables, run in the same rounds (ex.
+    gcc and clang iterations interleaved: A B A B...).
+
+    The n-th iteration of each executable in one table is paired with the
+    n-th in the other, so drift (thermal, background load) affects both
+    sides of a pair alike and cancels out in their difference.
+
+    Usage:
+      stats = PairedStats(gcc_results, clang_results, confidence=0.95)
+      for row in stats.rows():
+          row['delta'], row['delta_ci'], row['change'], row['change_ci']
+
+    For every metric of both tables: the mean of each side, the mean of the
+    per-pair deltas (other - baseline) and relative changes (%), with their
+    confidence intervals (Student's t).
+"""
+
+import math
+import statistics
+
+from executor.ResultsTable import ResultsTable
+
+def t_cdf(t, df):
+    """Student's t distribution function, for integer degrees of freedom
+       (closed form, Abramowitz and Stegun 26.7.3 and 26.7.4)"""
+    theta = math.atan(abs(t) / math.sqrt(df))
+    cos2 = math.cos(theta) ** 2
+    if df % 2:
+        term, series = 1.0, 0.0
+        for k in range(1, (df - 1) // 2 + 1):
+            series += term
+            term *= cos2 * 2 * k / (2 * k + 1)
+        area = 2 / math.pi * (theta + math.sin(theta) * math.cos(theta) *
+                              series)
+    else:
+        term, series = 1.0, 0.0
+        for k in range(1, df // 2 + 1):
+            series += term
+            term *= cos2 * (2 * k - 1) / (2 * k)
+        area = math.sin(theta) * series
+    return 0.5 + math.copysign(area, t) / 2
+
+def t_quantile(p, df):
+    """Quantile of Student's t distribution (bisection on t_cdf, exact to
+       the float's precision)"""
+    if p < 0.5:
+        return -t_quantile(1 - p, df)
+    low, high = 0.0, 1.0
+    while t_cdf(high, df) < p:
+        low, high = high, high * 2
+    for _ in range(100):
+        middle = (low + high) / 2
+        if middle in (low, high):
+            break
+        if t_cdf(middle, df) < p:
+            low = middle
+        else:
+            high = middle
+    return (low + high) / 2
+
+def interval(values, confidence):
+    """Mean and confidence interval [low, high], None if too few values"""
+    if len(values) < 2:
+        return None
+    mean = statistics.fmean(values)
+    margin = t_quantile(0.5 + confidence / 2, len(values) - 1) * \
+             statistics.stdev(values) / math.sqrt(len(values))
+    return mean, [mean - margin, mean + margin]
+
+class PairedStats(object):
+    """Per-pair deltas between a baseline and another results table"""
+
+    def __init__(self, baseline, other, confidence=0.95):
+        if not isinstance(baseline, ResultsTable) or \
+           not isinstance(other, ResultsTable):
+            raise TypeError('results should be results tables')
+        if not 0 < confidence < 1:
+            raise ValueError('Confidence must be between 0 and 1')
+
+        self.baseline = baseline
+        self.other = other
+        self.confidence = confidence
+
+    def _rounds(self, table, key, stream, name):
+        """Values of a metric in each of an executable's rows, NaN where
+           the row doesn't have it (unlike ResultsTable.column)"""
+        column = getattr(table, stream).columns.get(key)
+        if column is None or name not in table.names:
+            return []
+        idx = table.names.index(name)
+        return [v for v, n in zip(column, table.name_idx) if n == idx]
+
+    def pairs(self, key, stream, name):
+        """(baseline, other) values of the same iterations, without the
+           pairs where either side lacks the metric"""
+        return [(a, b) for a, b in
+                zip(self._rounds(self.baseline, key, stream, name),
+                    self._rounds(self.other, key, stream, name))
+                if not math.isnan(a) and not math.isnan(b)]
+
+    def rows(self):
+        """One row per executable and metric both tables have"""
+        for stream in ['out', 'err']:
+            metrics = [key for key in self.baseline.metrics(stream)
+                       if key in self.other.metrics(stream)]
+            for name in self.baseline.names:
+                if name not in self.other.names:
+                    continue
+                for key in metrics:
+                    pairs = self.pairs(key, stream, name)
+                    if pairs:
+                        yield self._row(stream, name, key, pairs)
+
+    def _row(self, stream, name, key, pairs):
+        deltas = [b - a for a, b in pairs]
+        changes = [(b / a - 1) * 100 for a, b in pairs if a]
+        row = {'stream': stream, 'name': name, 'metric': key,
+               'pairs': len(pairs),
+               'baseline': statistics.fmean([a for a, _ in pairs]),
+               'other': statistics.fmean([b for _, b in pairs]),
+               'delta': statistics.fmean(deltas),
+               'deltas': deltas}
+        delta = interval(deltas, self.confidence)
+        if delta:
+            row['delta_ci'] = delta[1]
+        if changes:
+            row['change'] = statistics.fmean(changes)
+            change = interval(changes, self.confidence)
+            if change:
+                row['change_ci'] = change[1]
+        return row
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+    Times the harness' own phases (model loading, fetching, building,
+    parsing, dumping results) and the commands they run, so the harness
+    overhead can be told apart from the benchmark's.
+
+    Usage:
+      timer = PhaseTimer()
+      with timer.phase('setup'):
+          with timer.phase('models'):
+              ...
+      timer.command(['make'], elapsed=1.2, parse=0.01)
+      timer.dump('results/lulesh.phases')
+
+    Phases nest ('setup/models'), the time spent waiting on commands is
+    accounted to the innermost phase (and all its parents). Harness time is
+    the rest: the phase's time minus its commands' (parsing included).
+"""
+
+import time
+import resource
+import yaml
+from contextlib import contextmanager
+
+class PhaseTimer(object):
+    """Wall clock time of nested phases and their commands"""
+
+    def __init__(self):
+        self.start = time.monotonic()
+        self.stack = []
+        # Phases in start order, and the commands they ran
+        self.phases = []
+        self.commands = []
+
+    @contextmanager
+    def phase(self, name):
+        entry = {'phase': '/'.join(self.stack + [name]), 'elapsed': None}
+        self.phases.append(entry)
+        self.stack.append(name)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            entry['elapsed'] = time.monotonic() - start
+            self.stack.pop()
+
+    def command(self, cmd, elapsed, parse=0.0):
+        """A command run in the current phase, parse time included"""
+        self.commands.append({
+            'phase': '/'.join(self.stack),
+            'command': ' '.join([str(arg) for arg in cmd]),
+            'elapsed': elapsed,
+            'parse': parse
+        })
+
+    def _children(self, phase):
+        """Time spent waiting on commands in a phase (and its sub-phases)"""
+        return sum([cmd['elapsed'] - cmd['parse'] for cmd in self.commands
+                    if cmd['phase'] == phase or
+                       cmd['phase'].startswith(phase + '/')], 0.0)
+
+    def report(self):
+        """Phases and commands, with the harness/commands split"""
+        total = time.monotonic() - self.start
+        children = sum([cmd['elapsed'] - cmd['parse']
+                        for cmd in self.commands], 0.0)
+        own = resource.getrusage(resource.RUSAGE_SELF)
+        waited = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+        phases = []
+        for entry in self.phases:
+            # Phases still open (ex. the one dumping the report) are left out
+            elapsed = entry['elapsed']
+            if elapsed is None:
+                continue
+            commands = self._children(entry['phase'])
+            phases.append({
+                'phase': entry['phase'],
+                'elapsed': round(elapsed, 6),
+                'commands': round(commands, 6),
+                'harness': round(elapsed - commands, 6)
+            })
+
+        return {
+            'total': round(total, 6),
+            'commands': round(children, 6),
+            'harness': round(total - children, 6),
+            'cpu': {
+                'harness': round(own.ru_utime + own.ru_stime, 6),
+                'commands': round(waited.ru_utime + waited.ru_stime, 6)
+            },
+            'phases': phases,
+            'command_list': [dict(cmd, elapsed=round(cmd['elapsed'], 6),
+                                  parse=round(cmd['parse'], 6))
+                             for cmd in self.commands]
+        }
+
+    def dump(self, filename):
+        with open(filename, 'w') as phases:
+            phases.write(yaml.dump(self.report(), default_flow_style=False))
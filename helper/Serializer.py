@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+    Writes results, statistics and manifests in the chosen output format:
+      yaml   YAML, with the libyaml C emitter when available (default)
+      jsonl  one JSON object per line for tables (results, statistics),
+             plain JSON for documents (manifest)
+      csv    one line per row for tables, plain JSON for documents
+
+    Values are written with their native types (numbers stay numbers), so
+    readers don't need to parse them again.
+
+    Usage:
+      serializer = Serializer('csv')
+      filename = serializer.dump_rows(rows, 'results/lulesh.out')
+      filename = serializer.dump(manifest, 'results/lulesh.manifest')
+
+    Both return the actual file name, with the format's extension (none for
+    YAML, to keep the file names of previous versions).
+"""
+
+import csv
+import json
+import yaml
+
+# C emitter, if PyYAML was built with libyaml
+Dumper = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+
+def _plain(data):
+    """Only types that safe dumpers know about (ex. no tuples)"""
+    if isinstance(data, dict):
+        return {key: _plain(value) for key, value in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [_plain(value) for value in data]
+    return data
+
+def to_yaml(data):
+    """YAML text of plain data (dicts, lists, strings, numbers)"""
+    return yaml.dump(_plain(data), Dumper=Dumper, default_flow_style=False)
+
+class Serializer(object):
+    """Writes tables (lists of dicts) and documents in one format"""
+
+    formats = ['yaml', 'jsonl', 'csv']
+
+    def __init__(self, output_format='yaml'):
+        if output_format not in self.formats:
+            raise ValueError('Unknown output format %s' % output_format)
+        self.format = output_format
+
+    def dump_rows(self, rows, filename):
+        """Writes a table, returns the file name"""
+        if self.format == 'yaml':
+            with open(filename, 'w') as output:
+                output.write(to_yaml(list(rows)))
+            return filename
+
+        if self.format == 'jsonl':
+            filename += '.jsonl'
+            with open(filename, 'w') as output:
+                for row in rows:
+                    output.write(json.dumps(row, default=str) + '\n')
+            return filename
+
+        # CSV needs all columns upfront (rows may not have all metrics)
+        filename += '.csv'
+        rows = list(rows)
+        fields = []
+        for row in rows:
+            for key in row:
+                if key not in fields:
+                    fields.append(key)
+        with open(filename, 'w', newline='') as output:
+            writer = csv.DictWriter(output, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(rows)
+        return filename
+
+    def dump(self, data, filename):
+        """Writes a document (nested dicts), returns the file name"""
+        if self.format == 'yaml':
+            with open(filename, 'w') as output:
+                output.write(to_yaml(data))
+            return filename
+
+        filename += '.json'
+        with open(filename, 'w') as output:
+            json.dump(_plain(data), output, indent=2, sort_keys=True,
+                      default=str)
+            output.write('\n')
+        return filename
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+    Live telemetry of benchmark runs, as they happen.
+
+    Events: one JSON object per line, with the time, the run id and the
+    event type, plus the event's fields:
+      stage_start  {stage}
+      stage_stop   {stage, status: done|failed, elapsed}
+      command      {stage, command, returncode, elapsed}
+      result       {iteration, total, values}  (one per parsed iteration)
+      failure      {stage, error}  (once: not again for the stage that
+                                   fails on a failed command)
+
+    The event target can be a file (appended to), 'unix:/path/to/socket' or
+    'tcp:host:port' (connected to, ex. a log shipper). If the target goes
+    away, events are dropped with a warning, the run carries on.
+
+    Metrics: OpenMetrics (Prometheus) text exposition of the progress and
+    the latest iteration counters of every run, written to a file after
+    every update and/or served over HTTP on /metrics.
+
+    Usage:
+      telemetry = Telemetry(events='run.jsonl', metrics='run.prom')
+      telemetry.labels('run1', benchmark='lulesh')
+      with telemetry.stage('run1', 'build'):
+          ...
+      telemetry.close()
+
+    Without targets, it only keeps the state, so it's always safe to call.
+"""
+
+import os
+import json
+import math
+import time
+import socket
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Serves self.server.telemetry's metrics on /metrics"""
+
+    def do_GET(self):
+        if self.path != '/metrics':
+            self.send_error(404)
+            return
+        body = self.server.telemetry.metrics().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', Telemetry.content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class Telemetry(object):
+    """Event stream and OpenMetrics state, shared by all runs"""
+
+    content_type = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+
+    def __init__(self, events=None, metrics=None, listen=None, logger=None):
+        self.logger = logger
+        self.lock = threading.Lock()
+        # Run id -> metrics state
+        self.runs = dict()
+
+        self.stream = None
+        if events:
+            self.stream = self._open(events)
+
+        self.metrics_path = metrics
+        self.server = None
+        if listen:
+            host, _, port = str(listen).rpartition(':')
+            self.server = ThreadingHTTPServer((host or '127.0.0.1', int(port)),
+                                              MetricsHandler)
+            self.server.daemon_threads = True
+            self.server.telemetry = self
+            thread = threading.Thread(target=self.server.serve_forever,
+                                      daemon=True)
+            thread.start()
+            self._log('Metrics at http://%s:%d/metrics' %
+                      self.server.server_address[:2])
+
+    def _log(self, msg):
+        if self.logger:
+            self.logger.info(msg)
+
+    def _open(self, target):
+        """File or socket to write events to"""
+        if target.startswith('unix:'):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(target[len('unix:'):])
+        elif target.startswith('tcp:'):
+            host, _, port = target[len('tcp:'):].rpartition(':')
+            sock = socket.create_connection((host, int(port)))
+        else:
+            return open(target, 'a')
+        return sock.makefile('w', encoding='utf-8')
+
+    def _state(self, run):
+        if run not in self.runs:
+            self.runs[run] = {
+                'labels': dict(),
+                'stage': None,
+                'completed': 0,
+                'total': 0,
+                'commands': 0,
+                'failures': 0,
+                'seconds': None,
+                'values': dict(),
+                'updated': time.time()
+            }
+        return self.runs[run]
+
+    def emit(self, run, event, **fields):
+        """Writes an event, updates the metrics"""
+        now = time.time()
+        data = {'time': now, 'run': run, 'event': event}
+        data.update(fields)
+        with self.lock:
+            self._state(run)['updated'] = now
+            if self.stream:
+                try:
+                    self.stream.write(json.dumps(data, default=str) + '\n')
+                    self.stream.flush()
+                except OSError as err:
+                    if self.logger:
+                        self.logger.warning('Telemetry stream lost: %s' % err)
+                    self.stream = None
+            if self.metrics_path:
+                self._dump()
+
+    def labels(self, run, **labels):
+        """Identifies the run in the metrics (benchmark, toolchain, ...)"""
+        with self.lock:
+            self._state(run)['labels'].update(
+                {k: str(v) for k, v in labels.items() if v is not None})
+
+    @contextmanager
+    def stage(self, run, name):
+        """Reports the start/stop of a stage, and its failure if raised"""
+        with self.lock:
+            state = self._state(run)
+            state['stage'] = name
+            failures = state['failures']
+        self.emit(run, 'stage_start', stage=name)
+        start = time.monotonic()
+        status = 'failed'
+        try:
+            yield
+            status = 'done'
+        except (Exception, SystemExit) as err:
+            # A failed command of the stage was already reported, the stage
+            # fails because of it: count it once
+            with self.lock:
+                reported = self._state(run)['failures'] > failures
+            if not reported:
+                self.failure(run, repr(err))
+            raise
+        finally:
+            self.emit(run, 'stage_stop', stage=name, status=status,
+                      elapsed=time.monotonic() - start)
+
+    def command(self, run, command, returncode, elapsed):
+        with self.lock:
+            state = self._state(run)
+            state['commands'] += 1
+            stage = state['stage']
+        self.emit(run, 'command', stage=stage, command=command,
+                  returncode=returncode, elapsed=elapsed)
+        if returncode:
+            self.failure(run, 'Command %s returned %d' % (command, returncode))
+
+    def progress(self, run, completed, total):
+        """Iterations completed so far (ex. resumed), without results"""
+        with self.lock:
+            state = self._state(run)
+            state['completed'] = completed
+            state['total'] = total
+
+    def result(self, run, iteration, total, values, elapsed=None):
+        """Parsed results of one iteration (counted from 1)"""
+        with self.lock:
+            state = self._state(run)
+            state['completed'] = iteration
+            state['total'] = total
+            state['seconds'] = elapsed
+            state['values'] = dict()
+            for key, value in values.items():
+                try:
+                    state['values'][key] = float(value)
+                except (TypeError, ValueError):
+                    continue
+        self.emit(run, 'result', iteration=iteration, total=total,
+                  values=values)
+
+    def failure(self, run, error):
+        with self.lock:
+            state = self._state(run)
+            state['failures'] += 1
+            stage = state['stage']
+        self.emit(run, 'failure', stage=stage, error=error)
+
+    ## METRICS
+    def _escape(self, value):
+        return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n',
+                                                                      '\\n')
+
+    def _labels(self, run, state, extra=None):
+        labels = dict(state['labels'], run=run)
+        if extra:
+            labels.update(extra)
+        return '{%s}' % ','.join(['%s="%s"' % (k, self._escape(str(v)))
+                                  for k, v in sorted(labels.items())])
+
+    def _number(self, value):
+        """OpenMetrics' float (NaN, +Inf and -Inf are spelled out)"""
+        value = float(value)
+        if math.isnan(value):
+            return 'NaN'
+        if math.isinf(value):
+            return '+Inf' if value > 0 else '-Inf'
+        return repr(value)
+
+    def _metrics(self):
+        """OpenMetrics text of all runs (with the lock)"""
+        families = [
+            ('harness_iterations_completed', 'gauge',
+             'Benchmark iterations completed'),
+            ('harness_iterations', 'gauge',
+             'Benchmark iterations requested'),
+            ('harness_stage', 'gauge',
+             'Current (or last) stage of the run'),
+            ('harness_commands', 'counter',
+             'Commands executed'),
+            ('harness_failures', 'counter',
+             'Failed commands and stages'),
+            ('harness_iteration_seconds', 'gauge',
+             'Wall clock time of the last iteration'),
+            ('harness_iteration_value', 'gauge',
+             'Parsed counters of the last iteration'),
+            ('harness_last_event_timestamp_seconds', 'gauge',
+             'Time of the last event, to detect stalls')
+        ]
+        lines = []
+        for family, kind, text in families:
+            lines.append('# TYPE %s %s' % (family, kind))
+            lines.append('# HELP %s %s' % (family, text))
+            for run in sorted(self.runs):
+                state = self.runs[run]
+                samples = []
+                if family == 'harness_iterations_completed':
+                    samples.append((None, state['completed']))
+                elif family == 'harness_iterations':
+                    samples.append((None, state['total']))
+                elif family == 'harness_stage' and state['stage']:
+                    samples.append(({'stage': state['stage']}, 1))
+                elif family == 'harness_commands':
+                    samples.append((None, state['commands']))
+                elif family == 'harness_failures':
+                    samples.append((None, state['failures']))
+                elif family == 'harness_iteration_seconds' and \
+                     state['seconds'] is not None:
+                    samples.append((None, state['seconds']))
+                elif family == 'harness_iteration_value':
+                    for key in sorted(state['values']):
+                        samples.append(({'counter': key}, state['values'][key]))
+                elif family == 'harness_last_event_timestamp_seconds':
+                    samples.append((None, state['updated']))
+                suffix = '_total' if kind == 'counter' else ''
+                for extra, value in samples:
+                    lines.append('%s%s%s %s' % (family, suffix,
+                                                self._labels(run, state, extra),
+                                                self._number(value)))
+        lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+    def metrics(self):
+        with self.lock:
+            return self._metrics()
+
+    def _dump(self):
+        """Atomically replaces the metrics file (with the lock)"""
+        tmp = '%s.%d.tmp' % (self.metrics_path, os.getpid())
+        try:
+            with open(tmp, 'w') as metrics:
+                metrics.write(self._metrics())
+            os.replace(tmp, self.metrics_path)
+        except OSError as err:
+            if self.logger:
+                self.logger.warning('Cannot write metrics: %s' % err)
+            self.metrics_path = None
+
+    def close(self):
+        with self.lock:
+            if self.stream:
+                self.stream.close()
+                self.stream = None
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
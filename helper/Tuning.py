@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+    Tuning file: a compiler flag search for one benchmark job.
+
+    A tuning is a campaign whose jobs are not a fixed matrix, but the
+    candidates of a flag search (see FlagSearch), evaluated a batch at a
+    time. The job options are the same as the campaign's defaults.
+
+    Example:
+      name: lulesh-tune
+      job:
+        benchmark: lulesh
+        toolchain: gcc
+        iterations: 3
+        size: 1
+      objective:
+        metric: FOM        # metric of the benchmark's output (or perf's)
+        stream: out        # out (benchmark's parser) or err (perf)
+        goal: max          # or min
+      search:
+        strategy: evolutionary   # random, hill-climbing, evolutionary
+        budget: 3600             # seconds, no new batch after that
+        evaluations: 200         # at most (optional)
+        batch: 4                 # candidates built in parallel
+        seed: 1                  # (optional)
+      space:               # optional, defaults to the compiler model's
+        flags: ['-funroll-loops', '-fno-tree-vectorize']
+        choices:
+          arch: ['', '-march=native']
+          unroll: ['', '--param=max-unroll-times=4']
+
+    Candidate flags are added to the job's compiler flags.
+"""
+
+import yaml
+
+from helper.Campaign import Campaign
+from helper.FlagSearch import FlagSearch
+
+class Tuning(Campaign):
+    """Loads a tuning file, its jobs are the current batch of candidates"""
+
+    def __init__(self, filename):
+        with open(filename) as tuning:
+            data = yaml.safe_load(tuning)
+        if not isinstance(data, dict):
+            raise ValueError('Tuning %s must be a dictionary' % filename)
+
+        self.name = data.get('name')
+        if not self.name or not isinstance(self.name, str):
+            raise ValueError('Tuning %s needs a name' % filename)
+        self.name = self._slug(self.name)
+
+        self.defaults = self._options(data.get('job', dict()))
+        if 'benchmark' not in self.defaults:
+            raise ValueError('Tuning %s has no benchmark' % filename)
+        self.matrix = dict()
+        self.exclude = []
+
+        objective = data.get('objective', dict())
+        if not isinstance(objective, dict) or not objective.get('metric'):
+            raise ValueError('Tuning %s needs an objective metric' % filename)
+        self.metric = str(objective['metric'])
+        self.stream = objective.get('stream', 'out')
+        self.goal = objective.get('goal', 'max')
+        if self.stream not in ['out', 'err']:
+            raise ValueError('Objective stream must be out or err')
+        if self.goal not in ['max', 'min']:
+            raise ValueError('Objective goal must be max or min')
+
+        search = data.get('search', dict())
+        if not isinstance(search, dict):
+            raise TypeError('Tuning search must be a dictionary')
+        self.strategy = search.get('strategy', 'random')
+        if self.strategy not in FlagSearch.strategies:
+            raise ValueError('Unknown search strategy %s' % self.strategy)
+        self.budget = float(search.get('budget', 3600))
+        self.evaluations = search.get('evaluations')
+        self.batch = int(search.get('batch', 4))
+        self.seed = search.get('seed')
+        if self.batch < 1:
+            raise ValueError('Tuning batch must be positive')
+
+        self.space = data.get('space')
+        if self.space is not None and not isinstance(self.space, dict):
+            raise TypeError('Tuning space must be a dictionary')
+
+        # Candidates being evaluated, as jobs
+        self.candidates = []
+
+    def score(self, value):
+        """Higher is better, whatever the goal"""
+        if value is None:
+            return None
+        return value if self.goal == 'max' else -value
+
+    def value(self, score):
+        if score is None:
+            return None
+        return score if self.goal == 'max' else -score
+
+    def job(self, flags):
+        """Job of a candidate's flags"""
+        job = dict(self.defaults)
+        base = job.get('compiler_flags') or ''
+        job['compiler_flags'] = ' '.join([f for f in [base, flags] if f])
+        return job
+
+    def jobs(self):
+        return list(self.candidates)
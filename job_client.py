@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+    Job Client
+    Submits a job to a running job server (job_server.py) and streams its
+    progress. Takes the same job options as the benchmark controller.
+
+    This only uses the standard library, so that starting it is cheap: all
+    the heavy lifting happens in the (already warm) server.
+
+    Usage: job_client.py --usage
+"""
+
+import sys
+import os
+import json
+import socket
+import argparse
+
+def request(socket_path, data):
+    """Sends the request, yields the events streamed back"""
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.connect(socket_path)
+    try:
+        client.sendall((json.dumps(data) + '\n').encode('utf-8'))
+        for line in client.makefile('r', encoding='utf-8'):
+            yield json.loads(line)
+    finally:
+        client.close()
+
+
+if __name__ == '__main__':
+    """Point of entry for job submissions"""
+    parser = argparse.ArgumentParser(description='Benchmark Harness Job Client')
+
+    parser.add_argument('benchmark_name', type=str, nargs='?',
+                        help='The name of the benchmark to run')
+    parser.add_argument('--socket', type=str, default='./harness.sock',
+                        help='The job server socket')
+    parser.add_argument('--status', action='store_true',
+                        help='Print the server status instead')
+    parser.add_argument('--results-path', type=str,
+                        help='Also write the results files to this directory')
+    parser.add_argument('-q', '--quiet', action='store_true',
+                        help='Only print PASS/FAIL')
+
+    # Same job options as the benchmark controller
+    parser.add_argument('--toolchain', type=str,
+                        help='The url/name of the toolchain to compile the benchmark')
+    parser.add_argument('--iterations', type=int,
+                        help='Number of iterations to run the same build')
+    parser.add_argument('--size', type=int,
+                        help='Meta variable that determines the size of the benchmark run')
+    parser.add_argument('--threads', type=int,
+                        help='Number of threads (OpenMP, multiple dispatch, MPI)')
+    parser.add_argument('--compiler-flags', type=str,
+                        help='The extra compiler flags')
+    parser.add_argument('--linker-flags', type=str,
+                        help='The extra linker flags')
+    parser.add_argument('--run-flags', type=str,
+                        help='The benchmark execution options')
+    args = parser.parse_args()
+
+    if args.status:
+        for event in request(args.socket, {'type': 'status'}):
+            print(json.dumps(event, indent=2))
+        sys.exit(0)
+    if not args.benchmark_name:
+        parser.error('benchmark_name is required to submit a job')
+
+    job = {'benchmark': args.benchmark_name}
+    for option in ['toolchain', 'iterations', 'size', 'threads',
+                   'compiler_flags', 'linker_flags', 'run_flags']:
+        if getattr(args, option) is not None:
+            job[option] = getattr(args, option)
+
+    success = False
+    for event in request(args.socket, {'type': 'submit', 'job': job}):
+        if event['event'] == 'queued' and not args.quiet:
+            print('%s: queued at position %d' % (event['id'], event['position']))
+        elif event['event'] == 'stage' and not args.quiet:
+            print('%s: %s' % (event['id'], event['stage']))
+        elif event['event'] in ('done', 'failed'):
+            result = event['result']
+            success = event['event'] == 'done' and result['valid']
+            if result.get('error'):
+                print('%s: error: %s' % (event['id'], result['error']))
+            if result.get('results_path') and not args.quiet:
+                print('%s: results at %s' % (event['id'], result['results_path']))
+            if args.results_path:
+                os.makedirs(args.results_path, exist_ok=True)
+                for filename, text in result.get('files', dict()).items():
+                    path = os.path.join(args.results_path,
+                                        os.path.basename(filename))
+                    with open(path, 'w') as output:
+                        output.write(text)
+        elif event['event'] == 'error':
+            print('error: %s' % event['error'])
+
+    print("PASS" if success else "FAIL")
+    if not success:
+        sys.exit(1)
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+    Job Server
+    Long running harness, accepting jobs from job_client.py over a Unix
+    socket. The machine model, compiler probes, toolchains and benchmark
+    sources are loaded once and kept warm for all jobs.
+
+    Usage: job_server.py --usage
+"""
+
+import argparse
+
+from helper.BenchmarkLogger import BenchmarkLogger
+from service.JobRunner import JobRunner
+from service.JobServer import JobServer
+
+if __name__ == '__main__':
+    """Point of entry for the job server"""
+    parser = argparse.ArgumentParser(description='Benchmark Harness Job Server')
+
+    parser.add_argument('--socket', type=str, default='./harness.sock',
+                        help='The Unix socket to listen on')
+    parser.add_argument('--machine_type', type=str,
+                        help='The type of this machine (default: detect)')
+    parser.add_argument('--root-path', type=str, default='./server',
+                        help='The root directory for toolchains, jobs, results')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='Jobs preparing/building in parallel ' +
+                             '(benchmark runs are always exclusive)')
+    parser.add_argument('--measure-threads', type=int, default=1,
+                        help='Threads of the runs whose cores are kept ' +
+                             'away from builds (more wait for the builds)')
+    parser.add_argument('--no-calibration', action='store_true',
+                        help='Measure on core 2 and the topology order, ' +
+                             'without ranking the cores by noise')
+    parser.add_argument('-v', '--verbose', action='count', default=0,
+                        help='The verbosity of logging output')
+    args = parser.parse_args()
+
+    logger = BenchmarkLogger(__name__, parser, args.verbose)
+    runner = JobRunner(args.root_path, args.machine_type, args.verbose, logger,
+                       not args.no_calibration)
+    server = JobServer(args.socket, runner, args.jobs, logger,
+                       args.measure_threads)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+    Log Archive
+    Lists and shows the raw outputs archived by the controllers, and
+    reparses the archived benchmark runs with the current output parsers
+    (ex. after fixing or extending a benchmark model's plugin), without
+    running the benchmarks again.
+
+    Usage: log_archive.py --usage
+"""
+
+import sys
+import os
+import argparse
+import tempfile
+from subprocess import CompletedProcess
+
+from helper.LogArchive import LogArchive
+from helper.SimpleStats import SimpleStats
+
+from models.benchmarks.BenchmarkFactory import BenchmarkFactory
+
+from executor.LinuxPerf import LinuxPerfParser
+from executor.ResultsTable import ResultsTable
+
+def list_entries(archive, args):
+    for entry in archive.entries(run=args.run, stage=args.stage,
+                                 benchmark=args.benchmark):
+        print('%6d  %-12s %-10s %-8s rc=%-3d out=%-8d err=%-8d %s' % (
+              entry['id'], entry.get('run'), entry.get('benchmark'),
+              entry.get('stage'), entry['returncode'], entry['out'][2],
+              entry['err'][2], ' '.join(entry['command'])))
+    return True
+
+def show_entry(archive, args):
+    out, err = archive.read(archive.entry(args.id))
+    if args.stream in ('out', 'both'):
+        sys.stdout.write(out)
+    if args.stream in ('err', 'both'):
+        sys.stdout.write(err)
+    return True
+
+def reparse(archive, args):
+    """Parses the archived runs again, one results table per run"""
+    tables = dict()
+    plugins = dict()
+    perf = LinuxPerfParser()
+    with tempfile.TemporaryDirectory() as root:
+        for entry in archive.entries(run=args.run, stage='run',
+                                     benchmark=args.benchmark):
+            bench = entry.get('benchmark')
+            if bench not in plugins:
+                plugins[bench] = BenchmarkFactory(bench, root).getBenchmark().get_plugin()
+            out, err = archive.read(entry)
+            if plugins[bench]:
+                out = plugins[bench].parse(entry['command'], out)
+            err = perf.parse(entry['command'], err)
+            key = (entry.get('run'), bench)
+            if key not in tables:
+                tables[key] = ResultsTable()
+            tables[key].append(CompletedProcess(entry['command'],
+                                                entry['returncode'], out, err))
+
+    if not tables:
+        print('No archived runs found')
+        return False
+
+    for (run, bench), table in sorted(tables.items()):
+        if not args.results_path:
+            print('# run %s (%s): %d iterations' % (run, bench, len(table)))
+            sys.stdout.write(table.stdout())
+            continue
+        base_path = os.path.join(args.results_path, '%s-%s' % (bench, run))
+        os.makedirs(args.results_path, exist_ok=True)
+        with open(base_path + '.out', 'w') as stdout:
+            stdout.write(table.stdout())
+        with open(base_path + '.err', 'w') as stderr:
+            stderr.write(table.stderr())
+        if len(table) > 1 and table.parsed:
+            SimpleStats(table).dump(base_path + '.stats')
+        print('Reparsed %d iterations of %s into %s.*' % (len(table), run,
+                                                          base_path))
+    return True
+
+
+if __name__ == '__main__':
+    """Point of entry for the log archive tools"""
+    parser = argparse.ArgumentParser(description='Benchmark Harness Log Archive')
+
+    parser.add_argument('archive', type=str,
+                        help='The archive directory (ex. ./runs/archive)')
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    listing = commands.add_parser('list', help='List the archived commands')
+    listing.add_argument('--run', type=str, help='Only this run (unique id)')
+    listing.add_argument('--stage', type=str,
+                         help='Only this stage (prepare, build, run)')
+    listing.add_argument('--benchmark', type=str, help='Only this benchmark')
+    listing.set_defaults(action=list_entries)
+
+    show = commands.add_parser('show', help='Print the raw output of a command')
+    show.add_argument('id', type=int, help='Entry number, as listed')
+    show.add_argument('--stream', choices=['out', 'err', 'both'],
+                      default='both', help='Which output to print')
+    show.set_defaults(action=show_entry)
+
+    parse = commands.add_parser('reparse',
+                                help='Parse archived runs with the current models')
+    parse.add_argument('--run', type=str, help='Only this run (unique id)')
+    parse.add_argument('--benchmark', type=str, help='Only this benchmark')
+    parse.add_argument('--results-path', type=str,
+                       help='Write out/err/stats files here instead of printing')
+    parse.set_defaults(action=reparse)
+
+    args = parser.parse_args()
+    if not os.path.isdir(args.archive):
+        parser.error('No archive at %s' % args.archive)
+
+    if not args.action(LogArchive(args.archive), args):
+        sys.exit(1)
@@ -9,16 +9,25 @@ from pathlib import Path
 
 
 class ModelLoader(object):
+    # Modules already executed, (path, mtime) -> module, so that long
+    # running processes (job server, workers) only pay for them once
+    _modules = dict()
+
     def __init__(self, path):
         self.path = path
+        self.key = None
         self._check_model()
 
     def load(self):
         """Class loader python style"""
+        if self.key in ModelLoader._modules:
+            return ModelLoader._modules[self.key].ModelImplementation()
+
         model_name = re.sub("[*.py]", "", os.path.basename(self.path))
         spec = importlib.util.spec_from_file_location(model_name, self.path)
         mod = importlib.util.module_from_spec(spec)
         spec.loader.exec_module(mod)
+        ModelLoader._modules[self.key] = mod
         return mod.ModelImplementation()
 
     def _check_model(self):
@@ -26,6 +35,11 @@ class ModelLoader(object):
         if not os.path.isfile(self.path):
             raise ImportError('Bad Path ' + self.path)
 
+        # Edited models are loaded again
+        self.key = (os.path.realpath(self.path), os.stat(self.path).st_mtime_ns)
+        if self.key in ModelLoader._modules:
+            return
+
         raw = Path(self.path).read_text()
         if raw.find('class ModelImplementation') == -1:
             raise ImportError('Model %s does not implement ModelImplementation' %
@@ -20,6 +20,9 @@ class BenchmarkModel(object):
         self.root_path = ''
         self.urls = []
         self.clones = []
+        # Files the harness downloads before the prepare commands run:
+        # (url, filename in root_path[, sha256]), see helper/Fetcher
+        self.downloads = []
 
         # Harness options (meta variables) which may be unused
         self.iterations = 1
@@ -33,6 +36,30 @@ class BenchmarkModel(object):
         # Validation checks dictionary (compare to results)
         self.checks = dict()
 
+        # Environment variables for build and run (on top of the harness')
+        self.env = dict()
+
+        # Region of interest of the runs, the only part perf counts with
+        # --roi (see executor/PerfROI): 'start' and 'stop' regexes of output lines,
+        # a 'delay' (ms), or 'program' if the benchmark marks it (roi.h)
+        self.roi = dict()
+        # Headers shipped with the harness (ex. roi.h)
+        self.include_path = os.path.join(
+            os.path.dirname(os.path.realpath(__file__)), 'include')
+
+        # Harness options that change the build (shared builds in campaigns)
+        self.build_options = ['size', 'threads']
+
+        # Wraps the compiler commands (ex. to measure builds), if set
+        self.compiler_wrapper = None
+
+        # Run flags of PGO training runs (ex. a smaller problem), if not
+        # the same as the measured runs'
+        self.train_flags = None
+        # Build mode and its phases, as built (see build_phases)
+        self.build_mode = 'default'
+        self.build_recipe = []
+
     ## CORE
     def prepare(self, machine, compiler, iterations, size, threads):
         """ Fetching the benchmark and preparing for running it"""
@@ -45,9 +72,9 @@ class BenchmarkModel(object):
 
         libpath = self.compiler.get_env()['lib']
         if 'LD_LIBRARY_PATH' in os.environ:
-            os.environ["LD_LIBRARY_PATH"] += ':' + libpath
+            self.env['LD_LIBRARY_PATH'] = os.environ['LD_LIBRARY_PATH'] + ':' + libpath
         else:
-            os.environ["LD_LIBRARY_PATH"] = libpath
+            self.env['LD_LIBRARY_PATH'] = libpath
 
         if iterations and iterations > 0:
             self.iterations = iterations
@@ -79,6 +106,9 @@ class BenchmarkModel(object):
         all_linker_flags = self.linker_flags + " " + extra_linker_flags
 
         compiler_env = self.compiler.get_env()
+        if self.compiler_wrapper:
+            for key in ['cc', 'cxx', 'fc']:
+                compiler_env[key] = self.compiler_wrapper(compiler_env[key])
         build_cmd = []
         for clone in self.clones:
             path = os.path.join(self.root_path, clone)
@@ -100,6 +130,63 @@ class BenchmarkModel(object):
 
         return build_cmd
 
+    def build_phases(self, mode, extra_compiler_flags, extra_linker_flags,
+                     profile, extra_run_flags=''):
+        """Phases of a build mode, as a list of (name, commands):
+             default          one build
+             lto, thinlto     one build, with the compiler's LTO flags
+             pgo[+lto...]     instrumented build, training run, profile
+                              merge (if needed) and optimized rebuild
+           Modes are the compiler model's (see build_modes), profiles go
+           in the 'profile' directory"""
+
+        if mode not in self.compiler.build_modes():
+            raise ValueError("Build mode %s not supported by %s (only %s)" %
+                             (mode, self.compiler.name,
+                              ', '.join(self.compiler.build_modes())))
+        self.build_mode = mode
+        parts = mode.split('+')
+        compiler_flags = extra_compiler_flags
+        linker_flags = extra_linker_flags
+        for part in parts:
+            if part not in ['default', 'pgo']:
+                lto = self.compiler.get_lto_flags(part)
+                compiler_flags += ' ' + lto
+                linker_flags += ' ' + lto
+
+        if 'pgo' not in parts:
+            return [('build', self.build(compiler_flags, linker_flags))]
+
+        generate = self.compiler.get_pgo_flags('generate', profile)
+        use = self.compiler.get_pgo_flags('use', profile)
+        # Stale profiles don't match the new instrumented objects
+        instrument = [['rm', '-rf', profile], ['mkdir', '-p', profile]]
+        instrument += self.build(compiler_flags + ' ' + generate,
+                                 linker_flags + ' ' + generate)
+        # Same objects as the instrumented build, everything is rebuilt
+        optimize = [cmd[:1] + ['-B'] + cmd[1:] if cmd[0] == 'make' else cmd
+                    for cmd in self.build(compiler_flags + ' ' + use,
+                                          linker_flags + ' ' + use)]
+        return [('instrument', instrument),
+                ('train', self.train(extra_run_flags)),
+                ('merge', self.compiler.pgo_merge(profile)),
+                ('optimize', optimize)]
+
+    def train(self, extra_run_flags):
+        """PGO training run: one run of each executable, with the training
+           flags if the model has them"""
+
+        flags = self.train_flags
+        if flags is None:
+            flags = self.run_flags + " " + extra_run_flags
+
+        train_cmds = []
+        for exe in self.executables:
+            train_cmd = [os.path.join(self.root_path, exe)]
+            train_cmd.extend(flags.split())
+            train_cmds.append(train_cmd)
+        return train_cmds
+
     def run(self, extra_run_flags):
         """Runs the benchmarks using the base + extra flags"""
 
@@ -133,6 +220,14 @@ class BenchmarkModel(object):
 
 
     ## HELPERS
+    def affinity_cpus(self, threads):
+        """CPU list (for taskset, from 0) of the first 'threads' cores in the
+           machine's affinity order (one per socket/node first)"""
+        cores = [c - 1 for c in self.machine.affinity if c][:threads]
+        if not cores:
+            cores = list(range(threads))
+        return ','.join([str(c) for c in cores])
+
     def get_parser(self):
         """Returns the plugin to parse the results : specific benchmarks
            should override this method, returning their own parsers"""
@@ -0,0 +1,45 @@
+/*
+ * Region of interest markers: when run by the harness with a region of
+ * interest (--roi, the model's roi has 'program'), perf only counts
+ * between ROI_BEGIN() and ROI_END() (see executor/PerfROI.py).
+ *
+ * The harness passes perf stat's control and acknowledgement FIFOs in
+ * BENCHMARK_HARNESS_ROI_CTL and BENCHMARK_HARNESS_ROI_ACK. Each marker
+ * waits for perf to acknowledge it, so nothing outside of the region is
+ * counted. Without them (ex. not run by the harness), markers do nothing.
+ *
+ * Header only, for C and C++, can be used from many files and processes
+ * (ex. MPI ranks: counting starts with the first ROI_BEGIN() and stops
+ * with the first ROI_END()).
+ */
+#ifndef ROI_H
+#define ROI_H
+
+#include <fcntl.h>
+#include <stdlib.h>
+#include <string.h>
+#include <unistd.h>
+
+static inline void roi_command(const char *cmd)
+{
+  static int ctl = -2, ack = -1;
+  const char *path;
+  char c;
+
+  if (ctl == -2) {
+    path = getenv("BENCHMARK_HARNESS_ROI_CTL");
+    ctl = path ? open(path, O_WRONLY | O_CLOEXEC) : -1;
+    path = getenv("BENCHMARK_HARNESS_ROI_ACK");
+    ack = path && ctl >= 0 ? open(path, O_RDONLY | O_CLOEXEC) : -1;
+  }
+  if (ctl < 0 || write(ctl, cmd, strlen(cmd)) < 0)
+    return;
+  /* perf answers "ack\n" once the counters are enabled/disabled */
+  while (ack >= 0 && read(ack, &c, 1) == 1 && c != '\n')
+    ;
+}
+
+#define ROI_BEGIN() roi_command("enable\n")
+#define ROI_END() roi_command("disable\n")
+
+#endif
@@ -0,0 +1,41 @@
+/* Branchy integer code: Collatz sequences of all numbers below a million */
+#include "kernel.h"
+
+int main(int argc, char **argv)
+{
+  long n = 1000000, reps = scale(argc, argv), r, i;
+  long longest = 0, start_of = 0;
+  double total = 0.0, start;
+
+  ROI_BEGIN();
+  start = now();
+  for (r = 0; r < reps; r++) {
+    for (i = 1; i < n; i++) {
+      unsigned long long x = i;
+      long steps = 0;
+      while (x != 1) {
+        if (x & 1)
+          x = 3 * x + 1;
+        else
+          x >>= 1;
+        steps++;
+      }
+      if (steps > longest) {
+        longest = steps;
+        start_of = i;
+      }
+      total += steps;
+    }
+    BARRIER();
+  }
+  start = now() - start;
+  ROI_END();
+
+  /* 837799 has the longest sequence below a million (524 steps), all
+     sequences have 131434272 steps in total */
+  printf("Longest: %ld (%ld steps)\n", start_of, longest);
+  if (start_of != 837799 || longest != 524)
+    total = -1;
+  return report("branchy", n, reps, start, n * reps / start * 1e-6,
+                "Mnumbers/s", total, 131434272.0 * reps, 0);
+}
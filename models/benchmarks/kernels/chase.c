@@ -0,0 +1,35 @@
+/* Pointer chasing through a random cycle, memory latency bound */
+#include "kernel.h"
+
+int main(int argc, char **argv)
+{
+  long n = (1L << 20) * scale(argc, argv), reps = 8, i, steps;
+  long *next = alloc(n * sizeof(long));
+  unsigned long long seed = 42;
+  long p = 0;
+  double sum = 0.0, start;
+
+  /* Sattolo's shuffle: a single cycle through all elements */
+  for (i = 0; i < n; i++)
+    next[i] = i;
+  for (i = n - 1; i > 0; i--) {
+    long j, t;
+    seed = seed * 6364136223846793005ULL + 1442695040888963407ULL;
+    j = (seed >> 33) % i;
+    t = next[i];
+    next[i] = next[j];
+    next[j] = t;
+  }
+  ROI_BEGIN();
+  start = now();
+  for (steps = 0; steps < n * reps; steps++) {
+    p = next[p];
+    sum += p;
+  }
+  start = now() - start;
+  ROI_END();
+
+  /* Whole cycles visit every index once per cycle, back at the start */
+  return report("chase", n, reps, start, start / (n * reps) * 1e9,
+                "ns/access", p ? -1.0 : sum, reps * (n * (n - 1) / 2.0), 0);
+}
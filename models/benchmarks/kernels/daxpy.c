@@ -0,0 +1,29 @@
+/* y = a * x + y, streaming through two vectors */
+#include "kernel.h"
+
+int main(int argc, char **argv)
+{
+  long n = (1L << 20) * scale(argc, argv), reps = 200, i, r;
+  double *x = alloc(n * sizeof(double)), *y = alloc(n * sizeof(double));
+  double a = 0.5, sum = 0.0, start;
+
+  for (i = 0; i < n; i++) {
+    x[i] = 1.0;
+    y[i] = 2.0;
+  }
+  ROI_BEGIN();
+  start = now();
+  for (r = 0; r < reps; r++) {
+    for (i = 0; i < n; i++)
+      y[i] = a * x[i] + y[i];
+    BARRIER();
+  }
+  start = now() - start;
+  ROI_END();
+
+  /* All values are exact: y = 2 + reps * a */
+  for (i = 0; i < n; i++)
+    sum += y[i];
+  return report("daxpy", n, reps, start, 2.0 * n * reps / start * 1e-6,
+                "MFLOPS", sum, n * (2.0 + reps * a), 0);
+}
@@ -0,0 +1,30 @@
+/* Dot product, a reduction over two vectors */
+#include "kernel.h"
+
+int main(int argc, char **argv)
+{
+  long n = (1L << 20) * scale(argc, argv), reps = 200, i, r;
+  double *x = alloc(n * sizeof(double)), *y = alloc(n * sizeof(double));
+  double sum = 0.0, expected = 0.0, start;
+
+  for (i = 0; i < n; i++) {
+    x[i] = (i % 8) * 0.25;
+    y[i] = 2.0;
+    expected += (i % 8) * 0.5;
+  }
+  ROI_BEGIN();
+  start = now();
+  for (r = 0; r < reps; r++) {
+    double dot = 0.0;
+    for (i = 0; i < n; i++)
+      dot += x[i] * y[i];
+    sum += dot;
+    BARRIER();
+  }
+  start = now() - start;
+  ROI_END();
+
+  /* Exact in any summation order (multiples of 0.5, below 2^53) */
+  return report("dot", n, reps, start, 2.0 * n * reps / start * 1e-6,
+                "MFLOPS", sum, expected * reps, 0);
+}
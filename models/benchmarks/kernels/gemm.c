@@ -0,0 +1,45 @@
+/* Dense matrix multiplication, C = A * B (i, k, j order) */
+#include "kernel.h"
+
+int main(int argc, char **argv)
+{
+  long n = 256 * scale(argc, argv), reps = 16, i, j, k, r;
+  double *a = alloc(n * n * sizeof(double)), *b = alloc(n * n * sizeof(double));
+  double *c = alloc(n * n * sizeof(double));
+  double sum = 0.0, expected = 0.0, start;
+
+  for (i = 0; i < n; i++)
+    for (j = 0; j < n; j++) {
+      a[i * n + j] = ((i + j) % 4) * 0.5;
+      b[i * n + j] = ((i + 2 * j) % 3) * 0.25;
+    }
+  ROI_BEGIN();
+  start = now();
+  for (r = 0; r < reps; r++) {
+    for (i = 0; i < n * n; i++)
+      c[i] = 0.0;
+    for (i = 0; i < n; i++)
+      for (k = 0; k < n; k++) {
+        double aik = a[i * n + k];
+        for (j = 0; j < n; j++)
+          c[i * n + j] += aik * b[k * n + j];
+      }
+    BARRIER();
+  }
+  start = now() - start;
+  ROI_END();
+
+  /* sum(C) = sum over k of (column k of A) * (row k of B), all exact */
+  for (i = 0; i < n * n; i++)
+    sum += c[i];
+  for (k = 0; k < n; k++) {
+    double column = 0.0, row = 0.0;
+    for (i = 0; i < n; i++) {
+      column += a[i * n + k];
+      row += b[k * n + i];
+    }
+    expected += column * row;
+  }
+  return report("gemm", n, reps, start, 2.0 * n * n * n * reps / start * 1e-6,
+                "MFLOPS", sum, expected, 0);
+}
@@ -0,0 +1,72 @@
+/*
+ * Common helpers of the micro-kernels: timing, scale argument and the
+ * report, in the format the kernels model parses:
+ *
+ *   Kernel: <name>
+ *   Size: <elements>
+ *   Repetitions: <count>
+ *   Time: <seconds> s
+ *   Rate: <value> <unit>
+ *   Checksum: <value>
+ *   Expected: <value>
+ *   Check: PASS|FAIL
+ *
+ * Checksums are compared with a relative tolerance, 0 for exact ones.
+ * The timed loops are the region of interest of perf (see roi.h).
+ */
+#ifndef KERNEL_H
+#define KERNEL_H
+
+#include <math.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <time.h>
+
+#include "roi.h"
+
+/* Keeps the compiler from moving memory accesses across repetitions */
+#define BARRIER() __asm__ volatile("" ::: "memory")
+
+static inline double now(void)
+{
+  struct timespec ts;
+  clock_gettime(CLOCK_MONOTONIC, &ts);
+  return ts.tv_sec + ts.tv_nsec * 1e-9;
+}
+
+/* Problem scale (first argument, 1 by default) */
+static inline long scale(int argc, char **argv)
+{
+  long s = argc > 1 ? atol(argv[1]) : 1;
+  return s > 0 ? s : 1;
+}
+
+static inline void *alloc(size_t bytes)
+{
+  void *ptr = NULL;
+  if (posix_memalign(&ptr, 64, bytes)) {
+    fprintf(stderr, "Out of memory (%zu bytes)\n", bytes);
+    exit(1);
+  }
+  return ptr;
+}
+
+static inline int report(const char *name, long size, long reps,
+                         double time, double rate, const char *unit,
+                         double checksum, double expected, double tolerance)
+{
+  double error = fabs(checksum - expected);
+  int pass = tolerance ? error <= tolerance * fabs(expected)
+                       : checksum == expected;
+  printf("Kernel: %s\n", name);
+  printf("Size: %ld\n", size);
+  printf("Repetitions: %ld\n", reps);
+  printf("Time: %.6f s\n", time);
+  printf("Rate: %.3f %s\n", rate, unit);
+  printf("Checksum: %.12e\n", checksum);
+  printf("Expected: %.12e\n", expected);
+  printf("Check: %s\n", pass ? "PASS" : "FAIL");
+  return 0;
+}
+
+#endif
@@ -0,0 +1,27 @@
+/* Floating point reduction, sum of 1 / (i (i + 1)) = 1 - 1 / (n + 1) */
+#include "kernel.h"
+
+int main(int argc, char **argv)
+{
+  long n = (1L << 22) * scale(argc, argv), reps = 20, i, r;
+  double *x = alloc(n * sizeof(double));
+  double sum = 0.0, start;
+
+  for (i = 0; i < n; i++)
+    x[i] = 1.0 / ((double)(i + 1) * (double)(i + 2));
+  ROI_BEGIN();
+  start = now();
+  for (r = 0; r < reps; r++) {
+    double partial = 0.0;
+    for (i = 0; i < n; i++)
+      partial += x[i];
+    sum += partial;
+    BARRIER();
+  }
+  start = now() - start;
+  ROI_END();
+
+  /* Rounding depends on the summation order (ex. vectorized) */
+  return report("reduce", n, reps, start, 1.0 * n * reps / start * 1e-6,
+                "MFLOPS", sum, reps * (1.0 - 1.0 / (n + 1)), 1e-9);
+}
@@ -0,0 +1,41 @@
+/* 7-point stencil on a 3D grid (Jacobi sweeps between two grids) */
+#include "kernel.h"
+
+#define IDX(i, j, k) (((i) * n + (j)) * n + (k))
+
+int main(int argc, char **argv)
+{
+  long n = 96 * scale(argc, argv), reps = 60, i, j, k, r;
+  double *u = alloc(n * n * n * sizeof(double));
+  double *v = alloc(n * n * n * sizeof(double));
+  double sum = 0.0, start;
+
+  /* A linear field is a fixed point: 0.25 u + 0.125 (6 u) = u */
+  for (i = 0; i < n; i++)
+    for (j = 0; j < n; j++)
+      for (k = 0; k < n; k++)
+        u[IDX(i, j, k)] = v[IDX(i, j, k)] = i + j + k;
+  ROI_BEGIN();
+  start = now();
+  for (r = 0; r < reps; r++) {
+    for (i = 1; i < n - 1; i++)
+      for (j = 1; j < n - 1; j++)
+        for (k = 1; k < n - 1; k++)
+          v[IDX(i, j, k)] = 0.25 * u[IDX(i, j, k)] +
+                            0.125 * (u[IDX(i - 1, j, k)] + u[IDX(i + 1, j, k)] +
+                                     u[IDX(i, j - 1, k)] + u[IDX(i, j + 1, k)] +
+                                     u[IDX(i, j, k - 1)] + u[IDX(i, j, k + 1)]);
+    double *t = u;
+    u = v;
+    v = t;
+    BARRIER();
+  }
+  start = now() - start;
+  ROI_END();
+
+  for (i = 0; i < n * n * n; i++)
+    sum += u[i];
+  return report("stencil", n * n * n, reps, start,
+                8.0 * (n - 2) * (n - 2) * (n - 2) * reps / start * 1e-6,
+                "MFLOPS", sum, 3.0 * n * n * (n * (n - 1) / 2), 0);
+}
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+    This class is an implementation of the BenchmarkModel interface
+    (a python way of doing it, without decorations)
+
+    It implements the actions necessary to prepare for the build, build,
+    prepare for the run and run the harness' own micro-kernels: daxpy, dot,
+    dense GEMM, 7-point stencil, pointer chasing, branchy integer code and
+    a floating point reduction.
+
+    The kernels' sources ship with the harness (models/benchmarks/kernels),
+    so nothing is downloaded: a quick, offline smoke and performance test
+    of a new toolchain or machine. Each kernel times itself and checks its
+    own checksum, all print the same report (see kernels/kernel.h). The
+    size scales the problems (but not the number of repetitions).
+"""
+
+from models.benchmarks.BenchmarkModel import BenchmarkModel
+from executor.Execute import OutputParser
+import os
+
+class KernelsParser(OutputParser):
+    """All data generated by the kernels as well as external dictionary"""
+
+    def __init__(self):
+        super().__init__()
+        self.fields = {
+            'Size': r'Size:\s+(\d+)',
+            'Repetitions': r'Repetitions:\s+(\d+)',
+            'Time': r'Time:\s+(\d+\.\d+)',
+            'Rate': r'Rate:\s+(\d+\.\d+)',
+            'Unit': r'Rate:\s+\S+\s+(\S+)',
+            'Checksum': r'Checksum:\s+(\S+)',
+            'Check': r'Check:\s+(PASS|FAIL)'
+        }
+
+
+class ModelImplementation(BenchmarkModel):
+    """This class is an implementation of the BenchmarkModel for the
+       bundled micro-kernels"""
+
+    def __init__(self):
+        super().__init__()
+        self.name = 'kernels'
+        self.executables = ['daxpy', 'dot', 'gemm', 'stencil', 'chase',
+                            'branchy', 'reduce']
+        self.compiler_flags = '-O2'
+        self.sources = os.path.join(os.path.dirname(os.path.realpath(__file__)),
+                                    'kernels')
+        # Size only changes the run
+        self.build_options = []
+
+    def prepare(self, machine, compiler, iterations, size, threads):
+        if threads and threads != 1:
+            raise ValueError("The kernels can't run with more than one thread")
+
+        prepare_cmds = super().prepare(machine, compiler, iterations, size, 1)
+
+        # All kernels built at once
+        self.make_flags = '-j%d' % len(self.executables)
+        self.run_flags = str(self.size)
+        self.checks = {'Check': lambda x: x == 'PASS'}
+
+        # The timed loops mark perf's region of interest
+        self.roi = {'program': True}
+
+        # Copy the bundled sources
+        prepare_cmds.append(['mkdir', '-p', self.root_path])
+        prepare_cmds.append(['cp', '-r', os.path.join(self.sources, '.'),
+                             self.root_path])
+        prepare_cmds.append(['cp', os.path.join(self.include_path, 'roi.h'),
+                             self.root_path])
+        return prepare_cmds
+
+    def get_plugin(self):
+        """Returns the plugin to parse the results"""
+        return KernelsParser()
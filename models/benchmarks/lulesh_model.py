@@ -45,28 +45,44 @@ class ModelImplementation(BenchmarkModel):
         self.linker_flags = '-fopenmp'
         self.size = 2
         self.urls = ['https://github.com/LLNL/LULESH.git']
+        # Size and threads only change the run
+        self.build_options = []
 
     def prepare(self, machine, compiler, iterations, size, threads):
         prepare_cmds = super().prepare(machine, compiler, iterations, size, threads)
 
         # Lulesh specific flags based on options
         if (self.size >= 3):
-            self.checks = {'FinalEnergy': lambda x: x == '1.482403e+06'}
+            self.checks = {'FinalEnergy': lambda x: float(x) == 1.482403e+06}
             self.run_flags += '-s 90'
         elif (self.size == 2):
-            self.checks = {'FinalEnergy': lambda x: x == '5.124778e+05'}
+            self.checks = {'FinalEnergy': lambda x: float(x) == 5.124778e+05}
             self.run_flags += '-s 50'
         else:
-            self.checks = {'FinalEnergy': lambda x: x == '2.720531e+04'}
+            self.checks = {'FinalEnergy': lambda x: float(x) == 2.720531e+04}
             self.run_flags += '-s 10'
 
+        # PGO training on the smallest problem, same code paths
+        self.train_flags = '-s 10'
+
         # Update OMP_THREADS if not using all cores
         if self.threads != self.machine.num_cores:
-            os.environ['OMP_NUM_THREADS'] = repr(self.threads)
+            self.env['OMP_NUM_THREADS'] = repr(self.threads)
 
         # Remove this once https://github.com/LLNL/LULESH/pull/2 has been merged
         makefile = os.path.join(self.root_path, self.clones[0], 'Makefile')
         prepare_cmds.append(['sed', '-i', 's/^lulesh2.0:/$(LULESH_EXEC):/g', makefile])
+
+        # Perf's region of interest: the time steps, without the mesh setup
+        # and the final verification
+        source = os.path.join(self.root_path, self.clones[0], 'lulesh.cc')
+        prepare_cmds.append(['cp', os.path.join(self.include_path, 'roi.h'),
+                             os.path.dirname(source)])
+        prepare_cmds.append(['sed', '-i', '-e', '1i #include "roi.h"',
+                             '-e', '/BEGIN timestep to solution/i ROI_BEGIN();',
+                             '-e', '/Use reduced max elapsed time/i ROI_END();',
+                             source])
+        self.roi = {'program': True}
         return prepare_cmds
 
     def run(self, extra_run_flags):
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+    This class is an implementation of the BenchmarkModel interface
+    (a python way of doing it, without decorations)
+
+    It implements the actions necessary to prepare for the build, build,
+    prepare for the run and run LULESH with MPI and OpenMP on a single node
+    (see lulesh_model for the OpenMP only runs).
+
+    LULESH is built with the MPI compiler wrapper (mpicxx, from the
+    toolchain if it has one, or the system's) around the toolchain's C++
+    compiler, and launched with the local mpirun. LULESH needs a cube
+    number of ranks: without --threads, the runs sweep 1, 8, 27... ranks
+    (as many as there are cores), each with the cores left divided into
+    OpenMP threads; with --threads (per rank), as many ranks as fit.
+    BENCHMARK_HARNESS_MPI_RANKS (ex. 1,8) sets the rank counts, ranks are
+    oversubscribed if they don't fit. Ranks are spread across the NUMA
+    nodes, each rank's threads pinned to its own cores.
+
+    Each rank count is reported as its own executable (ex. lulesh2.0-r8-t2),
+    with the node's FOM and the FOM per rank and per thread. Single rank
+    runs check the final energy, as lulesh, larger ones the symmetry of
+    the energy (as there's no reference for them).
+
+    Open MPI and MPICH (Hydra) launchers are supported.
+"""
+
+from models.benchmarks.lulesh_model import LuleshParser
+from models.benchmarks.lulesh_model import ModelImplementation as Lulesh
+from executor.Execute import Execute
+import os
+import shutil
+
+class LuleshMPIParser(LuleshParser):
+    """LULESH's data, with ranks, names by rank and thread count"""
+
+    def __init__(self):
+        super().__init__()
+        self.fields['Ranks'] = r'MPI tasks\s+=\s+(\d+)'
+
+    def parse(self, cmdline, output):
+        data = super().parse(cmdline, output)
+        if 'Ranks' not in data:
+            return data
+        threads = data.get('Threads', 1)
+        data['_name'] = 'lulesh2.0-r%d-t%d' % (data['Ranks'], threads)
+        if 'FOM' in data:
+            data['FOMPerRank'] = data['FOM'] / data['Ranks']
+            data['FOMPerThread'] = data['FOM'] / (data['Ranks'] * threads)
+        return data
+
+
+class ModelImplementation(Lulesh):
+    """This class is an implementation of the BenchmarkModel for LULESH
+       with MPI"""
+
+    def __init__(self):
+        super().__init__()
+        self.name = 'lulesh_mpi'
+        self.compiler_flags = '-DUSE_MPI=1 -fopenmp'
+        self.mpicxx = None
+        self.mpirun = None
+        self.flavour = None
+        # (ranks, threads per rank) of the runs
+        self.layouts = []
+
+    def _find(self, name):
+        """MPI tool from the toolchain, or the system's"""
+        path = os.path.join(self.compiler.compilers_path or '', name)
+        if os.path.isfile(path) and os.access(path, os.X_OK):
+            return path
+        path = shutil.which(name)
+        if not path:
+            raise RuntimeError("No %s in the toolchain or the system" % name)
+        return path
+
+    def _layouts(self, threads):
+        """Cube rank counts and threads per rank that fit in the node"""
+        cores = self.machine.cpu_info.get('threads', 1)
+        ranks = os.environ.get('BENCHMARK_HARNESS_MPI_RANKS')
+        if ranks:
+            try:
+                ranks = [int(r) for r in ranks.split(',')]
+            except ValueError:
+                raise ValueError("MPI ranks must be a list of numbers: %s" %
+                                 ranks)
+            for count in ranks:
+                if count < 1 or round(count ** (1 / 3)) ** 3 != count:
+                    raise ValueError("LULESH needs a cube number of ranks, " +
+                                     "not %d" % count)
+            return [(r, threads or max(1, cores // r)) for r in ranks]
+
+        cubes = [n ** 3 for n in range(1, cores + 1) if n ** 3 <= cores]
+        if threads:
+            fit = [r for r in cubes if r * threads <= cores] or [1]
+            return [(max(fit), threads)]
+        return [(r, cores // r) for r in cubes]
+
+    def prepare(self, machine, compiler, iterations, size, threads):
+        prepare_cmds = super().prepare(machine, compiler, iterations, size,
+                                       threads)
+        # Threads are set per rank by mpirun
+        self.env.pop('OMP_NUM_THREADS', None)
+        self.layouts = self._layouts(threads)
+        self.threads = max([r * t for r, t in self.layouts])
+
+        self.mpicxx = self._find('mpicxx')
+        self.mpirun = self._find('mpirun')
+        # The MPI wrappers compile with the toolchain's compiler
+        cxx = self.compiler.get_env()['cxx']
+        self.env['OMPI_CXX'] = cxx
+        self.env['MPICH_CXX'] = cxx
+        version = Execute().run([self.mpirun, '--version'])
+        self.flavour = 'openmpi'
+        if 'HYDRA' in version.stdout or 'MPICH' in version.stdout:
+            self.flavour = 'mpich'
+        return prepare_cmds
+
+    def build(self, extra_compiler_flags, extra_linker_flags):
+        """Builds with mpicxx instead of the C++ compiler"""
+        mpicxx = self.mpicxx
+        if self.compiler_wrapper:
+            mpicxx = self.compiler_wrapper(mpicxx)
+        build_cmds = super().build(extra_compiler_flags, extra_linker_flags)
+        for cmd in build_cmds:
+            for idx, arg in enumerate(cmd):
+                if arg.startswith('CXX='):
+                    cmd[idx] = 'CXX=' + mpicxx
+        return build_cmds
+
+    def _launcher(self, ranks, threads):
+        """mpirun options: ranks over NUMA nodes, threads on their cores"""
+        cores = self.machine.cpu_info.get('threads', 1)
+        omp = {'OMP_NUM_THREADS': str(threads), 'OMP_PROC_BIND': 'close',
+               'OMP_PLACES': 'cores'}
+        launcher = [self.mpirun, '-np', str(ranks)]
+        if self.flavour == 'mpich':
+            if ranks * threads <= cores:
+                launcher += ['-map-by', 'numa', '-bind-to',
+                             'core:%d' % threads]
+            for key, value in omp.items():
+                launcher += ['-genv', key, value]
+            return launcher
+
+        if ranks * threads <= cores:
+            launcher += ['--map-by', 'numa:PE=%d' % threads,
+                         '--bind-to', 'core']
+        else:
+            launcher += ['--map-by', 'slot:OVERSUBSCRIBE', '--bind-to', 'none']
+        if os.geteuid() == 0:
+            launcher.append('--allow-run-as-root')
+        for key, value in omp.items():
+            launcher += ['-x', '%s=%s' % (key, value)]
+        return launcher
+
+    def run(self, extra_run_flags):
+        """Every iteration runs all layouts, on the cores they need"""
+        run_cmds = super().run(extra_run_flags)
+        taskset = shutil.which('taskset')
+        layouts = []
+        for ranks, threads in self.layouts:
+            # Wider than the single core perf is pinned to
+            cpus = self.affinity_cpus(min(ranks * threads,
+                       self.machine.cpu_info.get('threads', 1)))
+            layouts.append([taskset, '-c', cpus] +
+                           self._launcher(ranks, threads))
+        return [layout + cmd for cmd in run_cmds for layout in layouts]
+
+    def validate(self, results):
+        """Final energy with one rank, the energy's symmetry otherwise"""
+        if not isinstance(results, dict):
+            raise TypeError('Results must be dictionary to validate')
+        if results.get('Ranks', 1) == 1 or not self.checks:
+            return super().validate(results)
+        return 'MaxRelDiff' in results and float(results['MaxRelDiff']) < 1e-8
+
+    def get_plugin(self):
+        """Returns the plugin to parse the results"""
+        return LuleshMPIParser()
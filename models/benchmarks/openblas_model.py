@@ -7,31 +7,125 @@
     It implements the actions necessary to prepare for the build, build,
     prepare for the run and run OpenBLAS's benchmarks + BLAS-Tester
 
+    Built single threaded, unless --threads asks for more. Larger sizes (or
+    BENCHMARK_HARNESS_GEMM_SWEEP) sweep GEMM's M, N and K in the level 3
+    testers.
 """
 
 from models.benchmarks.BenchmarkModel import BenchmarkModel
 from executor.Execute import OutputParser
 import os
+import re
+import shutil
 
 class OpenBLASParser(OutputParser):
-    """All data generated by himeno as well as external dictionary"""
+    """All data generated by BLAS-Tester as well as external dictionary
+
+       Every test line is read as a row (see tests): routine, dimensions,
+       transposes, time, MFLOPS and whether it passed. The results have,
+       per routine, the mean MFLOPS of the tests that passed, the number of
+       tests that passed and failed, and the MFLOPS of each set of
+       dimensions (ex. GEMM-NN-512x512x512-MFLOPS), so iterations can be
+       aggregated per routine and size."""
+
+    # Dimension and transpose columns of the testers' tables
+    dims = ['M', 'N', 'K']
+    transposes = ['A', 'B', 'TA', 'TB', 'TR']
 
     def __init__(self):
         super().__init__()
         self.fields = {
-            'Test0': r'\s+0\s.*\d+\.\d\s+(\d+\.\d\d)\s+PASS',
-            'Test1': r'\s+1\s.*\d+\.\d\s+(\d+\.\d\d)\s+PASS',
-            'Test2': r'\s+2\s.*\d+\.\d\s+(\d+\.\d\d)\s+PASS',
-            'Test3': r'\s+3\s.*\d+\.\d\s+(\d+\.\d\d)\s+PASS',
-            'Test4': r'\s+4\s.*\d+\.\d\s+(\d+\.\d\d)\s+PASS',
-            'Test5': r'\s+5\s.*\d+\.\d\s+(\d+\.\d\d)\s+PASS',
-            'Test6': r'\s+6\s.*\d+\.\d\s+(\d+\.\d\d)\s+PASS',
-            'Test7': r'\s+7\s.*\d+\.\d\s+(\d+\.\d\d)\s+PASS',
-            'Test8': r'\s+8\s.*\d+\.\d\s+(\d+\.\d\d)\s+PASS',
-            'Test9': r'\s+9\s.*\d+\.\d\s+(\d+\.\d\d)\s+PASS',
             'Pass': r'tests run, (\d+) passed'
         }
 
+    def _row(self, routine, header, values):
+        """Test line as a dictionary of its header's columns"""
+        if 'ALPHA' in header and len(values) != len(header):
+            # Complex scalars take two columns, the tail is always the same
+            idx = header.index('ALPHA')
+            columns = list(zip(header[:idx], values[:idx])) + \
+                      list(zip(header[-4:], values[-4:]))
+        else:
+            columns = zip(header, values)
+        columns = dict(columns)
+
+        row = {'routine': routine, 'test': int(columns['TST#']),
+               'passed': columns.get('TEST') == 'PASS'}
+        for dim in self.dims:
+            if dim in columns:
+                row[dim] = int(columns[dim])
+        transpose = ''.join([columns[t] for t in self.transposes
+                             if t in columns])
+        if transpose:
+            row['transpose'] = transpose
+        for key, column in [('time', 'TIME'), ('mflops', 'MFLOP')]:
+            if column in columns:
+                row[key] = self.convert(self.sanitise(columns[column]))
+        return row
+
+    def tests(self, output, name=''):
+        """All test lines of a tester's output, as rows (with the precision
+           and level of the tester, from its name: ex. xdl3blastst)"""
+        tester = re.search(r'x([cdsz])l(\d)blastst', name)
+        routine = None
+        header = None
+        for line in output.splitlines():
+            # Each routine's table: ---- GEMM ----, TST# ..., ====, tests
+            section = re.match(r'^\s*-{3,}\s*(\w+)\s*-{3,}\s*$', line)
+            if section:
+                routine = section.group(1).upper()
+                header = None
+                continue
+            values = line.split()
+            if values and values[0] == 'TST#':
+                header = values
+                continue
+            if not routine or not header or len(values) < 4 or not values[0].isdigit() or \
+               values[-1] not in ['PASS', 'FAIL']:
+                continue
+            try:
+                row = self._row(routine, header, values)
+            except (KeyError, ValueError):
+                continue
+            if tester:
+                row['precision'] = tester.group(1)
+                row['level'] = int(tester.group(2))
+            yield row
+
+    def parse(self, cmdline, output):
+        data = super().parse(cmdline, output)
+        if not data:
+            return data
+
+        mflops = dict()
+        tests = 0
+        failed = 0
+        for row in self.tests(output, data['_name']):
+            routine = row['routine']
+            tests += 1
+            if not row['passed']:
+                failed += 1
+                data[routine + '-Failed'] = data.get(routine + '-Failed', 0) + 1
+                continue
+            data[routine + '-Passed'] = data.get(routine + '-Passed', 0) + 1
+            if not isinstance(row.get('mflops'), (int, float)):
+                continue
+            mflops.setdefault(routine, []).append(row['mflops'])
+            # Same dimensions with other scalars are averaged too
+            dims = 'x'.join([str(row[d]) for d in self.dims if d in row])
+            if dims:
+                key = '-'.join([k for k in [routine, row.get('transpose'),
+                                            dims, 'MFLOPS'] if k])
+                mflops.setdefault(key, []).append(row['mflops'])
+
+        for key, values in mflops.items():
+            if not key.endswith('-MFLOPS'):
+                key += '-MFLOPS'
+            data[key] = sum(values) / len(values)
+        data['Tests'] = tests
+        data['Failed'] = failed
+        return data
+
 class ModelImplementation(BenchmarkModel):
     """This class is an implementation of the BenchmarkModel for OpenBLAS"""
 
@@ -43,21 +137,77 @@ class ModelImplementation(BenchmarkModel):
         for t in ['c', 'd', 's', 'z']:
             for s in ['1', '2', '3']:
                 self.executables.append("BLAS-Tester/bin/x"+t+"l"+s+"blastst")
+        self.size = 1
+        # Threads change the library (threaded build), sizes only the run
+        self.build_options = ['threads']
+        # Level 3 testers' GEMM sweep: (start, end, step) of M, N and K
+        self.sweep = None
+
+    def _sweep(self):
+        """GEMM sizes: BENCHMARK_HARNESS_GEMM_SWEEP as start:end:step (the
+           same for M, N and K) or three of them (M,N,K), else from the
+           size: none (the testers' defaults) for 1, up to 1000 for 2,
+           2000 for 3 and so on"""
+        spec = os.environ.get('BENCHMARK_HARNESS_GEMM_SWEEP')
+        if not spec:
+            if self.size < 2:
+                return None
+            step = 100 * (self.size - 1)
+            spec = '%d:%d:%d' % (step, step * 10, step)
+        try:
+            ranges = [[int(v) for v in r.split(':')] for r in spec.split(',')]
+        except ValueError:
+            raise ValueError('GEMM sweep must be start:end:step[,...]: %s' %
+                             spec)
+        if len(ranges) == 1:
+            ranges *= 3
+        if len(ranges) != 3 or any([len(r) != 3 or r[2] <= 0 or r[0] > r[1]
+                                    for r in ranges]):
+            raise ValueError('GEMM sweep must be start:end:step[,...]: %s' %
+                             spec)
+        return ranges
 
     def prepare(self, machine, compiler, iterations, size, threads):
-        prepare_cmds = super().prepare(machine, compiler, iterations, size, 1)
-        # TODO: Choose options form arguments
+        prepare_cmds = super().prepare(machine, compiler, iterations, size,
+                                       threads)
         blaslib = os.path.join(os.path.realpath(self.root_path), 'OpenBLAS', 'libopenblas.a')
         arch = "ARM64"
         if self.machine.arch == 'x86_64':
             arch = "X86"
+        # Single threaded library unless asked for more threads
+        threading = 'USE_THREAD=0'
+        if self.threads > 1:
+            threading = 'USE_THREAD=1 NUM_THREADS=%d' % self.threads
+            self.linker_flags = '-lpthread'
+        self.env['OPENBLAS_NUM_THREADS'] = repr(self.threads)
         self.make_flags = {
-            'OpenBLAS': 'USE_THREAD=0',
-            'BLAS-Tester': '-j NUMTHREADS=1 ARCH='+arch+' TEST_BLAS='+blaslib
+            'OpenBLAS': threading,
+            'BLAS-Tester': '-j NUMTHREADS=%d ARCH=%s TEST_BLAS=%s' %
+                           (self.threads, arch, blaslib)
         }
+        self.checks = {'Failed': lambda x: int(x) == 0}
+        self.sweep = self._sweep()
 
         return prepare_cmds
 
+    def run(self, extra_run_flags):
+        """Level 3 testers only run the GEMM sweep, if there is one.
+           Threaded libraries run on the first cores of the affinity"""
+        run_cmds = super().run(extra_run_flags)
+        if self.sweep:
+            # Range forms (start end step), -m/-n/-k take a list
+            sizes = []
+            for option, dims in zip(['-M', '-N', '-K'], self.sweep):
+                sizes += [option] + [str(v) for v in dims]
+            for cmd in run_cmds:
+                if re.search(r'x[cdsz]l3blastst$', cmd[0]):
+                    cmd.extend(['-R', '1', 'gemm'] + sizes)
+        if self.threads > 1:
+            taskset = shutil.which('taskset')
+            cpus = self.affinity_cpus(self.threads)
+            run_cmds = [[taskset, '-c', cpus] + cmd for cmd in run_cmds]
+        return run_cmds
+
     def get_plugin(self):
         """Returns the plugin to parse the results"""
         return OpenBLASParser()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+    This class is an implementation of the BenchmarkModel interface
+    (a python way of doing it, without decorations)
+
+    It implements the actions necessary to prepare for the build, build,
+    prepare for the run and run John McCalpin's STREAM memory bandwidth
+    benchmark.
+
+    The arrays are sized from the machine's last level cache (at least four
+    times its total size each, more with larger sizes) and memory, so the
+    working set never fits in cache. Without --threads, runs sweep the
+    number of threads from one to a whole NUMA node, then whole nodes,
+    placing them in the machine's affinity order (one per socket/node
+    first). Each thread count is reported as its own executable
+    (stream-t<threads>), OpenMP takes the number of threads from the CPU
+    list, so OMP_NUM_THREADS must not be set.
+
+    The source is fetched from STREAM's site, or from the URL in
+    BENCHMARK_HARNESS_STREAM_URL (ex. file:///mirror/stream.c, or a local
+    directory with stream.c in it), and verified against the SHA-256 in
+    BENCHMARK_HARNESS_STREAM_SHA256, if set.
+"""
+
+from models.benchmarks.BenchmarkModel import BenchmarkModel
+from executor.Execute import OutputParser
+import os
+import re
+import shutil
+
+class StreamParser(OutputParser):
+    """All data generated by STREAM as well as external dictionary"""
+
+    def __init__(self):
+        super().__init__()
+        self.fields = {
+            'ArraySize': r'Array size = (\d+)',
+            'Threads': r'Number of Threads counted = (\d+)',
+            'Validates': r'Solution (Validates)'
+        }
+        # Best rate (MB/s), average, minimum and maximum times (s)
+        columns = ['Rate', 'AvgTime', 'MinTime', 'MaxTime']
+        for kernel in ['Copy', 'Scale', 'Add', 'Triad']:
+            for idx, column in enumerate(columns):
+                numbers = [r'\d+\.\d+'] * len(columns)
+                numbers[idx] = r'(\d+\.\d+)'
+                self.fields[kernel + column] = \
+                    kernel + r':\s+' + r'\s+'.join(numbers)
+
+    def parse(self, cmdline, output):
+        """Names each thread count as its own executable"""
+        data = super().parse(cmdline, output)
+        if 'Threads' in data:
+            data['_name'] += '-t%d' % data['Threads']
+        return data
+
+
+class ModelImplementation(BenchmarkModel):
+    """This class is an implementation of the BenchmarkModel for STREAM"""
+
+    def __init__(self):
+        super().__init__()
+        self.name = 'stream'
+        self.executables = ['stream']
+        self.size = 1
+        self.urls = [os.environ.get('BENCHMARK_HARNESS_STREAM_URL') or
+                     'https://www.cs.virginia.edu/stream/FTP/Code/stream.c']
+        self.sha256 = os.environ.get('BENCHMARK_HARNESS_STREAM_SHA256')
+        # Array size is a compile time constant, threads only change the run
+        self.build_options = ['size']
+        # Thread counts of the runs (see prepare)
+        self.sweep = []
+
+    def _cache_bytes(self, value):
+        """Bytes of a cache size from lscpu (ex. 32 MiB (2 instances), 512K)"""
+        match = re.match(r'([\d.]+)\s*([KMG]?)i?B?(?:\s+\((\d+) instances?\))?',
+                         str(value).strip())
+        if not match:
+            return 0
+        scale = {'': 1, 'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30}
+        size = float(match.group(1)) * scale[match.group(2)]
+        # Older lscpu give the size per socket
+        instances = int(match.group(3) or
+                        self.machine.cpu_info.get('Socket(s)', 1))
+        return int(size * instances)
+
+    def _array_size(self):
+        """Elements per array: four times the LLC (doubling per size), at
+           most half of the memory for the three arrays"""
+        info = self.machine.cpu_info
+        llc = 0
+        for level in ['L3 cache', 'L2 cache']:
+            if level in info:
+                llc = self._cache_bytes(info[level])
+                break
+        # STREAM's default, if the cache size is unknown
+        elements = 10000000
+        if llc:
+            elements = max(elements, 4 * llc * 2 ** (self.size - 1) // 8)
+        memory = int(info.get('Mem', 0) or 0) << 30
+        if memory:
+            elements = min(elements, memory // 2 // (3 * 8))
+        return elements
+
+    def _sweep(self, threads):
+        """Thread counts: one, half a node, whole nodes (or just 'threads')"""
+        cores = self.machine.cpu_info.get('threads', 1)
+        if threads:
+            return [min(threads, cores)]
+        nodes = int(self.machine.cpu_info.get('NUMA node(s)', 1) or 1)
+        per_node = max(1, cores // nodes)
+        counts = set([1, max(1, per_node // 2)])
+        counts.update([per_node * n for n in range(1, nodes + 1)])
+        return sorted([c for c in counts if c <= cores])
+
+    def prepare(self, machine, compiler, iterations, size, threads):
+        prepare_cmds = super().prepare(machine, compiler, iterations, size,
+                                       threads)
+        self.sweep = self._sweep(threads)
+        self.threads = max(self.sweep)
+
+        elements = self._array_size()
+        self.compiler_flags = '-O2 -fopenmp -DSTREAM_ARRAY_SIZE=%d ' \
+                              '-DNTIMES=20' % elements
+        # Static arrays larger than 2GB
+        if self.machine.arch == 'x86_64':
+            self.compiler_flags += ' -mcmodel=medium'
+        self.linker_flags = '-fopenmp'
+        # No Makefile, make's implicit rule builds stream from stream.c
+        self.make_flags = 'stream'
+        self.checks = {'Validates': lambda x: x == 'Validates'}
+        # Threads follow the CPU list, spread in the order given
+        self.env['OMP_PROC_BIND'] = 'true'
+
+        # The harness downloads the source (or copies it from a local mirror)
+        url = self.urls[0]
+        if '://' not in url:
+            url = 'file://' + os.path.abspath(url)
+        if url.startswith('file://') and os.path.isdir(url[len('file://'):]):
+            url = url.rstrip('/') + '/stream.c'
+        self.downloads = [(url, 'stream.c', self.sha256)]
+        return prepare_cmds
+
+    def run(self, extra_run_flags):
+        """Every iteration runs all thread counts, each on its cores"""
+        taskset = shutil.which('taskset')
+        binary_path = os.path.join(self.root_path, self.executables[0])
+        all_run_flags = (self.run_flags + " " + extra_run_flags).split()
+
+        run_cmds = []
+        for i in range(0, self.iterations):
+            for threads in self.sweep:
+                run_cmds.append([taskset, '-c', self.affinity_cpus(threads),
+                                 binary_path] + all_run_flags)
+        return run_cmds
+
+    def get_plugin(self):
+        """Returns the plugin to parse the results"""
+        return StreamParser()
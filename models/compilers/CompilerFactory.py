@@ -11,22 +11,39 @@
     toolchain to be downloaded or something already installed systemwide.
     It could be adapted to take a path to a toolchain.
 """
-import tarfile
 import os
 import re
+import shutil
 import subprocess
-from urllib.request import urlretrieve
 from models.ModelFactory import ModelFactory
+from helper.Fetcher import Fetcher, split_checksum
+from helper.Extractor import Extractor
 from shutil import which
+from pathlib import Path
+
+# Not needed to build benchmarks: documentation, LLVM's own libraries and
+# headers (the compiler runtimes, libc++ and libgcc are kept)
+SLIM_EXCLUDE = ['share/doc/*', 'share/man/*', 'share/info/*',
+                'lib/libLLVM*.a', 'lib/libclang*.a', 'lib/liblld*.a',
+                'lib/libMLIR*.a', 'lib/libPolly*.a', 'lib/liblldb*.a',
+                'include/llvm/*', 'include/llvm-c/*', 'include/clang/*',
+                'include/clang-c/*', 'include/mlir/*', 'include/mlir-c/*',
+                'include/lld/*']
 
 class CompilerFactory(ModelFactory):
     """Fetch, prepare and setup compilers"""
 
-    def __init__(self, toolchain_url, root_path):
+    def __init__(self, toolchain_url, root_path, exclude=None):
         self.toolchain_url = toolchain_url
         self.extractpath = os.path.join(root_path, 'compiler')
-        os.mkdir(self.extractpath)
+        # Resumed runs reuse the toolchain already extracted
+        os.makedirs(self.extractpath, exist_ok=True)
         self.system_compilers = ['gcc', 'clang']
+        # Members of the tarball not extracted (ex. documentation)
+        self.exclude = exclude
+        slim = os.environ.get('BENCHMARK_HARNESS_TOOLCHAIN_SLIM')
+        if exclude is None and slim:
+            self.exclude = SLIM_EXCLUDE
         super(CompilerFactory, self).__init__('compilers')
 
     def getCompiler(self):
@@ -36,10 +53,11 @@ class CompilerFactory(ModelFactory):
         if not self.toolchain_url:
             # If empty, try system defaults
             return self._fetch_system()
-        elif re.match("(http|ftp)://", self.toolchain_url):
-            # URLs that we can use urlretrieve
-            self.filename = self.toolchain_url.split('/')[-1]
-            self.dirname = re.sub("\.(tar|tgz)\.?(gz|xz)?", "", self.filename)
+        elif re.match("(https?|ftp)://", self.toolchain_url):
+            # URLs that we can download (with an optional #sha256= checksum)
+            self.filename = split_checksum(self.toolchain_url)[0].split('/')[-1]
+            self.dirname = re.sub(r"\.(tar|t[gx]z|tbz2|tzst)(\.[a-z0-9]+)?$",
+                                  "", self.filename)
             self.base = os.path.join(self.extractpath, self.dirname)
             self.path = os.path.join(self.extractpath, self.filename)
             extracted_tar = self._download_toolchain()
@@ -53,25 +71,43 @@ class CompilerFactory(ModelFactory):
             # Assume this is either a path or a toolchain name
             return self._fetch_system(self.toolchain_url)
 
-    def _extract_tarball(self, filename):
-        """Extracts toolchain directory"""
+    def _extract_tarball(self, chunks):
+        """Extracts toolchain directory, as the tarball's chunks arrive"""
 
-        tarball = tarfile.open(filename)
-        tarball.extractall(self.extractpath)
+        # Left by an interrupted extraction
+        if os.path.isdir(self.base):
+            shutil.rmtree(self.base)
+        extractor = Extractor(self.extractpath, exclude=self.exclude)
+        try:
+            extractor.extract(self.filename, chunks)
+        except (RuntimeError, ValueError) as err:
+            if os.path.isdir(self.base):
+                shutil.rmtree(self.base)
+            raise ImportError('Error extracting toolchain: %s' % err)
 
         # TODO: self.extractpath and self.base are disconnected
         if not os.path.isdir(self.base):
             raise ImportError('Toolchain directory name %s does not match' %
                               self.base)
+        Path(self.stamp).touch()
+        return self.base
 
     def _download_toolchain(self):
-        """Downloads toolchain tarball"""
-        filename, headers = urlretrieve(self.toolchain_url, self.path)
-
-        if not os.path.isfile(filename):
-            raise ImportError('Error downloading toolchain to %s' % filename)
-
-        return self._extract_tarball(filename)
+        """Downloads and extracts the toolchain tarball at the same time"""
+        # Only fully extracted toolchains have the stamp
+        self.stamp = self.base + '.extracted'
+        if os.path.isfile(self.stamp) and os.path.isdir(self.base):
+            return self.base
+
+        url, sha256 = split_checksum(self.toolchain_url)
+        # Tarballs downloaded by older harnesses are extracted from disk
+        if os.path.isfile(self.path):
+            url = 'file://' + os.path.abspath(self.path)
+        fetcher = Fetcher()
+        try:
+            return self._extract_tarball(fetcher.stream(url, sha256))
+        finally:
+            fetcher.close()
 
     def _fetch_compiler(self, extracted_tar):
         """Fetches the full path to the frontend executable"""
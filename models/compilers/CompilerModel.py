@@ -1,10 +1,12 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import subprocess
 import os
 import re
 import shutil
+import glob
+
+from models.compilers.CompilerProbe import CompilerProbe
 
 class CompilerModel(object):
 
@@ -16,6 +18,18 @@ class CompilerModel(object):
         self.fc_name = ''
         self.default_compiler_flags = ''
         self.default_link_flags = ''
+        # Flags worth trying when autotuning (see FlagSearch): on/off flags
+        # and choices of values ('' for none), on top of the default flags
+        self.tuning_space = {'flags': [], 'choices': {}}
+        # Multi-phase builds (see BenchmarkModel.build_phases): flags of
+        # each LTO variant, and PGO flags of the 'generate' and 'use'
+        # phases, where {profile} is the profile directory
+        self.lto_modes = dict()
+        self.pgo_flags = dict()
+        # Toolchain identification (see CompilerProbe)
+        self.probe = dict()
+        self.target = ''
+        self.march = ''
 
     def _check_version(self, path):
         if not path:
@@ -24,16 +38,23 @@ class CompilerModel(object):
             return ''
         if not os.path.isfile(path):
             path = shutil.which(path)
-        if not os.path.isfile(path):
+        if not path or not os.path.isfile(path):
             return ''
 
-        output = subprocess.check_output([path, '--version']).decode('utf-8')
+        # Probes are memoized per binary, so checking all models is cheap
+        probe = CompilerProbe(path).probe()
+        output = probe['version_output']
         if self.cc_name in output:
             found = re.search(
                 r'' + re.escape(self.cc_name) + r'.*? (\d*\.\d*\.\d*)', output)
             if found:
                 self.version = found.group(1)
+            else:
+                self.version = probe['version']
             self.cc_name = path
+            self.probe = probe
+            self.target = probe['target']
+            self.march = probe['march']
             return True
         else:
             return False
@@ -63,13 +84,55 @@ class CompilerModel(object):
         else:
             return False
 
+    def _get_lib_path(self):
+        """Runtime library paths, from the probed search dirs if possible"""
+
+        # Only directories inside the toolchain with shared objects matter,
+        # the system ones are already in the dynamic loader's search path
+        prefix = os.path.realpath(os.path.join(self.compilers_path, '..'))
+        system = ['/lib', '/lib64', '/usr/lib', '/usr/lib64']
+        if self.target:
+            system.extend([os.path.join(lib, self.target) for lib in system])
+        libs = []
+        for path in self.probe.get('libraries', []):
+            if not path.startswith(prefix + os.sep) or path in system:
+                continue
+            if glob.glob(os.path.join(path, '*.so*')):
+                libs.append(path)
+        if not libs:
+            libs = [os.path.join(prefix, 'lib')]
+        return ':'.join(libs)
+
     def get_env(self):
         return {
             'cxx': os.path.join(self.compilers_path, self.cxx_name),
             'cc': os.path.join(self.compilers_path, self.cc_name),
             'fc': os.path.join(self.compilers_path, self.fc_name),
-            'lib': os.path.realpath(os.path.join(self.compilers_path, '../lib'))
+            'lib': self._get_lib_path()
         }
 
     def get_flags(self):
         return self.default_compiler_flags, self.default_link_flags
+
+    def build_modes(self):
+        """Build modes this toolchain supports"""
+        lto = sorted(self.lto_modes.keys())
+        modes = ['default'] + lto
+        if self.pgo_flags:
+            modes += ['pgo'] + ['pgo+' + mode for mode in lto]
+        return modes
+
+    def get_lto_flags(self, mode):
+        if mode not in self.lto_modes:
+            raise ValueError("Compiler %s doesn't support %s" % (self.name, mode))
+        return self.lto_modes[mode]
+
+    def get_pgo_flags(self, phase, profile):
+        if phase not in self.pgo_flags:
+            raise ValueError("Compiler %s doesn't support PGO" % self.name)
+        return self.pgo_flags[phase].format(profile=profile)
+
+    def pgo_merge(self, profile):
+        """Commands merging the raw profiles of the training runs, if the
+           compiler can't use them directly"""
+        return []
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+    Identifies a compiler binary: version, target triple, default -march,
+    supported -m options and library search paths.
+
+    Probing forks the compiler a handful of times, so the result is memoized
+    in memory (per process) and on disk (across runs), keyed by the binary's
+    real path, modification time and size. Upgrading a toolchain in place
+    changes the key, so stale entries are never used.
+
+    Usage:
+      info = CompilerProbe('/usr/bin/gcc').probe()
+"""
+
+import os
+import re
+import subprocess
+
+from helper.DiskCache import DiskCache
+
+class CompilerProbe(object):
+    """Runs the toolchain identification commands once per binary"""
+
+    # In-process memo, shared by all compiler models (key -> info)
+    _memo = dict()
+
+    def __init__(self, path, cache=None):
+        if not path or not os.path.isfile(path):
+            raise ValueError('Compiler binary %s not found' % path)
+
+        self.path = path
+        self.realpath = os.path.realpath(path)
+        stat = os.stat(self.realpath)
+        self.key = '%s:%d:%d' % (self.realpath, stat.st_mtime_ns, stat.st_size)
+        self.cache = cache
+        if not self.cache:
+            self.cache = DiskCache('compilers')
+
+    def probe(self):
+        """Returns the (memoized) identification dictionary"""
+        if self.key in CompilerProbe._memo:
+            return CompilerProbe._memo[self.key]
+
+        info = self.cache.get(self.key)
+        if info is None:
+            info = self._probe()
+            try:
+                self.cache.set(self.key, info)
+            except OSError:
+                # Read-only home directories still get the in-memory memo
+                pass
+        CompilerProbe._memo[self.key] = info
+        return info
+
+    def _output(self, args):
+        """Returns stdout+stderr of the compiler with args, '' on failure"""
+        try:
+            result = subprocess.run([self.path] + args,
+                                    stdout=subprocess.PIPE,
+                                    stderr=subprocess.PIPE,
+                                    stdin=subprocess.DEVNULL,
+                                    timeout=60)
+        except (OSError, subprocess.TimeoutExpired):
+            return ''
+        if result.returncode:
+            return ''
+        return result.stdout.decode('utf-8', 'replace') + \
+               result.stderr.decode('utf-8', 'replace')
+
+    def _search_dirs(self, output):
+        """Parses -print-search-dirs into install/programs/libraries"""
+        dirs = {'install': '', 'programs': [], 'libraries': []}
+        for line in output.split('\n'):
+            match = re.match(r'^(install|programs|libraries):\s*=?(.*)$', line)
+            if not match:
+                continue
+            if match.group(1) == 'install':
+                dirs['install'] = os.path.realpath(match.group(2).strip())
+                continue
+            paths = []
+            for path in match.group(2).split(':'):
+                if not path or not os.path.isdir(path):
+                    continue
+                path = os.path.realpath(path)
+                if path not in paths:
+                    paths.append(path)
+            dirs[match.group(1)] = paths
+        return dirs
+
+    def _target_options(self):
+        """Default -march/-mtune and the list of supported -m options"""
+        march = ''
+        mtune = ''
+        options = []
+
+        # GCC prints all target options with their current values
+        output = self._output(['-Q', '--help=target'])
+        for line in output.split('\n'):
+            match = re.match(r'^\s+(-m[\w.+-]+=?)\s*(\S*)', line)
+            if not match:
+                continue
+            option, value = match.group(1), match.group(2)
+            if option == '-march=' and not value.startswith('['):
+                march = value
+            elif option == '-mtune=' and not value.startswith('['):
+                mtune = value
+            options.append(option)
+
+        # Clang only tells the target CPU on the driver's cc1 line
+        if not options:
+            output = self._output(['-###', '-c', '-x', 'c', os.devnull,
+                                   '-o', os.devnull])
+            match = re.search(r'"-target-cpu" "([^"]+)"', output)
+            if match:
+                march = match.group(1)
+            match = re.search(r'"-tune-cpu" "([^"]+)"', output)
+            if match:
+                mtune = match.group(1)
+            for line in self._output(['--help']).split('\n'):
+                match = re.match(r'^\s+(-m[\w.+-]+=?)', line)
+                if match and match.group(1) not in options:
+                    options.append(match.group(1))
+
+        return march, mtune, options
+
+    def _probe(self):
+        """Forks the compiler to collect everything we know how to ask"""
+        version_output = self._output(['--version'])
+        version = ''
+        found = re.search(r'(\d+\.\d+\.\d+)', version_output.split('\n')[0])
+        if found:
+            version = found.group(1)
+
+        march, mtune, options = self._target_options()
+        dirs = self._search_dirs(self._output(['-print-search-dirs']))
+
+        sysroot = self._output(['-print-sysroot']).strip()
+        if sysroot:
+            sysroot = os.path.realpath(sysroot)
+
+        return {
+            'path': self.realpath,
+            'version_output': version_output,
+            'version': version,
+            'target': self._output(['-dumpmachine']).strip(),
+            'march': march,
+            'mtune': mtune,
+            'm_options': options,
+            'sysroot': sysroot,
+            'install': dirs['install'],
+            'programs': dirs['programs'],
+            'libraries': dirs['libraries']
+        }
@@ -1,6 +1,9 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import os
+import shutil
+
 from models.compilers.CompilerModel import CompilerModel
 
 class ModelImplementation(CompilerModel):
@@ -12,3 +15,32 @@ class ModelImplementation(CompilerModel):
         self.cxx_name='clang++'
         self.fc_name='flang'
         self.default_compiler_flags='-O3 -ffast-math -ffp-contract=on'
+        self.lto_modes = {'lto': '-flto', 'thinlto': '-flto=thin'}
+        self.pgo_flags = {
+            'generate': '-fprofile-generate={profile}',
+            'use': '-fprofile-use={profile}/default.profdata'
+        }
+        self.tuning_space = {
+            'flags': ['-funroll-loops', '-fno-unroll-loops', '-fno-fast-math',
+                      '-fomit-frame-pointer', '-fno-vectorize',
+                      '-fno-slp-vectorize', '-fno-semantic-interposition'],
+            'choices': {
+                'opt': ['', '-O2', '-Ofast'],
+                'arch': ['', '-march=native', '-mtune=native'],
+                'unroll': ['', '-mllvm -unroll-count=2',
+                           '-mllvm -unroll-count=4',
+                           '-mllvm -unroll-count=8'],
+                'vectorize': ['', '-mllvm -force-vector-width=2',
+                              '-mllvm -force-vector-width=4',
+                              '-mllvm -force-vector-width=8']
+            }
+        }
+
+    def pgo_merge(self, profile):
+        """Raw profiles (.profraw) need merging with llvm-profdata"""
+        profdata = os.path.join(self.compilers_path, 'llvm-profdata')
+        if not os.path.isfile(profdata):
+            profdata = shutil.which('llvm-profdata') or 'llvm-profdata'
+        return [[profdata, 'merge',
+                 '-output=' + os.path.join(profile, 'default.profdata'),
+                 profile]]
@@ -12,4 +12,28 @@ class ModelImplementation(CompilerModel):
         self.cc_name='gcc'
         self.fc_name='gfortran'
         self.default_compiler_flags='-O3 -ffast-math -funroll-loops'
+        self.lto_modes = {'lto': '-flto'}
+        # Profiles (.gcda) are used as they are, no merge step
+        self.pgo_flags = {
+            'generate': '-fprofile-generate={profile} ' +
+                        '-fprofile-update=prefer-atomic',
+            'use': '-fprofile-use={profile} -fprofile-correction ' +
+                   '-Wno-missing-profile'
+        }
+        self.tuning_space = {
+            'flags': ['-fno-unroll-loops', '-fno-fast-math',
+                      '-fomit-frame-pointer', '-fno-tree-vectorize',
+                      '-fprefetch-loop-arrays', '-fipa-pta',
+                      '-fno-semantic-interposition', '-floop-interchange'],
+            'choices': {
+                'opt': ['', '-O2', '-Ofast'],
+                'arch': ['', '-march=native', '-mtune=native'],
+                'unroll': ['', '--param=max-unroll-times=2',
+                           '--param=max-unroll-times=4',
+                           '--param=max-unroll-times=8'],
+                'vectorize': ['', '-fvect-cost-model=cheap',
+                              '-fvect-cost-model=dynamic',
+                              '-fvect-cost-model=unlimited']
+            }
+        }
 
@@ -1,7 +1,9 @@
 #!/usr/bin/env python3
 
+import os
 import re
 from executor.Execute import Execute
+from executor.CoreCalibration import CoreCalibration
 
 class MachineModel(object):
     def __init__(self):
@@ -12,6 +14,10 @@ class MachineModel(object):
         self.link_flags=''
         self.cpu_info = None
         self.affinity = []
+        # Core of single threaded measurements (core 2 is more stable than 1)
+        self.measure_core = 2
+        # Cores ranked by noise, quietest first (see calibrate)
+        self.calibration = None
         self._get_cpu_info()
         self._get_mem_info()
         self._get_cpu_affinity()
@@ -130,6 +136,35 @@ class MachineModel(object):
         self.affinity.append(0)
         self.affinity.extend(todo)
 
+    def calibrate(self, recalibrate=False, logger=None):
+        """Ranks the cores by noise (see CoreCalibration), measures on the
+           quietest one and puts the quieter first in each affinity tier"""
+
+        cores = [c for c in self.affinity if c] or \
+                list(range(1, self.cpu_info['threads'] + 1))
+        # Only the cores this process can run on
+        allowed = os.sched_getaffinity(0)
+        cores = [c for c in cores if c - 1 in allowed]
+        if not cores:
+            return
+        self.calibration = CoreCalibration(logger=logger).rank(cores,
+                                                               recalibrate)
+        order = [entry['core'] for entry in self.calibration]
+        self.measure_core = order[0]
+
+        # Zeros (tier boundaries) stay, cores move within their tier
+        affinity = []
+        tier = []
+        for core in self.affinity + [0]:
+            if core:
+                tier.append(core)
+                continue
+            tier.sort(key=lambda c: order.index(c) if c in order
+                                    else len(order))
+            affinity.extend(tier + [0])
+            tier = []
+        self.affinity = affinity[:-1]
+
     def get_flags(self):
         self._machine_specific_setup()
         return self.comp_flags, self.link_flags
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+    Coordinator: distributes benchmark jobs to worker agents (see Worker).
+
+    Each worker is driven by its own thread, which takes the oldest pending
+    job that matches its machine type, submits it and polls for the result.
+    Jobs without a machine type can run on any worker.
+
+    If a worker can't be reached (or forgets the job, ex. after a restart)
+    for 'retries' polls in a row, it is considered lost and the job goes
+    back to the queue, to be picked up by another worker (or the same one,
+    once it is back). Jobs are attempted at most 'retries' times.
+
+    Usage:
+      coordinator = Coordinator(['http://host1:8000', 'http://host2:8000'])
+      records = coordinator.run([('job1', {'benchmark': 'lulesh'})])
+"""
+
+import time
+import threading
+import requests
+
+class Coordinator(object):
+    """Matches jobs to workers, retries on worker loss"""
+
+    def __init__(self, workers, logger=None, retries=3, poll=5.0, timeout=10.0):
+        if not workers or not isinstance(workers, list):
+            raise ValueError("Coordinator needs a list of workers")
+
+        self.workers = [w.rstrip('/') for w in workers]
+        self.logger = logger
+        self.retries = retries
+        self.poll = poll
+        self.timeout = timeout
+
+        self.cond = threading.Condition()
+        self.pending = []
+        self.records = dict()
+        # Worker url -> machine type, for the ones that are alive
+        self.alive = dict()
+        # Connection pooling across polls (one session per worker thread)
+        self.local = threading.local()
+
+    def _log(self, msg):
+        if self.logger:
+            self.logger.info(msg)
+
+    def _session(self):
+        if not hasattr(self.local, 'session'):
+            self.local.session = requests.Session()
+        return self.local.session
+
+    def _get(self, url):
+        """JSON reply of a GET, None if the worker can't be reached"""
+        try:
+            reply = self._session().get(url, timeout=self.timeout)
+        except requests.RequestException:
+            return None
+        if reply.status_code == 404:
+            return {'status': 'lost'}
+        if reply.status_code != 200:
+            return None
+        return reply.json()
+
+    def _matches(self, record, machine_type):
+        wanted = record['job'].get('machine_type')
+        return not wanted or wanted == machine_type
+
+    def _take(self, worker, machine_type):
+        """Oldest pending job for this machine type (with the lock)"""
+        for record in self.pending:
+            if self._matches(record, machine_type):
+                self.pending.remove(record)
+                record['status'] = 'running'
+                record['worker'] = worker
+                record['attempts'] += 1
+                return record
+        return None
+
+    def _requeue(self, record, error):
+        """Puts a job back in the queue after a worker loss"""
+        with self.cond:
+            record['error'] = error
+            record['worker'] = None
+            if record['attempts'] >= self.retries:
+                record['status'] = 'failed'
+                self._log('Job %s failed: %s' % (record['name'], error))
+            else:
+                record['status'] = 'pending'
+                self.pending.insert(0, record)
+                self._log('Job %s requeued: %s' % (record['name'], error))
+            self.cond.notify_all()
+
+    def _wanted(self, machine_type):
+        """True while there are jobs this machine type could still run"""
+        for record in self.records.values():
+            if record['status'] in ('pending', 'running') and \
+               self._matches(record, machine_type):
+                return True
+        return False
+
+    def _execute(self, worker, record):
+        """Submits the job and polls until done, False if worker lost"""
+        try:
+            reply = self._session().post(worker + '/jobs', timeout=self.timeout,
+                                         json={'id': record['name'],
+                                               'job': record['job']})
+        except requests.RequestException as err:
+            self._requeue(record, 'Submit to %s failed: %s' % (worker, err))
+            return False
+        if reply.status_code != 202:
+            self._requeue(record, 'Worker %s refused job: %d' %
+                          (worker, reply.status_code))
+            return False
+        self._log('Job %s running on %s' % (record['name'], worker))
+
+        failures = 0
+        while True:
+            time.sleep(self.poll)
+            status = self._get(worker + '/jobs/' + record['name'])
+            if status is None or status.get('status') == 'lost':
+                failures += 1
+                if failures >= self.retries:
+                    self._requeue(record, 'Lost worker %s' % worker)
+                    return False
+                continue
+            failures = 0
+            if status['status'] == 'running':
+                continue
+            with self.cond:
+                record['status'] = status['status']
+                record['result'] = status
+                record['error'] = status.get('error')
+                self.cond.notify_all()
+            self._log('Job %s %s on %s' % (record['name'], status['status'],
+                                           worker))
+            return True
+
+    def _drive(self, worker):
+        """Worker thread: take matching jobs until none are left"""
+        failures = 0
+        machine_type = None
+        while True:
+            info = self._get(worker + '/info')
+            with self.cond:
+                if info is None or 'machine_type' not in info:
+                    failures += 1
+                    self.alive.pop(worker, None)
+                    if failures >= self.retries or \
+                       (machine_type and not self._wanted(machine_type)):
+                        self._log('Giving up on worker %s' % worker)
+                        self.cond.notify_all()
+                        return
+                    self.cond.wait(self.poll)
+                    continue
+                failures = 0
+                machine_type = info['machine_type']
+                self.alive[worker] = machine_type
+                if not self._wanted(machine_type):
+                    self.cond.notify_all()
+                    return
+                record = None
+                if not info.get('busy'):
+                    record = self._take(worker, machine_type)
+                if record is None:
+                    self.cond.wait(self.poll)
+                    continue
+            self._execute(worker, record)
+
+    def run(self, jobs):
+        """Runs all (name, job) pairs, returns name -> record"""
+        for name, job in jobs:
+            record = {'name': name, 'job': job, 'status': 'pending',
+                      'attempts': 0, 'worker': None, 'result': None,
+                      'error': None}
+            self.records[name] = record
+            self.pending.append(record)
+
+        threads = [threading.Thread(target=self._drive, args=(w,), daemon=True)
+                   for w in self.workers]
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        # Jobs left behind had no (live) worker for their machine type
+        with self.cond:
+            for record in self.pending:
+                record['status'] = 'failed'
+                record['error'] = 'No worker for machine %s' % \
+                                  record['job'].get('machine_type')
+        return self.records
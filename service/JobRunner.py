@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+    Runs single benchmark jobs (same options as campaign jobs) on behalf of
+    long running services (workers, job server), keeping the machine model,
+    the compiler models and the benchmark sources between jobs (the jobs
+    whose options prepare them the same way).
+
+    Usage:
+      runner = JobRunner('/tmp/worker')
+      result = runner.run({'benchmark': 'lulesh', 'iterations': 3}, 'job1')
+
+    The result is a dictionary, ready to be sent as JSON:
+      status: done | failed
+      valid:  benchmark validation status
+      error:  error message, if failed
+      files:  results files (out, err, manifest, stats) as text
+
+    The cores are ranked by noise once (see MachineModel.calibrate), and
+    with reserve(threads) builds stay off the cores measuring runs of up
+    to that many threads (ex. when jobs build while others measure).
+"""
+
+import os
+import hashlib
+import shutil
+import threading
+from pathlib import Path
+
+from helper.Campaign import Campaign
+
+from models.compilers.CompilerFactory import CompilerFactory
+from models.benchmarks.BenchmarkFactory import BenchmarkFactory
+from models.machines.MachineFactory import MachineFactory
+
+from benchmark_controller import BenchmarkController, argument_parser
+
+class JobRunner(object):
+    """Runs jobs with warm machine and compiler models"""
+
+    def __init__(self, root_path, machine_type=None, verbose=0, logger=None,
+                 calibrate=True):
+        self.root_path = os.path.realpath(root_path)
+        self.verbose = verbose
+        self.logger = logger
+
+        self.machine_model = MachineFactory(machine_type).getMachine()
+        self.machine_type = machine_type or self.machine_model.arch
+        if calibrate:
+            self.machine_model.calibrate(logger=self.logger)
+        # Threads of the runs whose cores are kept away from builds, and
+        # the CPU list (taskset -c) of the builds, None for all
+        self.reserved = 0
+        self.build_cpus = None
+
+        # Toolchain (url/name) -> compiler model
+        self.compilers = dict()
+        # Benchmark and prepare commands (see _sources_key) -> pristine
+        # sources, copied for each job
+        self.sources_paths = dict()
+        self.source_locks = dict()
+        self.lock = threading.Lock()
+
+    def info(self):
+        """What this runner can run"""
+        return {
+            'machine_type': self.machine_type,
+            'machine_name': self.machine_model.name,
+            'num_cores': self.machine_model.cpu_info.get('threads'),
+            'toolchains': sorted([t for t in self.compilers if t])
+        }
+
+    def reserve(self, threads):
+        """Keeps builds off the measurement cores of runs of up to
+           'threads' threads (as campaign_controller._split_cores)"""
+        affinity = [c for c in self.machine_model.affinity if c]
+        measure = [self.machine_model.measure_core] + affinity[:threads]
+        num_cpus = os.cpu_count() or 1
+        cpus = [c - 1 for c in range(1, num_cpus + 1) if c not in measure]
+        self.reserved = threads
+        self.build_cpus = ','.join([str(c) for c in cpus]) or None
+        if self.logger:
+            self.logger.info('Build cores: %s' % (self.build_cpus or 'none'))
+        return self.build_cpus
+
+    def exclusive(self, job):
+        """Whether the job's runs need the cores left to builds"""
+        return not self.build_cpus or (job.get('threads') or 1) > self.reserved
+
+    def compiler(self, toolchain):
+        """Compiler model for the toolchain, fetched on first use"""
+        with self.lock:
+            if toolchain not in self.compilers:
+                digest = hashlib.sha1(str(toolchain).encode('utf-8'))
+                path = os.path.join(self.root_path, 'toolchains',
+                                    digest.hexdigest()[:12])
+                Path(path).mkdir(parents=True, exist_ok=True)
+                self.compilers[toolchain] = CompilerFactory(toolchain,
+                                                            path).getCompiler()
+            return self.compilers[toolchain]
+
+    def _controller(self, job, root, name):
+        argv = Campaign.argv(job, os.path.join(self.root_path, root), name)
+        argv.extend(['-v'] * self.verbose)
+        parser = argument_parser()
+        args = parser.parse_args(argv)
+        controller = BenchmarkController(parser, args,
+                                         machine_model=self.machine_model,
+                                         compiler_model=self.compiler(job.get('toolchain')))
+        controller.build_cpus = self.build_cpus
+        return controller
+
+    def _sources_key(self, job):
+        """Benchmark and a digest of its prepare commands for the job's
+           options: jobs only share sources prepared the same way (ex. a
+           model patching the sources for some thread counts)"""
+        bench = job['benchmark']
+        args = argument_parser().parse_args(
+            Campaign.argv(job, os.path.join(self.root_path, 'sources'), bench))
+        model = BenchmarkFactory(bench, os.path.join(self.root_path,
+                                                     'sources')).getBenchmark()
+        cmds = model.prepare(self.machine_model,
+                             self.compiler(job.get('toolchain')),
+                             args.iterations, args.size, args.threads)
+        digest = hashlib.sha1(repr((cmds, model.downloads)).encode('utf-8'))
+        return '%s-%s' % (bench, digest.hexdigest()[:12])
+
+    def sources(self, job):
+        """Pristine benchmark sources, fetched on first use"""
+        key = self._sources_key(job)
+        with self.lock:
+            if key not in self.source_locks:
+                self.source_locks[key] = threading.Lock()
+        with self.source_locks[key]:
+            if key not in self.sources_paths:
+                controller = self._controller(job, 'sources', key)
+                controller.setup()
+                controller.prepare()
+                self.sources_paths[key] = controller.benchmark_model.root_path
+            return self.sources_paths[key]
+
+    def run(self, job, name, notify=None, measure=None, building=None):
+        """Runs a job to completion, never raises
+
+           notify(stage) is called before each stage, and the benchmark
+           runs inside the 'measure()' context manager, if passed (builds
+           inside 'building()')"""
+        if not isinstance(job, dict) or 'benchmark' not in job:
+            return {'status': 'failed', 'valid': False,
+                    'error': 'Job must be a dictionary with a benchmark'}
+
+        def stage(name):
+            if notify:
+                notify(name)
+
+        result = {'status': 'failed', 'valid': False, 'files': dict()}
+        try:
+            job = dict(job, machine_type=self.machine_type)
+            stage('prepare')
+            sources = self.sources(job)
+            controller = self._controller(job, 'jobs', name)
+            controller.setup()
+            shutil.copytree(sources, controller.benchmark_model.root_path,
+                            symlinks=True)
+            controller.prepare(fetch=False)
+            stage('build')
+            if building:
+                with building():
+                    controller.build()
+            else:
+                controller.build()
+            stage('run')
+            if measure:
+                with measure():
+                    res = controller.run()
+            else:
+                res = controller.run()
+            stage('collect')
+            result['valid'] = controller.collect(res)
+            result['status'] = 'done'
+            result['results_path'] = controller.results_path
+        except (Exception, SystemExit) as err:
+            result['error'] = repr(err)
+            if self.logger:
+                self.logger.error('Job %s failed: %s' % (name, repr(err)))
+            return result
+
+        # Ship all results files back (they're small, parsed and in YAML)
+        for filename in os.listdir(controller.results_path):
+            path = os.path.join(controller.results_path, filename)
+            if os.path.isfile(path):
+                result['files'][filename] = Path(path).read_text()
+        return result
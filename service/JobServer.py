@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+    Resident job server: accepts benchmark jobs over a Unix socket and runs
+    them with warm models (see JobRunner), so clients don't pay for the
+    harness start up, machine detection, compiler probes, toolchain and
+    source downloads on every job.
+
+    Protocol: the client sends one JSON line, the server streams JSON lines
+    back until the final event.
+      {"type": "submit", "job": {options}}
+          -> {"event": "queued", "id": ..., "position": N}
+          -> {"event": "stage", "id": ..., "stage": prepare|build|run|collect}
+          -> {"event": "done"|"failed", "id": ..., "result": {...}}
+      {"type": "status"}
+          -> {"event": "status", "queued": [...], "running": [...], ...}
+
+    Jobs start in FIFO order, up to 'jobs' at a time (preparing and building
+    in parallel), but benchmark runs hold an exclusive measurement slot,
+    also granted in submission order. With more than one job, builds run
+    off the measurement cores (see JobRunner.reserve), and runs that need
+    those cores too wait for the builds to finish, holding new ones back.
+"""
+
+import os
+import json
+import queue
+import itertools
+import threading
+import socketserver
+from contextlib import contextmanager
+
+class MeasureSlot(object):
+    """Exclusive measurement slot, granted in submission order"""
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.order = []
+
+    def register(self, name):
+        with self.cond:
+            self.order.append(name)
+
+    def forget(self, name):
+        """Drops the job from the line (ex. failed before measuring)"""
+        with self.cond:
+            if name in self.order:
+                self.order.remove(name)
+                self.cond.notify_all()
+
+    @contextmanager
+    def hold(self, name):
+        with self.cond:
+            while self.order[0] != name:
+                self.cond.wait()
+        try:
+            yield
+        finally:
+            self.forget(name)
+
+class BuildGate(object):
+    """Builds run together, but not during measurements that need their
+       cores (only one at a time, see MeasureSlot)"""
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.builds = 0
+        self.measuring = False
+
+    @contextmanager
+    def build(self):
+        with self.cond:
+            while self.measuring:
+                self.cond.wait()
+            self.builds += 1
+        try:
+            yield
+        finally:
+            with self.cond:
+                self.builds -= 1
+                self.cond.notify_all()
+
+    @contextmanager
+    def measure(self):
+        with self.cond:
+            # New builds wait from now on, running ones finish
+            self.measuring = True
+            while self.builds:
+                self.cond.wait()
+        try:
+            yield
+        finally:
+            with self.cond:
+                self.measuring = False
+                self.cond.notify_all()
+
+class JobRequestHandler(socketserver.StreamRequestHandler):
+    """One request per connection, see module documentation"""
+
+    def _send(self, data):
+        self.wfile.write((json.dumps(data) + '\n').encode('utf-8'))
+        self.wfile.flush()
+
+    def handle(self):
+        server = self.server.job_server
+        try:
+            request = json.loads(self.rfile.readline().decode('utf-8'))
+        except ValueError:
+            return self._send({'event': 'error', 'error': 'Bad request'})
+        if not isinstance(request, dict):
+            return self._send({'event': 'error', 'error': 'Bad request'})
+
+        if request.get('type') == 'status':
+            return self._send(server.status())
+        if request.get('type') != 'submit' or \
+           not isinstance(request.get('job'), dict):
+            return self._send({'event': 'error', 'error': 'Unknown request'})
+
+        events = server.submit(request['job'])
+        while True:
+            event = events.get()
+            try:
+                self._send(event)
+            except OSError:
+                # Client went away, the job carries on regardless
+                return
+            if event['event'] in ('done', 'failed'):
+                return
+
+class JobServer(object):
+    """Unix socket front-end of a JobRunner, with a FIFO queue"""
+
+    def __init__(self, socket_path, runner, jobs=1, logger=None,
+                 measure_threads=1):
+        if not isinstance(jobs, int) or jobs < 1:
+            raise ValueError("Number of parallel jobs must be positive")
+
+        self.socket_path = socket_path
+        self.runner = runner
+        self.logger = logger
+        self.queue = queue.Queue()
+        self.slot = MeasureSlot()
+        self.gate = BuildGate()
+        # Builds of other jobs run while measuring
+        if jobs > 1:
+            self.runner.reserve(measure_threads)
+        self.lock = threading.Lock()
+        self.counter = itertools.count(1)
+        self.queued = []
+        self.running = []
+        self.finished = 0
+
+        # Stale socket from a previous (killed) server
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        # Only the owner can submit jobs
+        umask = os.umask(0o077)
+        try:
+            self.server = socketserver.ThreadingUnixStreamServer(
+                self.socket_path, JobRequestHandler)
+        finally:
+            os.umask(umask)
+        self.server.daemon_threads = True
+        self.server.job_server = self
+
+        self.threads = [threading.Thread(target=self._work, daemon=True)
+                        for _ in range(jobs)]
+        for thread in self.threads:
+            thread.start()
+
+    def _log(self, msg):
+        if self.logger:
+            self.logger.info(msg)
+
+    def status(self):
+        with self.lock:
+            return {'event': 'status',
+                    'queued': list(self.queued),
+                    'running': list(self.running),
+                    'finished': self.finished,
+                    'machine': self.runner.info()}
+
+    def submit(self, job):
+        """Queues the job, returns the queue its events will be posted to"""
+        events = queue.Queue()
+        with self.lock:
+            name = 'job%d-%d' % (os.getpid(), next(self.counter))
+            self.queued.append(name)
+            position = len(self.queued)
+            self.slot.register(name)
+        events.put({'event': 'queued', 'id': name, 'position': position})
+        self._log('Queued %s (%s)' % (name, job.get('benchmark')))
+        self.queue.put((name, job, events))
+        return events
+
+    def _work(self):
+        while True:
+            name, job, events = self.queue.get()
+            with self.lock:
+                self.queued.remove(name)
+                self.running.append(name)
+
+            def notify(stage):
+                events.put({'event': 'stage', 'id': name, 'stage': stage})
+
+            @contextmanager
+            def measure():
+                with self.slot.hold(name):
+                    if self.runner.exclusive(job):
+                        with self.gate.measure():
+                            yield
+                    else:
+                        yield
+
+            self._log('Running %s' % name)
+            try:
+                result = self.runner.run(job, name, notify, measure,
+                                         self.gate.build)
+            finally:
+                self.slot.forget(name)
+                with self.lock:
+                    self.running.remove(name)
+                    self.finished += 1
+            self._log('Job %s %s' % (name, result['status']))
+            events.put({'event': result['status'], 'id': name,
+                        'result': result})
+
+    def serve_forever(self):
+        self._log('Job server listening on %s' % self.socket_path)
+        self.server.serve_forever()
+
+    def shutdown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+    Worker agent: runs benchmark jobs sent by a coordinator over HTTP.
+
+    Protocol (JSON bodies):
+      GET  /info        machine type/name, cores, busy flag
+      POST /jobs        {'id': name, 'job': {options}} -> 202, 409 if busy
+      GET  /jobs/<id>   {'id', 'status': running|done|failed, ...result}
+
+    Only one job runs at a time (measurements need the whole machine), and
+    the coordinator polls for its status, so a worker that disappears (crash,
+    reboot, network) is noticed without waiting for the job to finish.
+    There is no authentication: only bind to trusted networks.
+
+    Usage:
+      worker = Worker('127.0.0.1', 8000, JobRunner('/tmp/worker'))
+      worker.serve_forever()
+"""
+
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class WorkerHandler(BaseHTTPRequestHandler):
+    """Routes requests to the Worker (self.server.worker)"""
+
+    def _reply(self, code, data):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        worker = self.server.worker
+        if self.path == '/info':
+            return self._reply(200, worker.info())
+        match = re.match(r'^/jobs/([\w.-]+)$', self.path)
+        if match:
+            status = worker.status(match.group(1))
+            if status is None:
+                return self._reply(404, {'error': 'Unknown job'})
+            return self._reply(200, status)
+        self._reply(404, {'error': 'Unknown path %s' % self.path})
+
+    def do_POST(self):
+        if self.path != '/jobs':
+            return self._reply(404, {'error': 'Unknown path %s' % self.path})
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length).decode('utf-8'))
+            name = request['id']
+            job = request['job']
+        except (ValueError, KeyError, TypeError):
+            return self._reply(400, {'error': 'Bad job request'})
+        if not re.match(r'^[\w.-]+$', str(name)):
+            return self._reply(400, {'error': 'Bad job id'})
+        if not self.server.worker.submit(name, job):
+            return self._reply(409, {'error': 'Worker busy'})
+        self._reply(202, {'id': name})
+
+    def log_message(self, format, *args):
+        logger = self.server.worker.logger
+        if logger:
+            logger.debug('%s %s' % (self.address_string(), format % args))
+
+class Worker(object):
+    """HTTP front-end of a JobRunner, one job at a time"""
+
+    def __init__(self, host, port, runner, logger=None):
+        self.runner = runner
+        self.logger = logger
+        self.lock = threading.Lock()
+        self.current = None
+        # Job id -> status/result, kept until the worker restarts
+        self.jobs = dict()
+
+        self.server = ThreadingHTTPServer((host, port), WorkerHandler)
+        self.server.worker = self
+        self.port = self.server.server_address[1]
+
+    def info(self):
+        info = self.runner.info()
+        info['busy'] = self.current is not None
+        return info
+
+    def status(self, name):
+        with self.lock:
+            return self.jobs.get(name)
+
+    def submit(self, name, job):
+        """Starts the job in the background, False if already busy"""
+        with self.lock:
+            if self.current is not None:
+                return False
+            self.current = name
+            self.jobs[name] = {'id': name, 'status': 'running'}
+        thread = threading.Thread(target=self._run, args=(name, job),
+                                  daemon=True)
+        thread.start()
+        return True
+
+    def _run(self, name, job):
+        if self.logger:
+            self.logger.info('Running job %s' % name)
+        result = self.runner.run(job, name)
+        result['id'] = name
+        with self.lock:
+            self.jobs[name] = result
+            self.current = None
+        if self.logger:
+            self.logger.info('Job %s %s' % (name, result['status']))
+
+    def serve_forever(self):
+        if self.logger:
+            self.logger.info('Worker listening on port %d' % self.port)
+        self.server.serve_forever()
+
+    def shutdown(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+    Worker Agent
+    Serves benchmark jobs to a coordinator (coordinator_controller.py) over
+    HTTP. The machine model is detected once, and toolchains are fetched
+    once, on first use, and kept for the following jobs.
+
+    There is no authentication, so only listen on trusted networks.
+
+    Usage: worker_agent.py --usage
+"""
+
+import argparse
+
+from helper.BenchmarkLogger import BenchmarkLogger
+from service.JobRunner import JobRunner
+from service.Worker import Worker
+
+if __name__ == '__main__':
+    """Point of entry for worker agents"""
+    parser = argparse.ArgumentParser(description='Benchmark Harness Worker')
+
+    parser.add_argument('--host', type=str, default='127.0.0.1',
+                        help='The address to listen on')
+    parser.add_argument('--port', type=int, default=8000,
+                        help='The port to listen on')
+    parser.add_argument('--machine_type', type=str,
+                        help='The type of this machine (default: detect)')
+    parser.add_argument('--root-path', type=str, default='./worker',
+                        help='The root directory for toolchains, jobs, results')
+    parser.add_argument('-v', '--verbose', action='count', default=0,
+                        help='The verbosity of logging output')
+    args = parser.parse_args()
+
+    logger = BenchmarkLogger(__name__, parser, args.verbose)
+    runner = JobRunner(args.root_path, args.machine_type, args.verbose, logger)
+    worker = Worker(args.host, args.port, runner, logger)
+    try:
+        worker.serve_forever()
+    except KeyboardInterrupt:
+        worker.shutdown()